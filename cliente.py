@@ -0,0 +1,19 @@
+import importlib.util
+import os
+import sys
+
+# Cliente leve do servidor de processamento (python main.py servidor).
+# O módulo components/cliente.py é carregado direto do arquivo: importar o pacote components
+# carregaria o OpenCV e o NumPy, que o cliente não usa.
+#
+# Exemplos:
+#   python cliente.py high-boost src/01.jpeg -p A=2.0 -o out/01_high_boost.jpg
+#   python cliente.py estado
+#   python cliente.py encerrar
+_caminho = os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "cliente.py")
+_especificacao = importlib.util.spec_from_file_location("vcrm_cliente", _caminho)
+cliente = importlib.util.module_from_spec(_especificacao)
+_especificacao.loader.exec_module(cliente)
+
+if __name__ == "__main__":
+    sys.exit(cliente.main(sys.argv[1:]))
@@ -1,13 +1,14 @@
+from components.desempenho import _04_comparar_tempos_convolucao
 from components.filtros import _03_1_filtro_high_boost, _03_2_filtro_passa_alta
 from components.processamento import (
     _01_clusterizacao_tons_cinza,
     _02_subtrai_e_delineia,
     _03_comparar_imagens,
-    _04_comparar_tempos_convolucao,
     convolucao_espacial,
     convolucao_frequencia,
+    convolve,
 )
-from components.utils import mostrar_imagem, clear_t
+from components.utils import carregar_imagem, mostrar_imagem, clear_t
 
 __all__ = [
     "_01_clusterizacao_tons_cinza",
@@ -18,6 +19,8 @@ __all__ = [
     "_04_comparar_tempos_convolucao",
     "convolucao_espacial",
     "convolucao_frequencia",
+    "convolve",
+    "carregar_imagem",
     "mostrar_imagem",
     "clear_t",
 ]
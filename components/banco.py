@@ -0,0 +1,283 @@
+import cv2
+import numpy as np
+
+from components.buffers import rascunho, verificar_saida
+from components.desempenho import kernel_media, medir
+from components.fft import backend_fft
+from components.perfil import perfilar
+from components.processamento import _espectro_kernel, convolucao_frequencia
+
+# Banco de filtros na frequência: vários kernels aplicados à mesma imagem (orientações de
+# borda, escalas de desfoque, Laplaciano, média) com uma única FFT da imagem.
+# Chamar convolucao_frequencia uma vez por kernel refaz a transformada direta da imagem a
+# cada chamada; aqui ela é feita uma vez, o produto contra os K espectros de kernel é uma só
+# operação vetorizada (Kx...xHxW) e as K inversas são feitas em lote pelo backend de FFT.
+#
+# Os kernels são empilhados em um array KxHkxWk de tamanho comum (com zeros em volta dos
+# menores, mantendo a âncora), e o espectro da pilha fica no cache de espectros de kernel
+# (ver processamento.configurar_cache_espectros): aplicar o mesmo banco a várias imagens do
+# mesmo tamanho transforma os kernels uma única vez.
+#
+# Com memoria_max, o banco é processado em lotes de kernels que cabem no orçamento (o
+# espectro do lote, os produtos e as inversas); o resultado KxHxW pode ser um np.memmap
+# (ver blocos.criar_matriz) quando nem ele cabe na memória.
+
+
+def empilhar_kernels(kernels, alinhar=False):
+    """
+    Empilha kernels 2D (de tamanhos possivelmente diferentes) em um array KxHkxWk float32.
+
+    Os kernels menores são completados com zeros, o que não muda o resultado da convolução:
+    sem alinhar, ficam no canto superior esquerdo (a origem da convolução circular); com
+    alinhar, ficam com a âncora (o centro, como no cv2.filter2D) na âncora comum da pilha.
+
+    Args:
+        kernels (numpy.ndarray or list[numpy.ndarray]): Um array KxHkxWk ou uma lista de kernels 2D.
+        alinhar (bool, optional): Se True, alinha as âncoras em vez dos cantos. Padrão é False.
+
+    Returns:
+        tuple[numpy.ndarray, tuple[int, int]]: A pilha (contígua, float32) e a âncora (y, x)
+                                               comum dos kernels na pilha.
+
+    Raises:
+        ValueError: Se não houver kernels ou algum não for 2D.
+    """
+    kernels = [np.asarray(kernel) for kernel in kernels]
+    if not kernels:
+        raise ValueError("O banco de filtros precisa de pelo menos um kernel.")
+    if any(kernel.ndim != 2 for kernel in kernels):
+        raise ValueError("Todos os kernels do banco devem ser 2D.")
+
+    if alinhar:
+        # A pilha precisa acomodar a maior parte antes e a maior parte depois da âncora
+        antes = [max(k.shape[eixo] // 2 for k in kernels) for eixo in (0, 1)]
+        depois = [max(k.shape[eixo] - 1 - k.shape[eixo] // 2 for k in kernels) for eixo in (0, 1)]
+        forma = (antes[0] + depois[0] + 1, antes[1] + depois[1] + 1)
+        ancora = (antes[0], antes[1])
+    else:
+        forma = (max(k.shape[0] for k in kernels), max(k.shape[1] for k in kernels))
+        ancora = (0, 0)
+
+    pilha = np.zeros((len(kernels), *forma), np.float32)
+    for destino, kernel in zip(pilha, kernels):
+        y = ancora[0] - kernel.shape[0] // 2 if alinhar else 0
+        x = ancora[1] - kernel.shape[1] // 2 if alinhar else 0
+        destino[y : y + kernel.shape[0], x : x + kernel.shape[1]] = kernel
+    return pilha, ancora
+
+
+def _bytes_espectro(backend, forma, dft_size):
+    forma_espectro, tipo = backend.forma_espectro(forma, dft_size)
+    return int(np.prod(forma_espectro)) * np.dtype(tipo).itemsize
+
+
+def kernels_por_lote(forma_img, forma_kernel, qtd_kernels, memoria_max=None, alinhar=False, backend=None):
+    """
+    Calcula quantos kernels do banco cabem em um lote dentro do orçamento de memória.
+
+    O custo fixo é a imagem em float32 (com a borda, se alinhar) e o seu espectro; cada kernel
+    do lote acrescenta o seu espectro, o produto pelo espectro da imagem (um por canal) e o
+    resultado da inversa no tamanho da DFT. A saída KxHxW é do chamador e não entra na conta.
+
+    Args:
+        forma_img (tuple): A forma da imagem (HxW ou HxWxC).
+        forma_kernel (tuple): A forma comum dos kernels na pilha (ver empilhar_kernels).
+        qtd_kernels (int): O número de kernels do banco.
+        memoria_max (int, optional): O orçamento de memória de trabalho, em bytes. Padrão é
+                                     None (o banco inteiro em um lote só).
+        alinhar (bool, optional): Se a imagem recebe a borda do alinhamento. Padrão é False.
+        backend (optional): O backend de FFT. Padrão é o atual.
+
+    Returns:
+        tuple[int, tuple[int, int]]: Os kernels por lote e o tamanho (altura, largura) da DFT.
+
+    Raises:
+        ValueError: Se o orçamento não comportar nem um kernel por lote.
+    """
+    backend = backend or backend_fft()
+    altura, largura = forma_img[:2]
+    if alinhar:
+        altura, largura = altura + forma_kernel[0] - 1, largura + forma_kernel[1] - 1
+    dft_size = (cv2.getOptimalDFTSize(altura), cv2.getOptimalDFTSize(largura))
+    if memoria_max is None:
+        return qtd_kernels, dft_size
+
+    canais = tuple(forma_img[2:])
+    fixo = int(np.prod(canais, dtype=np.int64)) * altura * largura * 4 + _bytes_espectro(backend, (*canais, 1, 1), dft_size)
+    por_kernel = (
+        _bytes_espectro(backend, (1, 1), dft_size)
+        + _bytes_espectro(backend, (*canais, 1, 1), dft_size)
+        + int(np.prod(canais, dtype=np.int64)) * dft_size[0] * dft_size[1] * 4
+    )
+    lote = (int(memoria_max) - fixo) // por_kernel
+    if lote < 1:
+        minimo = (fixo + por_kernel) / 1024**2
+        raise ValueError(f"Orçamento de memória pequeno demais para o banco de filtros (mínimo ~{minimo:.0f} MiB).")
+    return min(lote, qtd_kernels), dft_size
+
+
+@perfilar()
+def banco_filtros(img, kernels, alinhar=False, backend=None, out=None, memoria_max=None):
+    """
+    Aplica um banco de kernels à mesma imagem no domínio da frequência, com uma única FFT da imagem.
+
+    Equivale a chamar convolucao_frequencia(img, kernel, alinhar=alinhar) para cada kernel,
+    mas a transformada direta da imagem é feita uma vez, o produto pelos espectros dos K
+    kernels é uma única operação vetorizada e as inversas são feitas em lote.
+
+    Args:
+        img (numpy.ndarray): A imagem de entrada, em tons de cinza (HxW) ou colorida (HxWxC).
+        kernels (numpy.ndarray or list[numpy.ndarray]): Os kernels 2D, como um array KxHkxWk
+                                                        ou uma lista (de tamanhos quaisquer).
+        alinhar (bool, optional): Se True, cada resultado reproduz o cv2.filter2D (correlação
+                                  com a âncora no centro e borda refletida), como na
+                                  convolucao_frequencia. Padrão é False (convolução circular).
+        backend (optional): O backend de FFT (ver components.fft). Padrão é o atual.
+        out (numpy.ndarray, optional): Um array pré-alocado Kx(forma da imagem), float32,
+                                       onde os resultados são gravados (pode ser um np.memmap).
+        memoria_max (int, optional): O orçamento de memória de trabalho, em bytes. Se o banco
+                                     inteiro não couber, é processado em lotes de kernels.
+                                     Padrão é None (um lote só).
+
+    Returns:
+        numpy.ndarray: Os K resultados, Kx(forma da imagem), em float32. É o próprio out, se fornecido.
+
+    Raises:
+        ValueError: Se os kernels forem inválidos, se o out não tiver a forma e o tipo do
+                    resultado ou se o orçamento de memória for pequeno demais.
+    """
+    pilha, (a_y, a_x) = empilhar_kernels(kernels, alinhar)
+    qtd, k_h, k_w = pilha.shape
+    altura, largura = img.shape[:2]
+    out = verificar_saida(out, (qtd, *img.shape), np.float32)
+    if out is None:
+        out = np.empty((qtd, *img.shape), np.float32)
+    backend = backend or backend_fft()
+    lote, dft_size = kernels_por_lote(img.shape, (k_h, k_w), qtd, memoria_max, alinhar, backend)
+
+    # A imagem em planos float32 (CxHxW se colorida), com a borda refletida se alinhar,
+    # como na convolucao_frequencia
+    multicanal = img.ndim == 3
+    if multicanal:
+        planos = rascunho((img.shape[2], altura, largura), np.float32, "banco.planos")
+        np.copyto(planos, np.moveaxis(img, -1, 0), casting="unsafe")
+    else:
+        planos = rascunho(img.shape, np.float32, "banco.planos")
+        np.copyto(planos, img, casting="unsafe")
+    if alinhar:
+        com_borda = rascunho((*planos.shape[:-2], altura + k_h - 1, largura + k_w - 1), np.float32, "banco.borda")
+        for plano, destino in zip(planos.reshape(-1, altura, largura), com_borda.reshape(-1, *com_borda.shape[-2:])):
+            cv2.copyMakeBorder(
+                plano, a_y, k_h - 1 - a_y, a_x, k_w - 1 - a_x, cv2.BORDER_REFLECT_101, dst=destino
+            )
+        planos = com_borda
+        # Correlação: kernels espelhados e recorte a partir do canto oposto
+        pilha = np.ascontiguousarray(pilha[:, ::-1, ::-1])
+        inicio_y, inicio_x = k_h - 1, k_w - 1
+    else:
+        inicio_y, inicio_x = 0, 0
+
+    # 1. A única transformada direta da imagem
+    forma_espectro, tipo_espectro = backend.forma_espectro(planos.shape, dft_size)
+    espectro = backend.direta(planos, dft_size, out=rascunho(forma_espectro, tipo_espectro, "banco.espectro"))
+
+    # Rascunhos do tamanho de um lote cheio; o último lote usa só o começo deles
+    forma_produto, _ = backend.forma_espectro((lote, *planos.shape), dft_size)
+    produto_lote = rascunho(forma_produto, tipo_espectro, "banco.produto")
+    forma_inversa = (lote * int(np.prod(planos.shape[:-2], dtype=np.int64)), *dft_size)
+    inversa_lote = rascunho(forma_inversa, np.float32, "banco.inversa")
+
+    for inicio in range(0, qtd, lote):
+        fim = min(inicio + lote, qtd)
+        # 2. Espectros do lote de kernels (do cache, quando o mesmo banco já foi usado)
+        espectros_kernel = _espectro_kernel(pilha[inicio:fim], dft_size, backend=backend)
+
+        # 3. Produto vetorizado: Kx(C)xHxW, no rascunho do lote
+        produto = backend.multiplicar_banco(espectro, espectros_kernel, out=produto_lote[: fim - inicio])
+
+        # 4. Inversas em lote: os K (vezes C) planos em uma única chamada ao backend
+        produto = produto.reshape(-1, *produto.shape[-2:])
+        resultado = backend.inversa(produto, dft_size, out=inversa_lote[: produto.shape[0]])
+
+        # 5. Recorte do padding, direto na fatia correspondente da saída
+        resultado = resultado.reshape(fim - inicio, *planos.shape[:-2], *dft_size)
+        resultado = resultado[..., inicio_y : inicio_y + altura, inicio_x : inicio_x + largura]
+        if multicanal:
+            resultado = np.moveaxis(resultado, 1, -1)
+        np.copyto(out[inicio:fim], resultado)
+    return out
+
+
+def banco_exemplo(escalas=(1, 2, 4, 8), lado_media=31):
+    """
+    Monta um banco de filtros típico: bordas em quatro orientações, desfoques Gaussianos em
+    várias escalas, o Laplaciano e um filtro de média.
+
+    Args:
+        escalas (iterable[float], optional): Os desvios padrão dos desfoques. Padrão é (1, 2, 4, 8).
+        lado_media (int, optional): O lado do kernel de média. Padrão é 31.
+
+    Returns:
+        dict[str, numpy.ndarray]: Os kernels 2D float32, indexados por nome.
+    """
+    sobel_x = np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]], np.float32)
+    sobel_d = np.array([[-2, -1, 0], [-1, 0, 1], [0, 1, 2]], np.float32)
+    banco = {
+        "sobel_0": sobel_x,
+        "sobel_45": sobel_d,
+        "sobel_90": sobel_x.T.copy(),
+        "sobel_135": sobel_d[:, ::-1].copy(),
+    }
+    for sigma in escalas:
+        # Kernel com ±3 desvios padrão, como o tamanho automático do cv2.GaussianBlur
+        g = cv2.getGaussianKernel(2 * int(np.ceil(3 * sigma)) + 1, sigma, cv2.CV_32F)
+        banco[f"gauss_{sigma:g}"] = g @ g.T
+    banco["laplaciano"] = np.array([[0, 1, 0], [1, -4, 1], [0, 1, 0]], np.float32)
+    banco[f"media_{lado_media}"] = kernel_media(lado_media)
+    return banco
+
+
+def benchmark_banco(img, kernels, alinhar=True, memoria_max=None, repeticoes=5, aquecimento=1):
+    """
+    Compara o banco de filtros com uma chamada de convolucao_frequencia por kernel.
+
+    As duas versões gravam em saídas pré-alocadas e usam o cache de espectros de kernel
+    (aquecido nas execuções descartadas), então a diferença é a FFT direta da imagem
+    repetida K vezes e a multiplicação e as inversas feitas uma a uma.
+
+    Args:
+        img (numpy.ndarray): A imagem (em tons de cinza ou em cores).
+        kernels (list[numpy.ndarray]): Os kernels 2D do banco.
+        alinhar (bool, optional): Se os resultados reproduzem o cv2.filter2D. Padrão é True.
+        memoria_max (int, optional): O orçamento de memória do banco, em bytes. Padrão é None.
+        repeticoes (int, optional): Execuções medidas por versão. Padrão é 5.
+        aquecimento (int, optional): Execuções descartadas por versão. Padrão é 1.
+
+    Returns:
+        dict: Os tempos de cada versão (ver medir, sem as amostras) em "individual" e "banco",
+              "kernels", "kernels_por_lote" e "diferenca_maxima" entre os resultados.
+    """
+    kernels = list(kernels)
+    individual = np.empty((len(kernels), *img.shape), np.float32)
+    banco = np.empty_like(individual)
+
+    def um_por_um():
+        for kernel, destino in zip(kernels, individual):
+            convolucao_frequencia(img, kernel, alinhar=alinhar, out=destino)
+
+    def em_banco():
+        banco_filtros(img, kernels, alinhar=alinhar, out=banco, memoria_max=memoria_max)
+
+    tempos = {
+        nome: {chave: valor for chave, valor in medir(funcao, repeticoes=repeticoes, aquecimento=aquecimento).items()
+               if chave != "amostras"}
+        for nome, funcao in (("individual", um_por_um), ("banco", em_banco))
+    }
+    pilha, _ = empilhar_kernels(kernels, alinhar)
+    lote, _ = kernels_por_lote(img.shape, pilha.shape[1:], len(kernels), memoria_max, alinhar)
+    return {
+        **tempos,
+        "kernels": len(kernels),
+        "kernels_por_lote": lote,
+        "diferenca_maxima": float(np.abs(individual - banco).max()),
+    }
@@ -0,0 +1,249 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from components.fft import BACKENDS_FFT, backend_fft
+from components.buffers import rascunho
+from components.processamento import _espectro_kernel, converter_profundidade, convolucao_espacial
+
+# Estimativa de bytes de memória de trabalho por pixel do bloco (com halo), por método.
+# Espacial: cópia do bloco lido, resultado e um acumulador float32 dos passes separáveis.
+# Frequência: bloco em float32, meio espectro complex64, resultado da IDFT em float32 e
+# a parte correspondente do espectro do kernel (compartilhado, mas contado por segurança).
+_BYTES_POR_PIXEL = {"espacial": 8, "frequencia": 24}
+
+# Menor lado útil de bloco aceito; abaixo disso o halo domina o custo
+_LADO_MINIMO = 32
+
+
+def abrir_matriz(caminho, forma=None, dtype=None, modo="r"):
+    """
+    Abre uma matriz em disco como np.memmap, sem carregá-la na memória.
+
+    Args:
+        caminho (str): Arquivo .npy (formato e tipo lidos do cabeçalho) ou binário cru.
+        forma (tuple, optional): O formato (altura, largura[, canais]). Obrigatório para arquivos crus.
+        dtype (str or numpy.dtype, optional): O tipo de dados. Obrigatório para arquivos crus.
+        modo (str, optional): O modo de abertura ("r" leitura, "r+" leitura e escrita). Padrão é "r".
+
+    Returns:
+        numpy.memmap: A matriz mapeada em memória.
+
+    Raises:
+        ValueError: Se forma ou dtype não forem informados para um arquivo cru.
+    """
+    if caminho.lower().endswith(".npy"):
+        return np.load(caminho, mmap_mode=modo)
+    if forma is None or dtype is None:
+        raise ValueError("Arquivos crus precisam da forma e do dtype da matriz.")
+    return np.memmap(caminho, dtype=dtype, mode=modo, shape=tuple(forma))
+
+
+def criar_matriz(caminho, forma, dtype):
+    """
+    Cria em disco uma matriz mapeada em memória, para receber a saída bloco a bloco.
+
+    Args:
+        caminho (str): Arquivo .npy (com cabeçalho) ou binário cru (qualquer outra extensão).
+        forma (tuple): O formato da matriz.
+        dtype (str or numpy.dtype): O tipo de dados.
+
+    Returns:
+        numpy.memmap: A matriz criada, aberta para escrita.
+    """
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    if caminho.lower().endswith(".npy"):
+        return np.lib.format.open_memmap(caminho, mode="w+", dtype=dtype, shape=tuple(forma))
+    return np.memmap(caminho, dtype=dtype, mode="w+", shape=tuple(forma))
+
+
+def planejar_blocos(forma, forma_kernel, metodo="espacial", memoria_max=256 * 1024**2, trabalhadores=None, itemsize=1):
+    """
+    Escolhe o tamanho dos blocos e o número de trabalhadores para caber no orçamento de memória.
+
+    O orçamento é dividido igualmente entre os trabalhadores, e cada um processa um bloco
+    (com o halo do kernel) por vez, então a memória de pico não depende do tamanho da imagem.
+    Na frequência, o bloco com halo tem o tamanho ótimo de DFT (cv2.getOptimalDFTSize).
+
+    Args:
+        forma (tuple): O formato da imagem (altura, largura[, canais]).
+        forma_kernel (tuple): O formato do kernel (altura, largura).
+        metodo (str, optional): "espacial" ou "frequencia". Padrão é "espacial".
+        memoria_max (int, optional): O orçamento de memória de trabalho, em bytes. Padrão é 256 MiB.
+        trabalhadores (int, optional): O número de threads. Padrão é o número de CPUs.
+        itemsize (int, optional): Bytes por amostra da imagem de entrada. Padrão é 1 (uint8).
+
+    Returns:
+        dict: "bloco" (altura, largura úteis), "trabalhadores" e, na frequência, "dft" (tamanho da DFT).
+
+    Raises:
+        ValueError: Se o orçamento não comportar nem um bloco mínimo.
+    """
+    k_h, k_w = forma_kernel
+    canais = forma[2] if len(forma) == 3 else 1
+    bytes_pixel = (_BYTES_POR_PIXEL[metodo] + 2 * itemsize) * canais
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+
+    # Reduz o número de trabalhadores até que cada um tenha espaço para um bloco mínimo
+    while trabalhadores > 1 and memoria_max // trabalhadores < bytes_pixel * (_LADO_MINIMO + k_h) * (_LADO_MINIMO + k_w):
+        trabalhadores -= 1
+    lado = int(np.sqrt((memoria_max // trabalhadores) / bytes_pixel))
+    if lado - max(k_h, k_w) + 1 < _LADO_MINIMO:
+        raise ValueError(f"memoria_max={memoria_max} bytes não comporta um bloco com o halo de um kernel {k_h}x{k_w}.")
+
+    plano = {"trabalhadores": trabalhadores}
+    if metodo == "frequencia":
+        # Maior tamanho de DFT eficiente que cabe no lado disponível
+        n = lado
+        while cv2.getOptimalDFTSize(n) > lado:
+            n -= 1
+        n = cv2.getOptimalDFTSize(n)
+        util_h = min(n - k_h + 1, forma[0])
+        util_w = min(n - k_w + 1, forma[1])
+        plano["dft"] = (cv2.getOptimalDFTSize(util_h + k_h - 1), cv2.getOptimalDFTSize(util_w + k_w - 1))
+    else:
+        util_h = min(lado - k_h + 1, forma[0])
+        util_w = min(lado - k_w + 1, forma[1])
+    plano["bloco"] = (util_h, util_w)
+    return plano
+
+
+def _ler_bloco_com_halo(entrada, y0, y1, x0, x1, forma_kernel):
+    # Lê a região [y0:y1, x0:x1] com o halo do kernel. Onde o halo sai da imagem, ele é
+    # preenchido por reflexão (BORDER_REFLECT_101), exatamente como o filter2D faria na
+    # imagem inteira; no interior, o halo vem dos pixels vizinhos reais.
+    k_h, k_w = forma_kernel
+    a_y, a_x = k_h // 2, k_w // 2
+    altura, largura = entrada.shape[:2]
+    ly0, ly1 = max(y0 - a_y, 0), min(y1 + k_h - 1 - a_y, altura)
+    lx0, lx1 = max(x0 - a_x, 0), min(x1 + k_w - 1 - a_x, largura)
+    bloco = np.ascontiguousarray(entrada[ly0:ly1, lx0:lx1])
+    return cv2.copyMakeBorder(
+        bloco,
+        ly0 - (y0 - a_y),
+        (y1 + k_h - 1 - a_y) - ly1,
+        lx0 - (x0 - a_x),
+        (x1 + k_w - 1 - a_x) - lx1,
+        cv2.BORDER_REFLECT_101,
+    )
+
+
+def _bloco_espacial(bloco, kernel):
+    # O bloco já tem o halo: basta filtrar e recortar a parte válida (o modo de borda não a afeta)
+    k_h, k_w = kernel.shape
+    a_y, a_x = k_h // 2, k_w // 2
+    filtrado = convolucao_espacial(bloco, kernel)
+    return filtrado[a_y : bloco.shape[0] - (k_h - 1 - a_y), a_x : bloco.shape[1] - (k_w - 1 - a_x)]
+
+
+def _bloco_frequencia(bloco, kernel, dft_size, backend):
+    # Overlap-save: a convolução circular de um bloco com halo, em uma DFT de tamanho fixo,
+    # é exata na parte válida (sem "wrap-around"); o resto é descartado. Com a DFT de tamanho
+    # fixo, todos os blocos compartilham o mesmo espectro do kernel no cache.
+    k_h, k_w = kernel.shape
+    util_h, util_w = bloco.shape[0] - k_h + 1, bloco.shape[1] - k_w + 1
+    espectro = _espectro_kernel(kernel[::-1, ::-1], dft_size, backend=backend)
+    # Blocos coloridos viram C planos contíguos, transformados em uma única chamada.
+    # Os blocos têm quase sempre o mesmo tamanho, então os planos e os espectros vêm do pool
+    # de rascunho de cada thread (ver components.buffers) em vez de serem alocados por bloco.
+    origem = np.moveaxis(bloco, -1, 0) if bloco.ndim == 3 else bloco
+    planos = rascunho(origem.shape, np.float32, "blocos.planos")
+    np.copyto(planos, origem, casting="unsafe")
+    forma_espectro, tipo_espectro = backend.forma_espectro(planos.shape, dft_size)
+    espectro_bloco = backend.direta(planos, dft_size, out=rascunho(forma_espectro, tipo_espectro, "blocos.espectro"))
+    inversa = backend.inversa(
+        backend.multiplicar(espectro_bloco, espectro),
+        dft_size,
+        out=rascunho((*planos.shape[:-2], *dft_size), np.float32, "blocos.inversa"),
+    )
+    resultado = inversa[..., k_h - 1 : k_h - 1 + util_h, k_w - 1 : k_w - 1 + util_w]
+    if bloco.ndim == 3:
+        resultado = np.moveaxis(resultado, 0, -1)
+    # Para blocos float32 o retorno é uma vista do rascunho, copiada para a saída logo em seguida
+    return converter_profundidade(resultado, bloco.dtype)
+
+
+def convolucao_blocos(entrada, saida, kernel, metodo="espacial", memoria_max=256 * 1024**2, trabalhadores=None):
+    """
+    Aplica uma convolução a uma imagem maior que a memória, bloco a bloco.
+
+    A entrada e a saída ficam em disco (np.memmap); só os blocos em processamento ficam
+    na memória. Cada bloco é lido com um halo do tamanho do kernel, para que o resultado
+    seja o da convolucao_espacial (cv2.filter2D) na imagem inteira, a menos de
+    arredondamento: até 1 nível em imagens inteiras (uint8) e um erro relativo de até ~1e-6
+    do maior valor em float32 (~1e-4 em dados de 0 a 255). Mesmo no método "espacial" o
+    resultado pode mudar, pois o filter2D usa uma DFT interna em kernels grandes e ela
+    depende do tamanho do bloco:
+        - "espacial": convolucao_espacial em cada bloco com halo, mantendo só a parte válida.
+        - "frequencia": overlap-save, com uma DFT de tamanho fixo por bloco.
+    Os blocos são distribuídos entre threads (o OpenCV e as FFTs liberam o GIL). Com mais
+    de uma thread de blocos, cada FFT usa uma thread só, para não disputar os núcleos.
+
+    Args:
+        entrada (numpy.ndarray or str): A imagem de entrada (array ou np.memmap), ou o
+                                        caminho de um arquivo .npy.
+        saida (numpy.ndarray or str): O array de saída, do mesmo formato da entrada, ou o
+                                      caminho do arquivo .npy/cru a ser criado.
+        kernel (numpy.ndarray): O kernel 2D.
+        metodo (str, optional): "espacial" (padrão) ou "frequencia".
+        memoria_max (int, optional): O orçamento de memória de trabalho, em bytes. Padrão é 256 MiB.
+        trabalhadores (int, optional): O número de threads. Padrão é o número de CPUs.
+
+    Returns:
+        numpy.ndarray: O array de saída (np.memmap, se a saída for um arquivo).
+
+    Raises:
+        ValueError: Se o método for desconhecido ou o orçamento de memória for pequeno demais.
+    """
+    if metodo not in _BYTES_POR_PIXEL:
+        raise ValueError(f"Método desconhecido: {metodo}. Opções: {', '.join(_BYTES_POR_PIXEL)}")
+    if isinstance(entrada, str):
+        entrada = abrir_matriz(entrada)
+    if isinstance(saida, str):
+        saida = criar_matriz(saida, entrada.shape, entrada.dtype)
+    kernel = np.asarray(kernel, dtype=np.float32)
+
+    plano = planejar_blocos(entrada.shape, kernel.shape, metodo, memoria_max, trabalhadores, entrada.dtype.itemsize)
+    bloco_h, bloco_w = plano["bloco"]
+    altura, largura = entrada.shape[:2]
+    backend = backend_fft()
+    if plano["trabalhadores"] > 1 and backend.trabalhadores > 1:
+        # O paralelismo já vem dos blocos; o espectro tem o mesmo formato, então o cache é compartilhado
+        backend = BACKENDS_FFT[backend.nome](1)
+
+    def processar(origem):
+        y0, x0 = origem
+        y1, x1 = min(y0 + bloco_h, altura), min(x0 + bloco_w, largura)
+        bloco = _ler_bloco_com_halo(entrada, y0, y1, x0, x1, kernel.shape)
+        if metodo == "espacial":
+            saida[y0:y1, x0:x1] = _bloco_espacial(bloco, kernel)
+        else:
+            saida[y0:y1, x0:x1] = _bloco_frequencia(bloco, kernel, plano["dft"], backend)
+
+    origens = [(y, x) for y in range(0, altura, bloco_h) for x in range(0, largura, bloco_w)]
+    with ThreadPoolExecutor(max_workers=plano["trabalhadores"]) as executor:
+        # list() propaga a primeira exceção de qualquer bloco
+        list(executor.map(processar, origens))
+
+    if isinstance(saida, np.memmap):
+        saida.flush()
+    return saida
+
+
+def parse_memoria(texto):
+    """
+    Converte um tamanho de memória como "512M", "2G" ou "1048576" em bytes.
+
+    Args:
+        texto (str): O tamanho, com sufixo opcional K, M ou G (potências de 1024).
+
+    Returns:
+        int: O tamanho em bytes.
+    """
+    texto = texto.strip().upper().rstrip("B")
+    multiplicadores = {"K": 1024, "M": 1024**2, "G": 1024**3}
+    if texto and texto[-1] in multiplicadores:
+        return int(float(texto[:-1]) * multiplicadores[texto[-1]])
+    return int(texto)
@@ -0,0 +1,126 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Pool de buffers temporários (rascunho) reaproveitados entre chamadas.
+# Processar em sequência imagens do mesmo tamanho (um lote, os quadros de um vídeo) pede
+# sempre os mesmos intermediários: a imagem borrada, a máscara, a imagem em float32, os
+# espectros da FFT. Em vez de alocar (e paginar) arrays novos a cada imagem, cada função
+# pede ao pool um buffer identificado por um nome, pela forma e pelo dtype; na chamada
+# seguinte com a mesma chave, o mesmo buffer é devolvido.
+#
+# O pool é separado por thread (threading.local): um buffer nunca é entregue a duas threads
+# ao mesmo tempo, e as funções continuam seguras para uso em pools de threads. O conteúdo de
+# um buffer só vale até a próxima chamada com a mesma chave na mesma thread, então ele nunca
+# deve ser retornado ao chamador (os resultados continuam sendo arrays novos, ou o dst=).
+_local = threading.local()
+_configuracao = {"max_bytes": 256 * 1024 * 1024}
+
+
+def _pool():
+    # O pool (e as estatísticas) da thread atual, criado no primeiro uso
+    pool = getattr(_local, "pool", None)
+    if pool is None:
+        pool = _local.pool = OrderedDict()
+        _local.info = {"bytes": 0, "hits": 0, "misses": 0}
+    return pool
+
+
+def configurar_buffers(max_bytes):
+    """
+    Define o limite de memória do pool de buffers temporários de cada thread.
+
+    Args:
+        max_bytes (int): O total de bytes mantidos por thread (0 desativa o pool). Os buffers
+                         menos usados recentemente são descartados primeiro.
+    """
+    _configuracao["max_bytes"] = max(0, int(max_bytes))
+    _reduzir(_pool())
+
+
+def limpar_buffers():
+    """Descarta os buffers temporários da thread atual e zera as estatísticas."""
+    _pool().clear()
+    _local.info.update(bytes=0, hits=0, misses=0)
+
+
+def estatisticas_buffers():
+    """
+    Retorna as estatísticas do pool de buffers temporários da thread atual.
+
+    Returns:
+        dict: "entradas", "bytes", "max_bytes", "hits" (buffers reaproveitados) e "misses"
+              (buffers alocados).
+    """
+    pool = _pool()
+    return {"entradas": len(pool), "max_bytes": _configuracao["max_bytes"], **_local.info}
+
+
+def _reduzir(pool):
+    # Descarta os buffers menos usados recentemente até caber no limite
+    while pool and _local.info["bytes"] > _configuracao["max_bytes"]:
+        _, buffer = pool.popitem(last=False)
+        _local.info["bytes"] -= buffer.nbytes
+
+
+def rascunho(forma, dtype, nome=""):
+    """
+    Retorna um buffer temporário (não inicializado) da thread atual.
+
+    Args:
+        forma (tuple): A forma do buffer.
+        dtype (numpy.dtype): O tipo de dados do buffer.
+        nome (str, optional): Identifica o uso do buffer, para que dois intermediários da
+                              mesma forma e tipo usados ao mesmo tempo não compartilhem memória
+                              (ex: "high_boost.blur" e "high_boost.mascara").
+
+    Returns:
+        numpy.ndarray: O buffer. Seu conteúdo só é válido até a próxima chamada com o mesmo
+                       nome, forma e dtype na mesma thread.
+    """
+    forma = tuple(int(n) for n in forma)
+    dtype = np.dtype(dtype)
+    chave = (nome, forma, dtype.str)
+    pool = _pool()
+    buffer = pool.get(chave)
+    if buffer is not None:
+        pool.move_to_end(chave)
+        _local.info["hits"] += 1
+        return buffer
+
+    _local.info["misses"] += 1
+    buffer = np.empty(forma, dtype)
+    if buffer.nbytes <= _configuracao["max_bytes"]:
+        pool[chave] = buffer
+        _local.info["bytes"] += buffer.nbytes
+        _reduzir(pool)
+    return buffer
+
+
+def verificar_saida(dst, forma, dtype):
+    """
+    Confere se um buffer de saída fornecido pelo chamador (dst=/out=) serve para o resultado.
+
+    O OpenCV realocaria silenciosamente um dst incompatível e devolveria outro array; aqui
+    a incompatibilidade vira um erro explícito.
+
+    Args:
+        dst (numpy.ndarray or None): O buffer de saída (None é aceito e retornado como está).
+        forma (tuple): A forma esperada.
+        dtype (numpy.dtype): O tipo de dados esperado.
+
+    Returns:
+        numpy.ndarray or None: O próprio dst.
+
+    Raises:
+        ValueError: Se o dst tiver outra forma ou tipo, não for contíguo ou não permitir escrita.
+    """
+    if dst is None:
+        return None
+    if dst.shape != tuple(forma) or dst.dtype != np.dtype(dtype):
+        raise ValueError(f"O buffer de saída deve ter forma {tuple(forma)} e tipo {np.dtype(dtype)} "
+                         f"(recebido: {dst.shape}/{dst.dtype}).")
+    if not dst.flags.c_contiguous or not dst.flags.writeable:
+        raise ValueError("O buffer de saída deve ser contíguo e permitir escrita.")
+    return dst
@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+
+# Cliente do servidor de processamento (ver components/servidor.py).
+# Este módulo usa só a biblioteca padrão, para que um cliente de linha de comando não pague
+# a importação do OpenCV e do NumPy, que é justamente o custo que o servidor evita.
+#
+# Protocolo: uma conexão (socket Unix ou TCP em localhost) carrega vários pedidos; cada
+# pedido e cada resposta é um objeto JSON em uma linha.
+#     pedido:   {"operacao": "high-boost", "entradas": ["src/01.jpeg"],
+#                "parametros": {"A": 2.0}, "saida": "out/01_hb.jpg"}
+#     resposta: {"ok": true, "resultado": {...}, "tempo_ms": 12.3}
+#               {"ok": false, "erro": "FileNotFoundError: ..."}
+# O servidor resolve caminhos relativos no diretório dele; por isso ClienteServidor.executar
+# envia os caminhos já absolutos (relativos ao diretório de quem chamou).
+
+
+def _endereco_padrao():
+    # Socket Unix no diretório temporário (um por usuário); sem AF_UNIX, TCP em localhost
+    if os.environ.get("VCRM_SERVIDOR"):
+        return os.environ["VCRM_SERVIDOR"]
+    if hasattr(socket, "AF_UNIX"):
+        usuario = os.getuid() if hasattr(os, "getuid") else os.getpid()
+        return os.path.join(tempfile.gettempdir(), f"vcrm-{usuario}.sock")
+    return "127.0.0.1:8765"
+
+
+ENDERECO_PADRAO = _endereco_padrao()
+
+
+def analisar_endereco(endereco):
+    """
+    Interpreta o endereço do servidor.
+
+    Args:
+        endereco (str): O caminho de um socket Unix ou "host:porta" para TCP.
+
+    Returns:
+        tuple: (família do socket, endereço no formato do módulo socket).
+    """
+    host, _, porta = endereco.rpartition(":")
+    if host and porta.isdigit() and os.sep not in endereco:
+        return socket.AF_INET, (host, int(porta))
+    return socket.AF_UNIX, endereco
+
+
+class ClienteServidor:
+    """
+    Cliente do servidor de processamento, com uma conexão mantida entre os pedidos.
+
+    Uso típico:
+        with ClienteServidor() as cliente:
+            resultado = cliente.executar("high-boost", ["src/01.jpeg"], {"A": 2.0}, saida="out/hb.jpg")
+
+    Args:
+        endereco (str, optional): O endereço do servidor. Padrão é ENDERECO_PADRAO (variável
+                                  de ambiente VCRM_SERVIDOR, ou um socket Unix no diretório
+                                  temporário).
+        timeout (float, optional): O tempo máximo de espera por uma resposta, em segundos.
+                                   Padrão é sem limite.
+    """
+
+    def __init__(self, endereco=None, timeout=None):
+        self.endereco = endereco or ENDERECO_PADRAO
+        self.timeout = timeout
+        self._socket = None
+        self._arquivo = None
+
+    def conectar(self):
+        """
+        Abre a conexão, se ainda não estiver aberta.
+
+        Raises:
+            ConnectionError: Se não houver servidor no endereço.
+        """
+        if self._socket is not None:
+            return
+        familia, endereco = analisar_endereco(self.endereco)
+        sock = socket.socket(familia, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(endereco)
+        except (FileNotFoundError, ConnectionRefusedError) as exc:
+            sock.close()
+            raise ConnectionError(f"Nenhum servidor em {self.endereco} (inicie com: python main.py servidor)") from exc
+        self._socket = sock
+        self._arquivo = sock.makefile("rb")
+
+    def enviar(self, pedido):
+        """
+        Envia um pedido e espera a resposta.
+
+        Args:
+            pedido (dict): O pedido (ver o protocolo no início deste módulo).
+
+        Returns:
+            dict: A resposta do servidor, com "ok" e "resultado" ou "erro".
+
+        Raises:
+            ConnectionError: Se o servidor fechar a conexão sem responder.
+        """
+        self.conectar()
+        self._socket.sendall(json.dumps(pedido).encode("utf-8") + b"\n")
+        linha = self._arquivo.readline()
+        if not linha:
+            self.fechar()
+            raise ConnectionError(f"O servidor em {self.endereco} fechou a conexão.")
+        return json.loads(linha)
+
+    def executar(self, operacao, entradas=(), parametros=None, saida=None):
+        """
+        Executa uma operação no servidor.
+
+        Args:
+            operacao (str): O nome da operação (ex: "high-boost"; ver OPERACOES_SERVIDOR).
+            entradas (list[str], optional): Os caminhos das imagens de entrada. Caminhos relativos
+                                            são relativos ao diretório atual do cliente.
+            parametros (dict, optional): Os parâmetros da operação (ex: {"A": 2.0}).
+            saida (str, optional): Onde gravar a imagem resultante (relativo ao diretório atual
+                                   do cliente). Se None, nada é gravado.
+
+        Returns:
+            dict: O resultado da operação.
+
+        Raises:
+            RuntimeError: Se a operação falhar no servidor.
+        """
+        # O servidor pode rodar em outro diretório: os caminhos vão absolutos
+        entradas = [os.path.abspath(caminho) for caminho in entradas]
+        pedido = {"operacao": operacao, "entradas": entradas, "parametros": parametros or {}}
+        if saida is not None:
+            pedido["saida"] = os.path.abspath(saida)
+        resposta = self.enviar(pedido)
+        if not resposta.get("ok"):
+            raise RuntimeError(resposta.get("erro", "erro desconhecido"))
+        return resposta["resultado"]
+
+    def fechar(self):
+        """Fecha a conexão (o servidor continua rodando)."""
+        if self._socket is not None:
+            self._arquivo.close()
+            self._socket.close()
+            self._socket = self._arquivo = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        self.fechar()
+        return False
+
+
+def _valor_parametro(texto):
+    # "A=2" vira {"A": 2}; valores que não são JSON válido ficam como texto
+    chave, _, valor = texto.partition("=")
+    try:
+        return chave, json.loads(valor)
+    except ValueError:
+        return chave, valor
+
+
+def main(argv):
+    """
+    Envia uma operação ao servidor pela linha de comando e imprime o resultado em JSON.
+
+    Args:
+        argv (list[str]): Os argumentos (sem o nome do programa).
+
+    Returns:
+        int: O código de saída (0 se a operação foi executada, 1 caso contrário).
+    """
+    parser = argparse.ArgumentParser(description="Cliente do servidor de processamento de imagens.")
+    parser.add_argument("operacao", help="A operação (ex: high-boost, passa-alta, clusterizar, estado, encerrar).")
+    parser.add_argument("entradas", nargs="*", help="Os caminhos das imagens de entrada.")
+    parser.add_argument("-p", "--parametro", action="append", default=[], metavar="CHAVE=VALOR",
+                        help="Parâmetro da operação (valor em JSON, ex: -p A=2.0). Pode ser repetido.")
+    parser.add_argument("-o", "--saida", default=None, help="Onde gravar a imagem resultante.")
+    parser.add_argument("--endereco", default=None, help=f"Endereço do servidor (padrão: {ENDERECO_PADRAO}).")
+    args = parser.parse_args(argv)
+
+    parametros = dict(_valor_parametro(p) for p in args.parametro)
+    try:
+        with ClienteServidor(args.endereco) as cliente:
+            resultado = cliente.executar(args.operacao, args.entradas, parametros, args.saida)
+    except (ConnectionError, RuntimeError) as exc:
+        print(f"🚫 {exc}", file=sys.stderr)
+        return 1
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    return 0
@@ -0,0 +1,176 @@
+import math
+
+import cv2
+import numpy as np
+
+from components.perfil import perfilar
+
+# Parâmetros do SSIM (Wang et al., 2004): janela Gaussiana 11x11 com sigma 1.5
+_SSIM_JANELA = 11
+_SSIM_SIGMA = 1.5
+_SSIM_HALO = _SSIM_JANELA // 2
+
+
+def _faixa_dinamica(dtype):
+    # Maior valor possível de um pixel: 255 para uint8; imagens float são supostas em [0, 1]
+    if np.issubdtype(dtype, np.integer):
+        return float(np.iinfo(dtype).max)
+    return 1.0
+
+
+def _soma_ssim(a, b, faixa, inicio, fim):
+    # Soma do mapa SSIM (por canal) nas linhas [inicio:fim) de uma faixa lida com halo.
+    # O halo garante que a janela Gaussiana veja os mesmos vizinhos que veria na imagem inteira.
+    # As operações elemento a elemento usam o OpenCV (multithread e sem temporários extras).
+    c1 = (0.01 * faixa) ** 2
+    c2 = (0.03 * faixa) ** 2
+    a = a.astype(np.float32)
+    b = b.astype(np.float32)
+
+    def borrar(x):
+        return cv2.GaussianBlur(x, (_SSIM_JANELA, _SSIM_JANELA), _SSIM_SIGMA)
+
+    mu_a, mu_b = borrar(a), borrar(b)
+    mu_a2, mu_b2, mu_ab = cv2.multiply(mu_a, mu_a), cv2.multiply(mu_b, mu_b), cv2.multiply(mu_a, mu_b)
+    var_a = cv2.subtract(borrar(cv2.multiply(a, a)), mu_a2)
+    var_b = cv2.subtract(borrar(cv2.multiply(b, b)), mu_b2)
+    cov = cv2.subtract(borrar(cv2.multiply(a, b)), mu_ab)
+
+    # numerador = (2·mu_ab + c1)·(2·cov + c2); denominador = (mu_a² + mu_b² + c1)·(var_a + var_b + c2)
+    numerador = cv2.multiply(cv2.addWeighted(mu_ab, 2, mu_ab, 0, c1), cv2.addWeighted(cov, 2, cov, 0, c2))
+    denominador = cv2.multiply(cv2.addWeighted(mu_a2, 1, mu_b2, 1, c1), cv2.addWeighted(var_a, 1, var_b, 1, c2))
+    mapa = cv2.divide(numerador, denominador)[inicio:fim]
+    canais = mapa.shape[2] if mapa.ndim == 3 else 1
+    return np.array([cv2.sumElems(plano)[0] for plano in _planos(mapa)])[:canais]
+
+
+def _planos(img):
+    # Separa os canais de uma imagem (cv2.split não aceita imagens de 1 canal sem eixo de cor)
+    return cv2.split(img) if img.ndim == 3 else [img]
+
+
+@perfilar()
+def comparar_arrays(a, b, altura_faixa=256, parar_na_primeira=False, calcular_ssim=False):
+    """
+    Compara duas imagens do mesmo tamanho, faixa por faixa, em uma única passada.
+
+    Para cada faixa horizontal de linhas são acumulados, ao mesmo tempo, a contagem de
+    pixels diferentes, o retângulo que envolve as diferenças, a soma dos erros absolutos
+    e quadráticos por canal, o erro máximo por canal e a soma do mapa SSIM. Assim, só uma
+    faixa de cada imagem (mais os temporários do SSIM) fica em uso por vez.
+
+    Args:
+        a (numpy.ndarray): A primeira imagem (HxW ou HxWxC).
+        b (numpy.ndarray): A segunda imagem, com o mesmo formato e tipo.
+        altura_faixa (int, optional): Quantas linhas são processadas por vez. Padrão é 256.
+        parar_na_primeira (bool, optional): Se True, responde apenas "são idênticas?":
+                                            a comparação para na primeira faixa com diferença
+                                            e as métricas ficam incompletas. Padrão é False.
+        calcular_ssim (bool, optional): Se True, calcula também o SSIM médio, a etapa mais cara
+                                        da comparação (cerca de metade do tempo). Padrão é False.
+
+    Returns:
+        dict: "iguais", "pixels_totais", "pixels_diferentes", "percentual_diferenca",
+              "bounding_box" (esquerda, topo, direita, base) ou None, "mse", "psnr" (dB, inf se
+              iguais), "ssim" (ou None), "por_canal" (lista com mae, mse, erro máximo e ssim de
+              cada canal) e "completa" (False se a comparação parou antes do fim).
+
+    Raises:
+        ValueError: Se as imagens tiverem formatos ou tipos diferentes.
+    """
+    if a.shape != b.shape or a.dtype != b.dtype:
+        raise ValueError(f"As imagens precisam ter o mesmo formato e tipo ({a.shape}/{a.dtype} vs {b.shape}/{b.dtype}).")
+
+    altura, largura = a.shape[:2]
+    canais = a.shape[2] if a.ndim == 3 else 1
+    faixa = _faixa_dinamica(a.dtype)
+    pixels_totais = altura * largura
+
+    diferentes = 0
+    linhas_dif = []  # (primeira, última) linha com diferença
+    colunas_dif = [largura, -1]
+    soma_abs = np.zeros(canais)
+    soma_quad = np.zeros(canais)
+    maximo = np.zeros(canais)
+    soma_ssim = np.zeros(canais)
+    completa = True
+
+    for y0 in range(0, altura, altura_faixa):
+        y1 = min(y0 + altura_faixa, altura)
+        fa, fb = a[y0:y1], b[y0:y1]
+
+        # Diferença absoluta da faixa, separada por canal; um pixel difere se qualquer canal diferir
+        planos = _planos(cv2.absdiff(fa, fb))
+        maximo_faixa = planos[0]
+        for plano in planos[1:]:
+            maximo_faixa = cv2.max(maximo_faixa, plano)
+        n_dif = cv2.countNonZero(maximo_faixa)
+
+        if n_dif:
+            diferentes += n_dif
+            mascara = maximo_faixa > 0
+            linhas = np.flatnonzero(mascara.any(axis=1))
+            colunas = np.flatnonzero(mascara.any(axis=0))
+            if not linhas_dif:
+                linhas_dif = [y0 + linhas[0], y0 + linhas[-1]]
+            linhas_dif[1] = y0 + linhas[-1]
+            colunas_dif = [min(colunas_dif[0], colunas[0]), max(colunas_dif[1], colunas[-1])]
+
+            # Estatísticas por canal da faixa (somas em float64 feitas pelo OpenCV)
+            for c, plano in enumerate(planos):
+                soma_abs[c] += cv2.norm(plano, cv2.NORM_L1)
+                soma_quad[c] += cv2.norm(plano, cv2.NORM_L2SQR)
+                maximo[c] = max(maximo[c], cv2.norm(plano, cv2.NORM_INF))
+
+            if parar_na_primeira:
+                completa = False
+                break
+
+        if calcular_ssim:
+            # Lê a faixa com o halo da janela do SSIM (limitado às bordas da imagem)
+            h0, h1 = max(y0 - _SSIM_HALO, 0), min(y1 + _SSIM_HALO, altura)
+            soma_ssim += _soma_ssim(a[h0:h1], b[h0:h1], faixa, y0 - h0, y1 - h0)
+
+    bbox = None
+    if diferentes:
+        bbox = (int(colunas_dif[0]), int(linhas_dif[0]), int(colunas_dif[1]) + 1, int(linhas_dif[1]) + 1)
+
+    mse_canal = soma_quad / pixels_totais
+    mse = float(mse_canal.mean())
+    ssim_canal = soma_ssim / pixels_totais if calcular_ssim and completa else [None] * canais
+    return {
+        "iguais": diferentes == 0,
+        "pixels_totais": pixels_totais,
+        "pixels_diferentes": diferentes,
+        "percentual_diferenca": diferentes / pixels_totais * 100,
+        "bounding_box": bbox,
+        "mse": mse,
+        "psnr": psnr(mse, faixa),
+        "ssim": float(np.mean(ssim_canal)) if calcular_ssim and completa else None,
+        "por_canal": [
+            {
+                "mae": float(soma_abs[c] / pixels_totais),
+                "mse": float(mse_canal[c]),
+                "erro_maximo": float(maximo[c]),
+                "ssim": None if ssim_canal[c] is None else float(ssim_canal[c]),
+            }
+            for c in range(canais)
+        ],
+        "completa": completa,
+    }
+
+
+def psnr(mse, faixa=255.0):
+    """
+    Calcula a relação sinal-ruído de pico (PSNR) a partir do erro quadrático médio.
+
+    Args:
+        mse (float): O erro quadrático médio.
+        faixa (float, optional): O maior valor possível de um pixel. Padrão é 255.
+
+    Returns:
+        float: O PSNR em dB (infinito se as imagens forem idênticas).
+    """
+    if mse == 0:
+        return math.inf
+    return 10 * math.log10(faixa * faixa / mse)
@@ -0,0 +1,476 @@
+import csv
+import glob
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+from functools import partial
+
+import cv2
+import numpy as np
+
+from components.filtros import METODOS_HIGH_BOOST, filtro_high_boost, kernel_high_boost
+from components.processamento import convolucao_espacial, convolucao_frequencia, limpar_cache_espectros
+from components.utils import carregar_imagem
+
+# Tamanhos padrão da varredura: imagens sintéticas quadradas e kernels de 3x3 a 101x101
+TAMANHOS_IMAGEM_PADRAO = (256, 512, 1024, 2048)
+TAMANHOS_KERNEL_PADRAO = (3, 5, 7, 9, 11, 15, 21, 31, 41, 51, 71, 101)
+
+# Maior kernel medido pela convolucao_direta: o custo cresce com k², e acima disso uma única
+# execução em 2048² já leva segundos
+LADO_MAX_DIRETA = 15
+
+
+def convolucao_direta(img, kernel):
+    """
+    Convolução direta no domínio espacial: uma soma de fatias deslocadas da imagem, uma por
+    elemento do kernel, sem nenhum atalho por FFT.
+
+    É a convolução "pelo operador" que o Teorema da Convolução compara com a frequência. O
+    cv2.filter2D não serve de referência para isso: a partir de kernels de ~11x11 (área) ele
+    passa a usar uma DFT internamente. O resultado é o mesmo do filter2D (correlação, âncora
+    no centro e borda BORDER_REFLECT_101), a menos de arredondamento.
+
+    Args:
+        img (numpy.ndarray): A imagem em tons de cinza.
+        kernel (numpy.ndarray): O kernel 2D.
+
+    Returns:
+        numpy.ndarray: A imagem filtrada, com o tipo da imagem de entrada (saturada).
+    """
+    k_h, k_w = kernel.shape
+    altura, largura = img.shape[:2]
+    borda = cv2.copyMakeBorder(
+        img.astype(np.float32), k_h // 2, k_h - 1 - k_h // 2, k_w // 2, k_w - 1 - k_w // 2, cv2.BORDER_REFLECT_101
+    )
+    acumulado = np.zeros((altura, largura), np.float32)
+    for (dy, dx), peso in np.ndenumerate(kernel):
+        if peso:
+            cv2.scaleAdd(borda[dy : dy + altura, dx : dx + largura], float(peso), acumulado, dst=acumulado)
+    if np.issubdtype(img.dtype, np.integer):
+        limites = np.iinfo(img.dtype)
+        return np.clip(np.rint(acumulado), limites.min, limites.max).astype(img.dtype)
+    return acumulado.astype(img.dtype, copy=False)
+
+
+# Métodos de convolução comparados, indexados pelo nome usado nos relatórios.
+# - "direta": a soma de fatias deslocadas (convolucao_direta), a convolução espacial sem atalhos
+#   que o Teorema da Convolução compara com a FFT; só medida até LADO_MAX_DIRETA.
+# - "espacial": o cv2.filter2D 2D, que é híbrido: a partir de kernels de ~11x11 ele mesmo usa
+#   uma DFT, então acima disso o cruzamento com ele compara FFT com FFT.
+# - "separavel": as passadas 1D (sepFilter2D); os kernels de média da varredura têm posto 1.
+# - "frequencia": a convolucao_frequencia com alinhar=True, o mesmo resultado (âncora no centro
+#   e borda refletida) dos métodos espaciais, e não a convolução circular, mais barata.
+METODOS_CONVOLUCAO = {
+    "direta": convolucao_direta,
+    "espacial": partial(convolucao_espacial, separavel=False),
+    "separavel": partial(convolucao_espacial, separavel=True),
+    "frequencia": partial(convolucao_frequencia, alinhar=True),
+}
+
+
+def medir(funcao, *args, repeticoes=5, aquecimento=1, antes=None):
+    """
+    Mede o tempo de execução de uma função com aquecimento e repetições.
+
+    As execuções de aquecimento não entram nas estatísticas: elas absorvem custos únicos
+    como alocação de memória, carregamento de bibliotecas e preenchimento de caches.
+
+    Args:
+        funcao (callable): A função a ser medida.
+        *args: Os argumentos passados para a função.
+        repeticoes (int, optional): Quantas execuções são medidas. Padrão é 5.
+        aquecimento (int, optional): Quantas execuções são descartadas antes da medição. Padrão é 1.
+        antes (callable, optional): Função chamada (fora da medição) antes de cada execução,
+                                    por exemplo para limpar um cache.
+
+    Returns:
+        dict: Mediana, primeiro e terceiro quartis, IQR, mínimo (em segundos) e as amostras.
+    """
+    for _ in range(aquecimento):
+        if antes is not None:
+            antes()
+        funcao(*args)
+
+    amostras = []
+    for _ in range(repeticoes):
+        if antes is not None:
+            antes()
+        inicio = time.perf_counter()
+        funcao(*args)
+        amostras.append(time.perf_counter() - inicio)
+
+    q1, mediana, q3 = np.percentile(amostras, [25, 50, 75])
+    return {
+        "mediana": float(mediana),
+        "q1": float(q1),
+        "q3": float(q3),
+        "iqr": float(q3 - q1),
+        "minimo": float(min(amostras)),
+        "amostras": amostras,
+    }
+
+
+def imagem_sintetica(altura, largura, semente=0):
+    """
+    Gera uma imagem sintética determinística em tons de cinza (ruído uniforme uint8).
+
+    Args:
+        altura (int): A altura da imagem.
+        largura (int): A largura da imagem.
+        semente (int, optional): A semente do gerador aleatório. Padrão é 0.
+
+    Returns:
+        numpy.ndarray: A imagem gerada.
+    """
+    return np.random.default_rng(semente).integers(0, 256, size=(altura, largura), dtype=np.uint8)
+
+
+def kernel_media(tamanho):
+    """
+    Cria um kernel de média (box) normalizado de tamanho x tamanho.
+
+    Args:
+        tamanho (int): O lado do kernel.
+
+    Returns:
+        numpy.ndarray: O kernel em float32.
+    """
+    return np.ones((tamanho, tamanho), np.float32) / (tamanho * tamanho)
+
+
+def ponto_de_cruzamento(resultados, base="espacial"):
+    """
+    Encontra o menor tamanho de kernel a partir do qual a convolução na frequência
+    é mais rápida que a espacial (comparando as medianas).
+
+    O cruzamento só é aceito se a frequência continuar vencendo para todos os kernels
+    maiores medidos, para que uma única medição ruidosa não desloque o resultado.
+
+    Args:
+        resultados (list[dict]): As linhas de uma mesma imagem, como retornadas por
+                                 benchmark_convolucao.
+        base (str, optional): O método espacial comparado com a frequência: "espacial"
+                              (cv2.filter2D, padrão), "direta" (soma de fatias, só nos
+                              kernels em que foi medida) ou "separavel" (passadas 1D).
+
+    Returns:
+        int or None: O tamanho do kernel do cruzamento, ou None se a frequência nunca vence.
+    """
+    medianas = {}
+    for linha in resultados:
+        medianas.setdefault(linha["kernel"], {})[linha["metodo"]] = linha["mediana"]
+
+    cruzamento = None
+    for tamanho in sorted(medianas, reverse=True):
+        tempos = medianas[tamanho]
+        if base not in tempos or "frequencia" not in tempos:
+            continue
+        if tempos["frequencia"] < tempos[base]:
+            cruzamento = tamanho
+        else:
+            break
+    return cruzamento
+
+
+def _imagens_do_benchmark(tamanhos_imagem, caminhos_imagem):
+    # Gera pares (nome, imagem) com as imagens sintéticas e as imagens reais (em tons de cinza)
+    for tamanho in tamanhos_imagem:
+        yield f"sintetica_{tamanho}x{tamanho}", imagem_sintetica(tamanho, tamanho)
+    for caminho in caminhos_imagem:
+        yield os.path.basename(caminho), carregar_imagem(caminho, cv2.IMREAD_GRAYSCALE)
+
+
+def benchmark_convolucao(
+    tamanhos_imagem=TAMANHOS_IMAGEM_PADRAO,
+    caminhos_imagem=(),
+    tamanhos_kernel=TAMANHOS_KERNEL_PADRAO,
+    repeticoes=5,
+    aquecimento=1,
+    com_cache=True,
+    verbose=True,
+):
+    """
+    Compara a convolução espacial e a convolução na frequência em uma varredura de
+    tamanhos de imagem e de kernel.
+
+    Args:
+        tamanhos_imagem (iterable[int], optional): Lados das imagens sintéticas quadradas.
+        caminhos_imagem (iterable[str], optional): Imagens reais incluídas na varredura.
+        tamanhos_kernel (iterable[int], optional): Lados dos kernels de média testados.
+        repeticoes (int, optional): Execuções medidas por combinação. Padrão é 5.
+        aquecimento (int, optional): Execuções descartadas por combinação. Padrão é 1.
+        com_cache (bool, optional): Se True (padrão), o espectro do kernel fica no cache entre
+                                    as execuções, como no processamento de uma sequência de
+                                    imagens. Se False, o cache é limpo antes de cada execução.
+        verbose (bool, optional): Se True, imprime o progresso. Padrão é True.
+
+    Returns:
+        dict: Metadados da máquina, as linhas de medição e o cruzamento por imagem da frequência
+              com o filter2D ("cruzamentos"), com a convolução direta ("cruzamentos_direta",
+              procurado só até LADO_MAX_DIRETA) e com as passadas separáveis
+              ("cruzamentos_separavel"). O tempo da frequência é o da saída alinhada.
+    """
+    linhas = []
+    cruzamentos = {}
+    cruzamentos_direta = {}
+    cruzamentos_separavel = {}
+    antes = None if com_cache else limpar_cache_espectros
+
+    for nome, img in _imagens_do_benchmark(tamanhos_imagem, caminhos_imagem):
+        linhas_imagem = []
+        for tamanho in tamanhos_kernel:
+            kernel = kernel_media(tamanho)
+            for metodo, funcao in METODOS_CONVOLUCAO.items():
+                if metodo == "direta" and tamanho > LADO_MAX_DIRETA:
+                    continue
+                estatisticas = medir(funcao, img, kernel, repeticoes=repeticoes, aquecimento=aquecimento, antes=antes)
+                linha = {
+                    "imagem": nome,
+                    "altura": img.shape[0],
+                    "largura": img.shape[1],
+                    "kernel": tamanho,
+                    "metodo": metodo,
+                    "mediana": estatisticas["mediana"],
+                    "q1": estatisticas["q1"],
+                    "q3": estatisticas["q3"],
+                    "iqr": estatisticas["iqr"],
+                    "minimo": estatisticas["minimo"],
+                    "repeticoes": repeticoes,
+                }
+                linhas_imagem.append(linha)
+                if verbose:
+                    print(
+                        f"  ⤷ {nome} ({img.shape[1]}x{img.shape[0]}) kernel {tamanho}x{tamanho} "
+                        f"{metodo}: {linha['mediana'] * 1000:.3f} ms (IQR {linha['iqr'] * 1000:.3f} ms)"
+                    )
+        cruzamentos[nome] = ponto_de_cruzamento(linhas_imagem)
+        cruzamentos_direta[nome] = ponto_de_cruzamento(linhas_imagem, base="direta")
+        cruzamentos_separavel[nome] = ponto_de_cruzamento(linhas_imagem, base="separavel")
+        linhas.extend(linhas_imagem)
+
+    return {
+        "maquina": info_maquina(),
+        "com_cache": com_cache,
+        "linhas": linhas,
+        "cruzamentos": cruzamentos,
+        "cruzamentos_direta": cruzamentos_direta,
+        "cruzamentos_separavel": cruzamentos_separavel,
+    }
+
+
+def info_maquina():
+    """
+    Coleta informações da máquina e das bibliotecas, para comparar resultados entre máquinas.
+
+    Returns:
+        dict: Sistema, processador, número de CPUs, versões do Python, NumPy e OpenCV e a data.
+    """
+    return {
+        "sistema": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "nome": platform.node(),
+        "cpus": os.cpu_count(),
+        "threads_opencv": cv2.getNumThreads(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def salvar_resultados(resultado, prefixo="out/bench_convolucao"):
+    """
+    Salva o resultado de benchmark_convolucao em JSON (completo) e CSV (uma linha por medição).
+
+    Args:
+        resultado (dict): O dicionário retornado por benchmark_convolucao.
+        prefixo (str, optional): O caminho dos arquivos sem extensão. Padrão é "out/bench_convolucao".
+
+    Returns:
+        tuple[str, str]: Os caminhos dos arquivos JSON e CSV gravados.
+    """
+    os.makedirs(os.path.dirname(prefixo) or ".", exist_ok=True)
+    caminho_json = f"{prefixo}.json"
+    caminho_csv = f"{prefixo}.csv"
+
+    with open(caminho_json, "w", encoding="utf-8") as arquivo:
+        json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+
+    colunas = ["imagem", "altura", "largura", "kernel", "metodo", "mediana", "q1", "q3", "iqr", "minimo", "repeticoes"]
+    with open(caminho_csv, "w", encoding="utf-8", newline="") as arquivo:
+        escritor = csv.DictWriter(arquivo, fieldnames=colunas)
+        escritor.writeheader()
+        escritor.writerows(resultado["linhas"])
+    return caminho_json, caminho_csv
+
+
+def imprimir_cruzamentos(resultado):
+    """
+    Imprime, para cada imagem, o tamanho de kernel a partir do qual a frequência vence.
+
+    Args:
+        resultado (dict): O dicionário retornado por benchmark_convolucao.
+    """
+    direta = resultado.get("cruzamentos_direta", {})
+    separavel = resultado.get("cruzamentos_separavel", {})
+    for nome, cruzamento in resultado["cruzamentos"].items():
+        if nome in direta:
+            cruzamento_direta = direta[nome]
+            if cruzamento_direta is None:
+                print(
+                    f"  ⤷ {nome}: a convolução direta foi mais rápida em todos os kernels medidos "
+                    f"(até {LADO_MAX_DIRETA}x{LADO_MAX_DIRETA})"
+                )
+            else:
+                print(f"  ⤷ {nome}: a frequência vence a convolução direta a partir do kernel {cruzamento_direta}x{cruzamento_direta}")
+        vence = "em nenhum kernel medido" if cruzamento is None else f"a partir do kernel {cruzamento}x{cruzamento}"
+        print(f"     (contra o filter2D, que usa DFT a partir de ~11x11, a frequência vence {vence})")
+        if nome in separavel:
+            cruzamento = separavel[nome]
+            vence = "em nenhum kernel medido" if cruzamento is None else f"a partir do kernel {cruzamento}x{cruzamento}"
+            print(f"     (contra as passadas separáveis, a frequência vence {vence})")
+    print("     (tempos da frequência com a saída alinhada, alinhar=True; a circular é mais barata)")
+
+
+def referencia_high_boost(img, A=1.5, sigma=0, tamanho=5):
+    """
+    Calcula o high-boost exato, em float64, arredondado e saturado só no final.
+
+    Args:
+        img (numpy.ndarray): A imagem uint8 (em tons de cinza ou em cores).
+        A (float, optional): O fator de amplificação. Padrão é 1.5.
+        sigma (float, optional): O desvio padrão do desfoque. Padrão é 0.
+        tamanho (int, optional): O lado do kernel do desfoque. Padrão é 5.
+
+    Returns:
+        numpy.ndarray: O resultado de referência em uint8.
+    """
+    kernel = kernel_high_boost(A, sigma, tamanho).astype(np.float64)
+    exato = cv2.filter2D(img.astype(np.float64), -1, kernel)
+    return np.clip(np.rint(exato), 0, 255).astype(np.uint8)
+
+
+def benchmark_high_boost(imagens, A=1.5, sigma=0, tamanho=5, repeticoes=5, aquecimento=1, metodos=METODOS_HIGH_BOOST):
+    """
+    Mede o tempo e o erro de cada método do filtro high-boost (ver filtro_high_boost).
+
+    O erro é medido contra referencia_high_boost: o método "tres_passos" perde o detalhe
+    negativo no cv2.subtract saturado, e os outros dois só diferem por arredondamento.
+
+    Args:
+        imagens (dict[str, numpy.ndarray]): As imagens uint8, indexadas por nome.
+        A (float, optional): O fator de amplificação. Padrão é 1.5.
+        sigma (float, optional): O desvio padrão do desfoque. Padrão é 0.
+        tamanho (int, optional): O lado do kernel do desfoque. Padrão é 5.
+        repeticoes (int, optional): Execuções medidas por método. Padrão é 5.
+        aquecimento (int, optional): Execuções descartadas por método. Padrão é 1.
+        metodos (iterable[str], optional): Os métodos comparados. Padrão é todos.
+
+    Returns:
+        list[dict]: Uma linha por imagem e método, com os tempos (ver medir), "erro_maximo",
+                    "erro_medio" e "pixels_diferentes" (percentual) em relação à referência.
+    """
+    linhas = []
+    for nome, img in imagens.items():
+        referencia = referencia_high_boost(img, A, sigma, tamanho)
+        dst = np.empty_like(img)
+        for metodo in metodos:
+
+            def executar():
+                return filtro_high_boost(img, A, dst=dst, metodo=metodo, sigma=sigma, tamanho=tamanho)
+
+            tempos = medir(executar, repeticoes=repeticoes, aquecimento=aquecimento)
+            erro = cv2.absdiff(executar(), referencia)
+            linhas.append({
+                "imagem": nome,
+                "forma": list(img.shape),
+                "metodo": metodo,
+                **{chave: valor for chave, valor in tempos.items() if chave != "amostras"},
+                "erro_maximo": float(erro.max()),
+                "erro_medio": float(erro.mean()),
+                "pixels_diferentes": float(np.count_nonzero(erro) / erro.size * 100),
+            })
+    return linhas
+
+
+def imprimir_benchmark_high_boost(linhas, base="tres_passos"):
+    """
+    Imprime o resultado de benchmark_high_boost, com o ganho de cada método sobre o método base.
+
+    Args:
+        linhas (list[dict]): As linhas retornadas por benchmark_high_boost.
+        base (str, optional): O método usado como referência de tempo. Padrão é "tres_passos".
+    """
+    for linha in linhas:
+        tempo_base = next(
+            (l["mediana"] for l in linhas if l["imagem"] == linha["imagem"] and l["metodo"] == base), None
+        )
+        ganho = f" ({tempo_base / linha['mediana']:.2f}x)" if tempo_base else ""
+        print(
+            f"  ⤷ {linha['imagem']} {tuple(linha['forma'])} {linha['metodo']:<12} "
+            f"{linha['mediana'] * 1e3:8.2f} ms ± {linha['iqr'] * 1e3:.2f}{ganho:<9} "
+            f"erro máx {linha['erro_maximo']:3.0f}, médio {linha['erro_medio']:.4f}, "
+            f"{linha['pixels_diferentes']:.2f}% dos pixels"
+        )
+
+
+# 4) Implemente um programa que demonstre o ganho computacional obtido à partir da aplicação do
+# conceito que envolve o Teorema da Convolução. O programa deverá exibir o tempo que a operação
+# levou para ser aplicada à imagem usando o operador de convolução e exibir o tempo que aplicação
+# do filtro levou para ser aplicada no contexto do domínio da frequência. Analise e teça comentários
+# sobre os tempos obtidos.
+def _04_comparar_tempos_convolucao(img_path, tamanhos_kernel=(3, 5, 11, 21, 51, 101), repeticoes=3, aquecimento=1):
+    """
+    Demonstra e compara o desempenho computacional da convolução espacial
+    versus a convolução no domínio da frequência (usando FFT) para um filtro.
+
+    O Teorema da Convolução estabelece que a convolução no domínio espacial
+    é equivalente à multiplicação no domínio da frequência. Para kernels grandes,
+    a convolução no domínio da frequência (que envolve FFT, multiplicação e IFFT)
+    pode ser significativamente mais rápida do que a convolução direta no domínio espacial.
+
+    O método direto (soma de fatias deslocadas, até LADO_MAX_DIRETA) é a convolução pelo
+    operador; o cv2.filter2D também é medido, mas usa uma DFT a partir de ~11x11.
+
+    Cada combinação é medida com time.perf_counter, após execuções de aquecimento,
+    e é exibida a mediana e o intervalo interquartil (IQR) das repetições. Para
+    varreduras completas com saída em JSON/CSV, use benchmark_convolucao.
+
+    Args:
+        img_path (str): O caminho para a imagem de entrada (será convertida para tons de cinza).
+        tamanhos_kernel (iterable[int], optional): Lados dos kernels de média comparados.
+        repeticoes (int, optional): Execuções medidas por kernel. Padrão é 3.
+        aquecimento (int, optional): Execuções descartadas por kernel. Padrão é 1.
+
+    Returns:
+        dict: O resultado da varredura (ver benchmark_convolucao).
+
+    Raises:
+        FileNotFoundError: Se a imagem de entrada não puder ser carregada.
+    """
+    resultado = benchmark_convolucao(
+        tamanhos_imagem=(),
+        caminhos_imagem=[img_path],
+        tamanhos_kernel=tamanhos_kernel,
+        repeticoes=repeticoes,
+        aquecimento=aquecimento,
+    )
+    imprimir_cruzamentos(resultado)
+    return resultado
+
+
+def imagens_de_src(diretorio="src"):
+    """
+    Lista as imagens de exemplo do diretório src/.
+
+    Args:
+        diretorio (str, optional): O diretório das imagens. Padrão é "src".
+
+    Returns:
+        list[str]: Os caminhos das imagens, em ordem alfabética.
+    """
+    extensoes = ("*.jpg", "*.jpeg", "*.png")
+    return sorted(c for ext in extensoes for c in glob.glob(os.path.join(diretorio, ext)))
@@ -0,0 +1,422 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from components.buffers import rascunho
+
+# Um backend de FFT implementa as três etapas da convolução na frequência sobre planos
+# float32 (HxW ou CxHxW), com zero-padding até o tamanho da DFT:
+#     forma_espectro(forma, s)          -> (forma, dtype) do espectro de planos com essa forma
+#     direta(planos, s, out=None)       -> espectro no formato próprio do backend
+#     multiplicar(espectro, espectro_k) -> produto dos espectros (pode reaproveitar o buffer)
+#     multiplicar_banco(espectro, espectros_k, out=None)
+#                                       -> produto por K espectros de kernel (KxHxW), Kx...xHxW
+#     inversa(espectro, s, out=None)    -> planos float32 do tamanho s (pode destruir o espectro)
+# O formato do espectro varia (meio espectro complex64 no NumPy/SciPy/pyFFTW, empacotamento
+# CCS do OpenCV), então espectros de backends diferentes não se misturam: o cache de espectros
+# de kernel usa o nome do backend na chave.
+# O out= é um buffer pré-alocado (do pool de rascunho) onde o backend pode gravar o resultado;
+# o valor retornado é sempre o array com o resultado, que pode não ser o out (ex: o scipy.fft
+# não aceita um buffer de saída).
+
+# O parâmetro out= das funções de numpy.fft só existe a partir do NumPy 2.0
+_NUMPY_FFT_OUT = np.lib.NumpyVersion(np.__version__) >= "2.0.0"
+
+
+class BackendNumpy:
+    """FFT real do NumPy (pocketfft), em uma única thread."""
+
+    nome = "numpy"
+
+    def __init__(self, trabalhadores=None):
+        self.trabalhadores = 1
+
+    def forma_espectro(self, forma, s):
+        # Meio espectro: a última dimensão guarda só as frequências não negativas
+        return (*forma[:-2], s[0], s[1] // 2 + 1), np.complex64
+
+    def direta(self, planos, s, out=None):
+        if out is None or not _NUMPY_FFT_OUT:
+            return np.fft.rfft2(planos, s=s, axes=(-2, -1)).astype(np.complex64, copy=False)
+        # A rfft2 com out= não aceita o zero-padding das linhas (s), então a transformada é
+        # feita por eixo: rfft das linhas existentes (com padding nas colunas), zeros nas
+        # linhas de padding e fft das colunas no próprio buffer.
+        # Com a normalização padrão, a transformada direta do NumPy passa por um buffer
+        # interno em complex128 (o fator 1 é um int); com norm="forward" o fator é float32
+        # e não há cópia, então a escala 1/n é desfeita depois, no próprio buffer.
+        altura = planos.shape[-2]
+        np.fft.rfft(planos, n=s[1], axis=-1, out=out[..., :altura, :], norm="forward")
+        out[..., altura:, :] = 0
+        np.fft.fft(out, axis=-2, out=out, norm="forward")
+        return np.multiply(out, np.float32(s[0] * s[1]), out=out)
+
+    def multiplicar(self, espectro, espectro_kernel):
+        espectro *= espectro_kernel
+        return espectro
+
+    def multiplicar_banco(self, espectro, espectros_kernel, out=None):
+        # Uma única multiplicação vetorizada: os K espectros de kernel ganham eixos unitários
+        # para os canais, e o espectro da imagem é compartilhado por broadcasting
+        forma = (espectros_kernel.shape[0], *(1,) * (espectro.ndim - 2), *espectros_kernel.shape[1:])
+        return np.multiply(espectros_kernel.reshape(forma), espectro, out=out)
+
+    def inversa(self, espectro, s, out=None):
+        if out is None or not _NUMPY_FFT_OUT:
+            return np.fft.irfft2(espectro, s=s, axes=(-2, -1)).astype(np.float32, copy=False)
+        # A irfft2 ignora o out=; por eixo, a ifft das colunas é feita no próprio espectro
+        # e a irfft das linhas grava direto no buffer de saída
+        np.fft.ifft(espectro, axis=-2, out=espectro)
+        return np.fft.irfft(espectro, n=s[1], axis=-1, out=out)
+
+
+class BackendScipy(BackendNumpy):
+    """FFT real do scipy.fft, em precisão simples nativa e com várias threads (workers)."""
+
+    nome = "scipy"
+
+    def __init__(self, trabalhadores=None):
+        import scipy.fft
+
+        self._fft = scipy.fft
+        self.trabalhadores = trabalhadores or os.cpu_count() or 1
+
+    def direta(self, planos, s, out=None):
+        # Com entrada float32, o scipy.fft já calcula e devolve complex64.
+        # O scipy.fft não grava em buffers de saída, então o out é ignorado.
+        return self._fft.rfft2(planos, s=s, axes=(-2, -1), workers=self.trabalhadores)
+
+    def inversa(self, espectro, s, out=None):
+        # overwrite_x: o espectro (um rascunho) pode ser usado como área de trabalho
+        return self._fft.irfft2(espectro, s=s, axes=(-2, -1), workers=self.trabalhadores, overwrite_x=True)
+
+
+class BackendOpencv:
+    """
+    cv2.dft/cv2.idft no formato empacotado CCS (o espectro real ocupa um array float32 do
+    tamanho da DFT), com o produto feito por cv2.mulSpectrums e a inversa com DFT_REAL_OUTPUT.
+    """
+
+    nome = "opencv"
+
+    def __init__(self, trabalhadores=None):
+        self.trabalhadores = cv2.getNumThreads()
+
+    def forma_espectro(self, forma, s):
+        # O empacotamento CCS ocupa um array real do tamanho da DFT
+        return (*forma[:-2], s[0], s[1]), np.float32
+
+    def _plano(self, plano, s, out):
+        # Zero-padding até o tamanho da DFT (em um rascunho); nonzeroRows evita transformar
+        # as linhas de zeros
+        altura, largura = plano.shape
+        expandido = cv2.copyMakeBorder(
+            plano, 0, s[0] - altura, 0, s[1] - largura, cv2.BORDER_CONSTANT,
+            dst=rascunho(s, np.float32, "fft.opencv.padding"), value=0,
+        )
+        return cv2.dft(expandido, dst=out, nonzeroRows=altura)
+
+    def direta(self, planos, s, out=None):
+        if planos.ndim == 2:
+            return self._plano(planos, s, out)
+        if out is None:
+            return np.stack([self._plano(plano, s, None) for plano in planos])
+        for plano, destino in zip(planos, out):
+            self._plano(plano, s, destino)
+        return out
+
+    def multiplicar(self, espectro, espectro_kernel):
+        # O produto é gravado no próprio espectro (o mulSpectrums aceita operar no lugar)
+        if espectro.ndim == 2:
+            return cv2.mulSpectrums(espectro, espectro_kernel, 0, c=espectro)
+        for plano in espectro:
+            cv2.mulSpectrums(plano, espectro_kernel, 0, c=plano)
+        return espectro
+
+    def multiplicar_banco(self, espectro, espectros_kernel, out=None):
+        # O empacotamento CCS não permite o produto elemento a elemento do NumPy, então cada
+        # par (kernel, canal) passa pelo mulSpectrums, gravando direto no destino
+        if out is None:
+            out = np.empty((espectros_kernel.shape[0], *espectro.shape), np.float32)
+        planos = espectro.reshape(-1, *espectro.shape[-2:])
+        for espectro_kernel, destino in zip(espectros_kernel, out):
+            for plano, produto in zip(planos, destino.reshape(planos.shape)):
+                cv2.mulSpectrums(plano, espectro_kernel, 0, c=produto)
+        return out
+
+    def inversa(self, espectro, s, out=None):
+        flags = cv2.DFT_SCALE | cv2.DFT_REAL_OUTPUT
+        if espectro.ndim == 2:
+            return cv2.idft(espectro, dst=out, flags=flags)
+        if out is None:
+            return np.stack([cv2.idft(plano, flags=flags) for plano in espectro])
+        for plano, destino in zip(espectro, out):
+            cv2.idft(plano, dst=destino, flags=flags)
+        return out
+
+
+class BackendPyfftw(BackendNumpy):
+    """
+    FFTW via pyFFTW, com várias threads e planos guardados: o primeiro uso de cada formato
+    mede o melhor plano (FFTW_MEASURE), e os seguintes reaproveitam o plano.
+    """
+
+    nome = "pyfftw"
+
+    def __init__(self, trabalhadores=None):
+        import pyfftw
+
+        self._pyfftw = pyfftw
+        self.trabalhadores = trabalhadores or os.cpu_count() or 1
+        self._planos = {}
+        self._lock = threading.Lock()
+
+    def _plano(self, direcao, forma, dtype, s):
+        # Cada plano vem com o próprio lock: criar um plano usa o lock do backend, executar
+        # usa o do plano (formatos diferentes rodam em paralelo)
+        chave = (direcao, forma, np.dtype(dtype).str, tuple(s))
+        with self._lock:
+            plano = self._planos.get(chave)
+            if plano is None:
+                construtor = self._pyfftw.builders.rfft2 if direcao == "direta" else self._pyfftw.builders.irfft2
+                plano = construtor(
+                    self._pyfftw.empty_aligned(forma, dtype=dtype),
+                    s=s,
+                    axes=(-2, -1),
+                    threads=self.trabalhadores,
+                    planner_effort="FFTW_MEASURE",
+                )
+                plano = self._planos[chave] = (plano, threading.Lock())
+        return plano
+
+    def _executar(self, plano, entrada, out):
+        # Um plano do FFTW não é reentrante: ele escreve a entrada e o resultado nos próprios
+        # buffers. O lock do plano vale da cópia da entrada até a cópia do resultado (para o
+        # out, se houver), então duas threads com o mesmo formato não se sobrescrevem
+        plano, lock = plano
+        with lock:
+            resultado = plano(entrada)
+            if out is None:
+                return resultado.copy()
+            np.copyto(out, resultado)
+        return out
+
+    def direta(self, planos, s, out=None):
+        return self._executar(self._plano("direta", planos.shape, np.float32, s), planos, out)
+
+    def inversa(self, espectro, s, out=None):
+        return self._executar(self._plano("inversa", espectro.shape, np.complex64, s), espectro, out)
+
+
+# Backends conhecidos, indexados pelo nome usado na configuração (VCRM_FFT_BACKEND)
+BACKENDS_FFT = {
+    "numpy": BackendNumpy,
+    "scipy": BackendScipy,
+    "opencv": BackendOpencv,
+    "pyfftw": BackendPyfftw,
+}
+
+# Ordem de preferência do modo "auto": os backends com várias threads primeiro
+_PREFERENCIA_AUTO = ("pyfftw", "scipy", "numpy")
+
+_backend_atual = {"backend": None}
+_backend_lock = threading.Lock()
+
+
+def registrar_backend_fft(nome, classe):
+    """
+    Registra um backend de FFT adicional.
+
+    Args:
+        nome (str): O nome do backend (usado em selecionar_backend_fft e VCRM_FFT_BACKEND).
+        classe (type): A classe do backend, com os métodos forma_espectro, direta, multiplicar
+                       e inversa (ver o início deste módulo) e um construtor que recebe
+                       trabalhadores (e lança ImportError se faltar alguma dependência).
+    """
+    BACKENDS_FFT[nome] = classe
+
+
+def backends_fft_disponiveis():
+    """
+    Lista os backends cujas dependências estão instaladas.
+
+    Returns:
+        list[str]: Os nomes dos backends disponíveis.
+    """
+    disponiveis = []
+    for nome, classe in BACKENDS_FFT.items():
+        try:
+            classe()
+        except ImportError:
+            continue
+        disponiveis.append(nome)
+    return disponiveis
+
+
+def selecionar_backend_fft(nome=None, trabalhadores=None):
+    """
+    Escolhe o backend de FFT usado pela convolução na frequência.
+
+    Args:
+        nome (str, optional): "numpy", "scipy", "opencv", "pyfftw" ou "auto" (o primeiro
+                              disponível entre pyfftw, scipy e numpy). Se None, usa a variável
+                              de ambiente VCRM_FFT_BACKEND, ou "auto".
+        trabalhadores (int, optional): Threads das transformadas. Se None, usa a variável
+                                       VCRM_FFT_TRABALHADORES, ou o número de CPUs.
+
+    Returns:
+        O backend selecionado.
+
+    Raises:
+        ValueError: Se o backend for desconhecido.
+        ImportError: Se o backend pedido explicitamente não estiver instalado.
+    """
+    nome = nome or os.environ.get("VCRM_FFT_BACKEND", "auto")
+    if trabalhadores is None and os.environ.get("VCRM_FFT_TRABALHADORES"):
+        trabalhadores = int(os.environ["VCRM_FFT_TRABALHADORES"])
+
+    if nome == "auto":
+        for candidato in _PREFERENCIA_AUTO:
+            try:
+                backend = BACKENDS_FFT[candidato](trabalhadores)
+                break
+            except ImportError:
+                continue
+    elif nome in BACKENDS_FFT:
+        backend = BACKENDS_FFT[nome](trabalhadores)
+    else:
+        raise ValueError(f"Backend de FFT desconhecido: {nome}. Opções: auto, {', '.join(BACKENDS_FFT)}")
+
+    with _backend_lock:
+        _backend_atual["backend"] = backend
+    return backend
+
+
+def backend_fft():
+    """
+    Retorna o backend de FFT atual (selecionado na primeira chamada, ver selecionar_backend_fft).
+
+    Returns:
+        O backend atual.
+    """
+    backend = _backend_atual["backend"]
+    if backend is None:
+        backend = selecionar_backend_fft()
+    return backend
+
+
+def _erro_relativo(resultado, referencia):
+    # NaN (um trecho de um buffer out= que não foi escrito) vira erro infinito
+    erro = float(np.max(np.abs(resultado - referencia)) / np.max(np.abs(referencia)))
+    return erro if np.isfinite(erro) else float("inf")
+
+
+def testar_backend_fft(nome, tamanho=(1024, 1024), tamanho_kernel=31, repeticoes=3, trabalhadores=None):
+    """
+    Verifica a correção e mede a velocidade de um backend de FFT.
+
+    Uma convolução circular de uma imagem aleatória com um kernel aleatório é calculada pelo
+    backend e comparada com uma referência em precisão dupla (numpy.fft em float64). O teste
+    é feito também com buffers pré-alocados (out=), o caminho usado pelo convolucao_frequencia
+    (pilha de planos) e pelo banco_filtros (produto por vários kernels): os buffers começam
+    com NaN, então um trecho que o backend deixe de escrever aparece no erro.
+
+    Args:
+        nome (str): O nome do backend.
+        tamanho (tuple, optional): O tamanho (altura, largura) da imagem de teste. Padrão é 1024x1024.
+        tamanho_kernel (int, optional): O lado do kernel de teste. Padrão é 31.
+        repeticoes (int, optional): Execuções medidas (vale a mínima). Padrão é 3.
+        trabalhadores (int, optional): Threads do backend. Padrão é o número de CPUs.
+
+    Returns:
+        dict: "backend", "disponivel", "trabalhadores", "erro_relativo" (máximo, relativo ao
+              maior valor da referência, sem out=), "erro_relativo_out" (o mesmo com os
+              buffers pré-alocados), "ok" (os dois erros abaixo de 1e-4) e "tempo_ms" (direta,
+              produto e inversa, com o espectro do kernel já calculado).
+    """
+    try:
+        backend = BACKENDS_FFT[nome](trabalhadores)
+    except ImportError as exc:
+        return {"backend": nome, "disponivel": False, "motivo": str(exc)}
+
+    rng = np.random.default_rng(0)
+    img = rng.random(tamanho, dtype=np.float32)
+    kernel = rng.random((tamanho_kernel, tamanho_kernel), dtype=np.float32)
+    s = (cv2.getOptimalDFTSize(tamanho[0]), cv2.getOptimalDFTSize(tamanho[1]))
+
+    referencia = np.fft.irfft2(
+        np.fft.rfft2(img.astype(np.float64), s=s) * np.fft.rfft2(kernel.astype(np.float64), s=s), s=s
+    )
+    espectro_kernel = backend.direta(kernel, s)
+
+    def convolver():
+        return backend.inversa(backend.multiplicar(backend.direta(img, s), espectro_kernel), s)
+
+    resultado = convolver()
+    erro = _erro_relativo(resultado, referencia)
+
+    # Com out=: uma pilha de 3 planos (direta e inversa por eixo no NumPy, com o padding das
+    # linhas zerado no buffer) e o produto por um banco de 2 kernels. Os planos são recortados
+    # para que a DFT tenha linhas e colunas de padding mesmo quando o tamanho já é ótimo
+    recorte = img[: max(s[0] - 3, 1), : max(s[1] - 5, 1)]
+    planos = np.stack([recorte, recorte[::-1], recorte[:, ::-1]])
+    kernels = np.stack([kernel, kernel.T])
+    referencias = np.fft.irfft2(
+        np.fft.rfft2(planos.astype(np.float64), s=s)[None] * np.fft.rfft2(kernels.astype(np.float64), s=s)[:, None],
+        s=s,
+    )
+    forma_espectro, tipo_espectro = backend.forma_espectro(planos.shape, s)
+    forma_banco, _ = backend.forma_espectro(referencias.shape, s)
+    espectro = backend.direta(planos, s, out=np.full(forma_espectro, np.nan, tipo_espectro))
+    produto = backend.multiplicar_banco(espectro, backend.direta(kernels, s), out=np.full(forma_banco, np.nan, tipo_espectro))
+    produto = produto.reshape(-1, *produto.shape[-2:])
+    inversa = backend.inversa(produto, s, out=np.full((produto.shape[0], *s), np.nan, np.float32))
+    erro_out = _erro_relativo(inversa.reshape(referencias.shape), referencias)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        convolver()
+        tempos.append(time.perf_counter() - inicio)
+
+    return {
+        "backend": nome,
+        "disponivel": True,
+        "trabalhadores": backend.trabalhadores,
+        "erro_relativo": erro,
+        "erro_relativo_out": erro_out,
+        "ok": erro < 1e-4 and erro_out < 1e-4,
+        "tempo_ms": min(tempos) * 1000,
+    }
+
+
+def testar_backends_fft(tamanho=(1024, 1024), repeticoes=3, trabalhadores=None, verbose=True):
+    """
+    Executa testar_backend_fft para todos os backends registrados.
+
+    Args:
+        tamanho (tuple, optional): O tamanho da imagem de teste. Padrão é 1024x1024.
+        repeticoes (int, optional): Execuções medidas por backend. Padrão é 3.
+        trabalhadores (int, optional): Threads dos backends. Padrão é o número de CPUs.
+        verbose (bool, optional): Se True (padrão), imprime uma linha por backend.
+
+    Returns:
+        list[dict]: O resultado de cada backend.
+    """
+    resultados = []
+    for nome in BACKENDS_FFT:
+        resultado = testar_backend_fft(nome, tamanho, repeticoes=repeticoes, trabalhadores=trabalhadores)
+        resultados.append(resultado)
+        if not verbose:
+            continue
+        if not resultado["disponivel"]:
+            print(f"  ⤷ {nome}: indisponível ({resultado['motivo']})")
+        else:
+            estado = "OK" if resultado["ok"] else "ERRO"
+            print(
+                f"  ⤷ {nome}: {estado}, erro relativo {resultado['erro_relativo']:.1e} "
+                f"(com out=: {resultado['erro_relativo_out']:.1e}), "
+                f"{resultado['tempo_ms']:.2f} ms ({resultado['trabalhadores']} threads)"
+            )
+    return resultados
@@ -1,9 +1,167 @@
+import functools
+
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
+
+from components.buffers import rascunho, verificar_saida
+from components.perfil import perfilar
+from components.saida import SAIDA_SINCRONA
+from components.utils import carregar_imagem
+
+
+# Kernel Laplaciano do filtro passa-alta.
+# Este kernel é comumente usado para detecção de bordas e realce de detalhes.
+# O valor central positivo e os valores negativos ao redor realçam as mudanças de intensidade.
+KERNEL_LAPLACIANO = np.array([[-1, -1, -1], [-1, 8, -1], [-1, -1, -1]])
+
+
+# Métodos do filtro high-boost (ver filtro_high_boost)
+METODOS_HIGH_BOOST = ("separavel", "fundido", "tres_passos")
+
+
+@functools.lru_cache(maxsize=64)
+def kernel_high_boost(A=1.5, sigma=0, tamanho=5):
+    """
+    Retorna o kernel do filtro high-boost em uma única convolução: (A + 1)·δ − G.
+
+    O high-boost é linear: A·img + (img − G∗img) = ((A + 1)·δ − G)∗img, em que δ é o impulso
+    unitário e G o kernel Gaussiano do desfoque. O kernel fica em cache por (A, sigma, tamanho).
+
+    Args:
+        A (float, optional): O fator de amplificação. Padrão é 1.5.
+        sigma (float, optional): O desvio padrão do Gaussiano; 0 usa o mesmo valor que o
+                                 cv2.GaussianBlur calcula a partir do tamanho. Padrão é 0.
+        tamanho (int, optional): O lado do kernel (ímpar). Padrão é 5.
+
+    Returns:
+        numpy.ndarray: O kernel tamanho x tamanho em float32 (somente leitura, pois é
+                       compartilhado pelo cache).
+
+    Raises:
+        ValueError: Se o tamanho não for um inteiro ímpar positivo.
+    """
+    if tamanho < 1 or tamanho % 2 == 0:
+        raise ValueError(f"O tamanho do kernel precisa ser ímpar e positivo (recebido: {tamanho}).")
+    # Mesmo kernel 1D usado pelo cv2.GaussianBlur, então o resultado coincide com o desfoque
+    gauss = cv2.getGaussianKernel(tamanho, sigma, cv2.CV_32F)
+    kernel = -(gauss @ gauss.T)
+    kernel[tamanho // 2, tamanho // 2] += A + 1
+    kernel.flags.writeable = False
+    return kernel
+
+
+def borrar_high_boost(img, dst=None, sigma=0, tamanho=5):
+    """
+    Aplica o desfoque Gaussiano usado pelo filtro high-boost.
+
+    Args:
+        img (numpy.ndarray): A imagem (em tons de cinza ou em cores).
+        dst (numpy.ndarray, optional): Um array pré-alocado (forma e tipo da imagem) onde o
+                                       resultado é gravado.
+        sigma (float, optional): O desvio padrão do Gaussiano (0 é calculado pelo tamanho). Padrão é 0.
+        tamanho (int, optional): O lado do kernel, que define o nível de desfoque. Padrão é 5.
+
+    Returns:
+        numpy.ndarray: A imagem borrada (o próprio dst, se fornecido).
+    """
+    return cv2.GaussianBlur(img, (tamanho, tamanho), sigma, dst=verificar_saida(dst, img.shape, img.dtype))
+
+
+@perfilar()
+def filtro_high_boost(img, A=1.5, blur=None, dst=None, metodo="separavel", sigma=0, tamanho=5):
+    """
+    Aplica o filtro high-boost a uma imagem já carregada (em tons de cinza ou em cores).
+
+    Métodos:
+        - "separavel" (padrão): desfoque Gaussiano separável e uma única combinação
+          (A + 1)·img − blur, calculada em ponto flutuante e saturada só no final. Em uint8,
+          o desfoque é arredondado para inteiro, então o erro é de no máximo 1 nível. É o
+          padrão no lugar do "fundido" porque é o único método mais rápido que o
+          "tres_passos": o desfoque uint8 do OpenCV em ponto fixo custa menos que a
+          convolução 5x5 não separável, e também menos que um desfoque em float32.
+        - "fundido": uma única convolução com o kernel (A + 1)·δ − G (ver kernel_high_boost),
+          acumulada em ponto flutuante e saturada só no final; é o resultado exato, mas o
+          kernel não é separável, então fica mais lento que o "separavel" a partir de 5x5.
+        - "tres_passos": a implementação original (desfoque, cv2.subtract e cv2.addWeighted).
+          O cv2.subtract em uint8 satura a máscara em 0, então o detalhe negativo (o lado
+          escuro das bordas) se perde antes do realce; mantido para comparar resultados antigos.
+
+    Args:
+        img (numpy.ndarray): A imagem (HxW ou HxWxC; cada canal é filtrado independentemente).
+        A (float, optional): O fator de amplificação (ver _03_1_filtro_high_boost). Padrão é 1.5.
+        blur (numpy.ndarray, optional): A imagem já borrada por borrar_high_boost, se disponível
+                                        (ex: compartilhada com outra etapa de um pipeline).
+                                        Ignorado pelo método "fundido".
+        dst (numpy.ndarray, optional): Um array pré-alocado (forma e tipo da imagem) onde o
+                                       resultado é gravado. O desfoque e a máscara usam buffers
+                                       reaproveitados entre chamadas (ver components.buffers).
+        metodo (str, optional): "separavel", "fundido" ou "tres_passos". Padrão é "separavel".
+        sigma (float, optional): O desvio padrão do desfoque (0 é calculado pelo tamanho). Padrão é 0.
+        tamanho (int, optional): O lado do kernel do desfoque. Padrão é 5.
+
+    Returns:
+        numpy.ndarray: A imagem resultante com o filtro high-boost aplicado (o próprio dst,
+                       se fornecido).
+
+    Raises:
+        ValueError: Se o método for desconhecido ou se o dst não tiver a forma e o tipo da imagem.
+    """
+    if metodo not in METODOS_HIGH_BOOST:
+        raise ValueError(f"Método de high-boost desconhecido: {metodo}. Use um de {METODOS_HIGH_BOOST}.")
+    dst = verificar_saida(dst, img.shape, img.dtype)
+
+    if metodo == "fundido":
+        # Uma passada: o filter2D acumula em ponto flutuante e satura ao gravar no tipo da imagem
+        return cv2.filter2D(img, -1, kernel_high_boost(A, sigma, tamanho), dst=dst)
+
+    # Aplica um desfoque Gaussiano à imagem.
+    # Isso cria uma versão "borrada" da imagem, que será usada para criar a máscara.
+    if blur is None:
+        blur = borrar_high_boost(img, rascunho(img.shape, img.dtype, "high_boost.blur"), sigma, tamanho)
+
+    if metodo == "separavel":
+        # A·img + (img − blur) = (A + 1)·img − blur: o addWeighted calcula a combinação em
+        # ponto flutuante, com a máscara negativa preservada, e satura só ao gravar o resultado
+        return cv2.addWeighted(img, A + 1, blur, -1, 0, dst=dst)
+
+    # Calcula a máscara de nitidez subtraindo a imagem borrada da imagem original.
+    # Essa máscara contém as informações de alta frequência (bordas e detalhes).
+    mask = cv2.subtract(img, blur, dst=rascunho(img.shape, img.dtype, "high_boost.mascara"))
+
+    # Aplica o filtro high-boost.
+    # cv2.addWeighted combina duas imagens linearmente:
+    # img * A + mask * 1 + 0
+    # O parâmetro 'A' controla a intensidade do realce da máscara.
+    return cv2.addWeighted(img, A, mask, 1, 0, dst=dst)
+
+
+@perfilar()
+def filtro_passa_alta(img_gray, dst=None):
+    """
+    Aplica o filtro passa-alta (kernel Laplaciano) a uma imagem já carregada em tons de cinza.
+
+    Args:
+        img_gray (numpy.ndarray): A imagem em tons de cinza.
+        dst (numpy.ndarray, optional): Um array pré-alocado (forma e tipo da imagem) onde o
+                                       resultado é gravado.
+
+    Returns:
+        numpy.ndarray: A imagem resultante com o filtro passa-alta aplicado (o próprio dst,
+                       se fornecido).
+
+    Raises:
+        ValueError: Se o dst não tiver a forma e o tipo da imagem.
+    """
+    # Aplica o filtro 2D (convolução) à imagem em tons de cinza usando o kernel Laplaciano.
+    # O parâmetro -1 indica que a profundidade da imagem de saída será a mesma da imagem de entrada.
+    dst = verificar_saida(dst, img_gray.shape, img_gray.dtype)
+    return cv2.filter2D(img_gray, -1, KERNEL_LAPLACIANO, dst=dst)
 
 
-def _03_1_filtro_high_boost(img_path, A=1.5):
+@perfilar()
+def _03_1_filtro_high_boost(
+    img_path, A=1.5, output_path="out/03_high_boost.jpg", saida=None, dst=None, metodo="separavel", cor=False
+):
     """
     Aplica o filtro high-boost a uma imagem.
 
@@ -17,35 +175,34 @@ def _03_1_filtro_high_boost(img_path, A=1.5):
         img_path (str): O caminho para a imagem de entrada.
         A (float, optional): O fator de amplificação para a máscara de nitidez.
                              Valores maiores que 1 aumentam o realce. O padrão é 1.5.
+        output_path (str, optional): O caminho onde a imagem processada será salva.
+                                     Se None, nada é gravado. Padrão é "out/03_high_boost.jpg".
+        saida (SaidaImagem, optional): O destino que codifica e grava a imagem (ex: em
+                                       segundo plano). Padrão é a gravação síncrona.
+        dst (numpy.ndarray, optional): Um array pré-alocado (uint8, tamanho da imagem) onde o
+                                       resultado é gravado (ver filtro_high_boost).
+        metodo (str, optional): O método de cálculo (ver filtro_high_boost). Padrão é "separavel".
+        cor (bool, optional): Se True, filtra os três canais de cor em vez da imagem em tons
+                              de cinza. Padrão é False.
 
     Returns:
         numpy.ndarray: A imagem resultante com o filtro high-boost aplicado.
     """
-    img = cv2.imread(img_path)  # Carrega a imagem do caminho especificado
-    img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)  # Converte a imagem para tons de cinza
-
-    # Aplica um desfoque Gaussiano à imagem em tons de cinza.
-    # Isso cria uma versão "borrada" da imagem, que será usada para criar a máscara.
-    # O tamanho do kernel (5, 5) define o nível de desfoque.
-    blur = cv2.GaussianBlur(img_gray, (5, 5), 0)
+    # Carrega a imagem já em tons de cinza, ou em cores (decodificada uma vez e mantida no cache de imagens)
+    img = carregar_imagem(img_path, cv2.IMREAD_COLOR if cor else cv2.IMREAD_GRAYSCALE)
 
-    # Calcula a máscara de nitidez subtraindo a imagem borrada da imagem original em tons de cinza.
-    # Essa máscara contém as informações de alta frequência (bordas e detalhes).
-    mask = cv2.subtract(img_gray, blur)
-
-    # Aplica o filtro high-boost.
-    # cv2.addWeighted combina duas imagens linearmente:
-    # img_gray * A + mask * 1 + 0
-    # O parâmetro 'A' controla a intensidade do realce da máscara.
-    high_boost = cv2.addWeighted(img_gray, A, mask, 1, 0)
+    # Aplica o filtro high-boost (desfoque e combinação ponderada com a máscara de nitidez)
+    high_boost = filtro_high_boost(img, A, dst=dst, metodo=metodo)
 
-    output_path = "out/03_high_boost.jpg"  # Define o caminho de saída para a imagem processada
-    cv2.imwrite(output_path, high_boost)  # Salva a imagem high-boost no caminho especificado
-    print(f"    Imagem High-Boost salva em {output_path}")  # Imprime uma mensagem de confirmação
+    if output_path is not None:
+        # Salva a imagem high-boost no caminho especificado (em segundo plano, se o destino for assíncrono)
+        output_path = (saida or SAIDA_SINCRONA).salvar(high_boost, output_path)
+        print(f"    Imagem High-Boost salva em {output_path}")  # Imprime uma mensagem de confirmação
     return high_boost  # Retorna a imagem com o filtro high-boost aplicado
 
 
-def _03_2_filtro_passa_alta(img_path):
+@perfilar()
+def _03_2_filtro_passa_alta(img_path, output_path="out/03_passa_alta.jpg", saida=None, dst=None):
     """
     Aplica o filtro passa-alta a uma imagem usando um kernel Laplaciano.
 
@@ -55,23 +212,24 @@ def _03_2_filtro_passa_alta(img_path):
 
     Args:
         img_path (str): O caminho para a imagem de entrada.
+        output_path (str, optional): O caminho onde a imagem processada será salva.
+                                     Se None, nada é gravado. Padrão é "out/03_passa_alta.jpg".
+        saida (SaidaImagem, optional): O destino que codifica e grava a imagem (ex: em
+                                       segundo plano). Padrão é a gravação síncrona.
+        dst (numpy.ndarray, optional): Um array pré-alocado (uint8, tamanho da imagem) onde o
+                                       resultado é gravado.
 
     Returns:
         numpy.ndarray: A imagem resultante com o filtro passa-alta aplicado.
     """
-    img = cv2.imread(img_path)  # Carrega a imagem do caminho especificado
-    img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)  # Converte a imagem para tons de cinza
-
-    # Define um kernel Laplaciano.
-    # Este kernel é comumente usado para detecção de bordas e realce de detalhes.
-    # O valor central positivo e os valores negativos ao redor realçam as mudanças de intensidade.
-    kernel = np.array([[-1, -1, -1], [-1, 8, -1], [-1, -1, -1]])
+    # Carrega a imagem já em tons de cinza (decodificada uma vez e mantida no cache de imagens)
+    img_gray = carregar_imagem(img_path, cv2.IMREAD_GRAYSCALE)
 
-    # Aplica o filtro 2D (convolução) à imagem em tons de cinza usando o kernel Laplaciano.
-    # O parâmetro -1 indica que a profundidade da imagem de saída será a mesma da imagem de entrada.
-    passa_alta = cv2.filter2D(img_gray, -1, kernel)
+    # Aplica o filtro 2D (convolução) com o kernel Laplaciano
+    passa_alta = filtro_passa_alta(img_gray, dst=dst)
 
-    output_path = "out/03_passa_alta.jpg"  # Define o caminho de saída para a imagem processada
-    cv2.imwrite(output_path, passa_alta)  # Salva a imagem passa-alta no caminho especificado
-    print(f"    Imagem Passa-Alta salva em {output_path}")  # Imprime uma mensagem de confirmação
+    if output_path is not None:
+        # Salva a imagem passa-alta no caminho especificado (em segundo plano, se o destino for assíncrono)
+        output_path = (saida or SAIDA_SINCRONA).salvar(passa_alta, output_path)
+        print(f"    Imagem Passa-Alta salva em {output_path}")  # Imprime uma mensagem de confirmação
     return passa_alta  # Retorna a imagem com o filtro passa-alta aplicado
@@ -0,0 +1,472 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from components.comparacao import comparar_arrays
+from components.perfil import perfilar, secao
+from components.utils import carregar_imagem, modo_leitura
+
+# Índice de hashes perceptuais para achar imagens repetidas ou quase repetidas.
+# Cada imagem vira três hashes de 64 bits (aHash, dHash e pHash), calculados uma única vez a
+# partir de uma decodificação reduzida e guardados em um arquivo JSON. Imagens parecidas têm
+# hashes a poucos bits de distância (distância de Hamming), e uma árvore BK responde "quais
+# hashes estão a no máximo r bits deste?" sem comparar com todos os N hashes do índice.
+# Só os candidatos devolvidos pela árvore são decodificados em resolução cheia e comparados
+# pixel a pixel (comparacao.comparar_arrays), em vez dos N² pares.
+
+TIPOS_HASH = ("ahash", "dhash", "phash")
+_VERSAO_INDICE = 1
+
+# Lado da imagem usada no pHash (a DCT 32x32 é reduzida aos 8x8 coeficientes de baixa frequência)
+_LADO_PHASH = 32
+_LADO_HASH = 8
+
+# Redução na decodificação: o hash só usa uma miniatura, então o decodificador JPEG já entrega
+# a imagem 8 vezes menor (e muito mais rápido); o cv2.resize com INTER_AREA faz o resto
+_REDUCAO_LEITURA = 8
+
+
+def _bits_para_int(bits):
+    # 64 booleanos (linha por linha) viram um inteiro de 64 bits, com o primeiro pixel no bit mais alto
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def hash_media(img):
+    """
+    Calcula o aHash: a miniatura 8x8 em tons de cinza, com 1 onde o pixel está acima da média.
+
+    Args:
+        img (numpy.ndarray): A imagem (em cores ou em tons de cinza).
+
+    Returns:
+        int: O hash de 64 bits.
+    """
+    miniatura = cv2.resize(_cinza(img), (_LADO_HASH, _LADO_HASH), interpolation=cv2.INTER_AREA)
+    return _bits_para_int(miniatura > miniatura.mean())
+
+
+def hash_diferenca(img):
+    """
+    Calcula o dHash: a miniatura 9x8 em tons de cinza, com 1 onde o pixel é mais claro que o vizinho à esquerda.
+
+    Args:
+        img (numpy.ndarray): A imagem (em cores ou em tons de cinza).
+
+    Returns:
+        int: O hash de 64 bits.
+    """
+    miniatura = cv2.resize(_cinza(img), (_LADO_HASH + 1, _LADO_HASH), interpolation=cv2.INTER_AREA)
+    return _bits_para_int(miniatura[:, 1:] > miniatura[:, :-1])
+
+
+def hash_perceptual(img):
+    """
+    Calcula o pHash: a DCT da miniatura 32x32, com 1 onde cada um dos 8x8 coeficientes de baixa
+    frequência está acima da mediana deles.
+
+    O coeficiente DC (brilho médio) fica de fora da mediana, então o hash não muda com ajustes
+    uniformes de brilho; pequenas mudanças de contraste, compressão e redimensionamento alteram
+    poucos bits.
+
+    Args:
+        img (numpy.ndarray): A imagem (em cores ou em tons de cinza).
+
+    Returns:
+        int: O hash de 64 bits.
+    """
+    miniatura = cv2.resize(_cinza(img), (_LADO_PHASH, _LADO_PHASH), interpolation=cv2.INTER_AREA)
+    coeficientes = cv2.dct(miniatura.astype(np.float32))[:_LADO_HASH, :_LADO_HASH]
+    mediana = np.median(coeficientes.ravel()[1:])
+    return _bits_para_int(coeficientes > mediana)
+
+
+def _cinza(img):
+    # Os hashes são calculados na luminância
+    if img.ndim == 3:
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return img
+
+
+@perfilar()
+def calcular_hashes(img):
+    """
+    Calcula os três hashes perceptuais de uma imagem.
+
+    Args:
+        img (numpy.ndarray): A imagem (em cores ou em tons de cinza).
+
+    Returns:
+        dict: {"ahash": int, "dhash": int, "phash": int}.
+    """
+    cinza = _cinza(img)
+    return {"ahash": hash_media(cinza), "dhash": hash_diferenca(cinza), "phash": hash_perceptual(cinza)}
+
+
+def distancia_hamming(a, b):
+    """
+    Conta quantos bits diferem entre dois hashes.
+
+    Args:
+        a (int): O primeiro hash.
+        b (int): O segundo hash.
+
+    Returns:
+        int: A distância de Hamming (0 a 64).
+    """
+    return (a ^ b).bit_count()
+
+
+class ArvoreBK:
+    """
+    Árvore BK (Burkhard-Keller) de hashes, para buscas por distância de Hamming.
+
+    Cada nó guarda um hash e os filhos indexados pela distância até ele. Pela desigualdade
+    triangular, uma busca com raio r a partir de um nó a distância d só precisa descer nos
+    filhos com distância entre d - r e d + r, o que descarta a maior parte da árvore para
+    raios pequenos. Hashes repetidos ficam no mesmo nó, com todos os seus identificadores.
+    """
+
+    def __init__(self):
+        self._raiz = None
+        self._tamanho = 0
+
+    def __len__(self):
+        return self._tamanho
+
+    def inserir(self, valor, identificador):
+        """
+        Insere um hash na árvore.
+
+        Args:
+            valor (int): O hash.
+            identificador: O objeto devolvido pelas buscas (ex: o caminho da imagem).
+        """
+        self._tamanho += 1
+        if self._raiz is None:
+            self._raiz = (valor, [identificador], {})
+            return
+        no = self._raiz
+        while True:
+            distancia = distancia_hamming(valor, no[0])
+            if distancia == 0:
+                no[1].append(identificador)
+                return
+            filho = no[2].get(distancia)
+            if filho is None:
+                no[2][distancia] = (valor, [identificador], {})
+                return
+            no = filho
+
+    def buscar(self, valor, raio):
+        """
+        Encontra todos os hashes a no máximo `raio` bits de distância.
+
+        Args:
+            valor (int): O hash consultado.
+            raio (int): A distância de Hamming máxima.
+
+        Returns:
+            list[tuple]: Pares (distância, identificador), do mais próximo ao mais distante.
+        """
+        encontrados = []
+        pendentes = [self._raiz] if self._raiz is not None else []
+        while pendentes:
+            no = pendentes.pop()
+            distancia = distancia_hamming(valor, no[0])
+            if distancia <= raio:
+                encontrados.extend((distancia, identificador) for identificador in no[1])
+            for d, filho in no[2].items():
+                if distancia - raio <= d <= distancia + raio:
+                    pendentes.append(filho)
+        encontrados.sort(key=lambda par: par[0])
+        return encontrados
+
+
+def caminho_indice_padrao():
+    """
+    Retorna o caminho padrão do arquivo do índice de hashes.
+
+    O caminho pode ser definido pela variável de ambiente VCRM_INDICE; o padrão é
+    out/indice_hashes.json, junto das imagens resultantes.
+
+    Returns:
+        str: O caminho do arquivo.
+    """
+    return os.environ.get("VCRM_INDICE", os.path.join("out", "indice_hashes.json"))
+
+
+def _hash_de_arquivo(caminho):
+    # Decodificação reduzida e em tons de cinza: o hash só precisa de uma miniatura.
+    # A leitura não passa pelo cache de imagens, para não encher o cache com N miniaturas.
+    with secao("indice.decodificar") as medicao:
+        img = cv2.imread(caminho, modo_leitura(cinza=True, reducao=_REDUCAO_LEITURA))
+        medicao.registrar(img)
+    if img is None:
+        raise FileNotFoundError(f"  ⤷ Não foi possível carregar a imagem em: {caminho}")
+    return calcular_hashes(img)
+
+
+class IndiceImagens:
+    """
+    Índice em disco de hashes perceptuais, com busca de vizinhos por distância de Hamming.
+
+    O arquivo guarda, para cada imagem (caminho absoluto), a data de modificação e os três
+    hashes; ao atualizar o índice, só as imagens novas ou alteradas são decodificadas. As
+    árvores BK são montadas na memória, a partir dos hashes, na primeira busca.
+
+    Uso típico:
+        indice = IndiceImagens()
+        indice.atualizar(expandir_entradas(["out/"], recursivo=True))
+        indice.salvar()
+        pares = indice.duplicatas(raio=6)
+
+    Args:
+        caminho (str, optional): O arquivo JSON do índice. Padrão é caminho_indice_padrao().
+                                 Se o arquivo existir, os hashes são carregados dele.
+        tipo_hash (str, optional): O hash usado nas buscas ("ahash", "dhash" ou "phash").
+                                   Padrão é "phash".
+
+    Raises:
+        ValueError: Se o tipo de hash for desconhecido.
+    """
+
+    def __init__(self, caminho=None, tipo_hash="phash"):
+        if tipo_hash not in TIPOS_HASH:
+            raise ValueError(f"Tipo de hash desconhecido: {tipo_hash}. Use um de {TIPOS_HASH}.")
+        self.caminho = caminho or caminho_indice_padrao()
+        self.tipo_hash = tipo_hash
+        self._entradas = {}
+        self._arvores = {}
+        self._lock = threading.Lock()
+        self._carregar()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def __contains__(self, caminho):
+        return os.path.abspath(caminho) in self._entradas
+
+    def _carregar(self):
+        # Um arquivo ausente, corrompido ou de outra versão equivale a um índice vazio
+        try:
+            with open(self.caminho, encoding="utf-8") as arquivo:
+                dados = json.load(arquivo)
+        except (OSError, ValueError):
+            return
+        if dados.get("versao") != _VERSAO_INDICE:
+            return
+        for caminho, entrada in dados.get("imagens", {}).items():
+            hashes = {tipo: int(entrada[tipo], 16) for tipo in TIPOS_HASH}
+            self._entradas[caminho] = {"mtime": entrada["mtime"], **hashes}
+
+    def salvar(self):
+        """
+        Grava o índice no arquivo (os hashes em hexadecimal).
+
+        O arquivo é escrito em um temporário e renomeado, então uma interrupção no meio da
+        gravação não corrompe o índice anterior.
+        """
+        with self._lock:
+            imagens = {
+                caminho: {"mtime": entrada["mtime"], **{tipo: f"{entrada[tipo]:016x}" for tipo in TIPOS_HASH}}
+                for caminho, entrada in sorted(self._entradas.items())
+            }
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        temporario = f"{self.caminho}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump({"versao": _VERSAO_INDICE, "imagens": imagens}, arquivo, indent=1)
+        os.replace(temporario, self.caminho)
+
+    def atualizar(self, caminhos, trabalhadores=None, remover_ausentes=False):
+        """
+        Calcula os hashes das imagens novas ou alteradas desde a última atualização.
+
+        As decodificações rodam em um pool de threads (o OpenCV libera o GIL ao decodificar).
+
+        Args:
+            caminhos (list[str]): Os caminhos das imagens.
+            trabalhadores (int, optional): Threads de decodificação. Padrão é o nº de CPUs.
+            remover_ausentes (bool, optional): Se True, também tira do índice as imagens que
+                                               não existem mais em disco. Padrão é False.
+
+        Returns:
+            dict: "novas" (quantas imagens foram hasheadas), "inalteradas", "removidas" e
+                  "erros" (lista de (caminho, mensagem) das imagens que não puderam ser lidas).
+        """
+        pendentes, inalteradas = [], 0
+        for caminho in caminhos:
+            absoluto = os.path.abspath(caminho)
+            try:
+                mtime = os.stat(absoluto).st_mtime_ns
+            except OSError:
+                pendentes.append((absoluto, None))
+                continue
+            entrada = self._entradas.get(absoluto)
+            if entrada is not None and entrada["mtime"] == mtime:
+                inalteradas += 1
+            else:
+                pendentes.append((absoluto, mtime))
+
+        erros = []
+
+        def hashear(item):
+            absoluto, mtime = item
+            try:
+                return absoluto, mtime, _hash_de_arquivo(absoluto)
+            except FileNotFoundError as exc:
+                return absoluto, mtime, exc
+
+        with ThreadPoolExecutor(max_workers=trabalhadores or os.cpu_count() or 1) as executor:
+            for absoluto, mtime, hashes in executor.map(hashear, pendentes):
+                if isinstance(hashes, Exception):
+                    erros.append((absoluto, str(hashes)))
+                    continue
+                with self._lock:
+                    self._entradas[absoluto] = {"mtime": mtime, **hashes}
+
+        removidas = 0
+        if remover_ausentes:
+            with self._lock:
+                for caminho in [c for c in self._entradas if not os.path.exists(c)]:
+                    del self._entradas[caminho]
+                    removidas += 1
+
+        with self._lock:
+            self._arvores.clear()
+        return {"novas": len(pendentes) - len(erros), "inalteradas": inalteradas, "removidas": removidas, "erros": erros}
+
+    def hashes(self, caminho):
+        """
+        Retorna os hashes de uma imagem do índice.
+
+        Args:
+            caminho (str): O caminho da imagem.
+
+        Returns:
+            dict: {"ahash": int, "dhash": int, "phash": int}.
+
+        Raises:
+            KeyError: Se a imagem não estiver no índice.
+        """
+        entrada = self._entradas[os.path.abspath(caminho)]
+        return {tipo: entrada[tipo] for tipo in TIPOS_HASH}
+
+    def _arvore(self, tipo_hash):
+        # Árvore BK do tipo de hash, montada sob demanda e descartada quando o índice muda
+        with self._lock:
+            arvore = self._arvores.get(tipo_hash)
+            if arvore is None:
+                arvore = ArvoreBK()
+                for caminho, entrada in self._entradas.items():
+                    arvore.inserir(entrada[tipo_hash], caminho)
+                self._arvores[tipo_hash] = arvore
+            return arvore
+
+    def buscar(self, consulta, raio=8, tipo_hash=None):
+        """
+        Encontra as imagens do índice parecidas com a consulta.
+
+        Args:
+            consulta (str or numpy.ndarray): O caminho de uma imagem ou a imagem já carregada.
+                                             Se o caminho estiver no índice, os hashes
+                                             guardados são usados e a própria imagem não
+                                             aparece no resultado.
+            raio (int, optional): A distância de Hamming máxima (em bits, de 64). Padrão é 8.
+            tipo_hash (str, optional): O hash usado. Padrão é o tipo_hash do índice.
+
+        Returns:
+            list[tuple]: Pares (distância, caminho), do mais parecido ao menos parecido.
+        """
+        tipo_hash = tipo_hash or self.tipo_hash
+        proprio = None
+        if isinstance(consulta, str):
+            proprio = os.path.abspath(consulta)
+            entrada = self._entradas.get(proprio)
+            valor = entrada[tipo_hash] if entrada else _hash_de_arquivo(consulta)[tipo_hash]
+        else:
+            valor = calcular_hashes(consulta)[tipo_hash]
+        return [par for par in self._arvore(tipo_hash).buscar(valor, raio) if par[1] != proprio]
+
+    def candidatos(self, raio=8, tipo_hash=None):
+        """
+        Lista os pares de imagens do índice com hashes a no máximo `raio` bits de distância.
+
+        Cada imagem é consultada uma vez na árvore BK, então o custo fica perto de
+        N · (nós visitados por busca), em vez dos N² pares.
+
+        Args:
+            raio (int, optional): A distância de Hamming máxima. Padrão é 8.
+            tipo_hash (str, optional): O hash usado. Padrão é o tipo_hash do índice.
+
+        Returns:
+            list[tuple]: Trios (distância, caminho_a, caminho_b), com caminho_a < caminho_b,
+                         do par mais parecido ao menos parecido.
+        """
+        tipo_hash = tipo_hash or self.tipo_hash
+        arvore = self._arvore(tipo_hash)
+        pares = []
+        for caminho, entrada in self._entradas.items():
+            for distancia, outro in arvore.buscar(entrada[tipo_hash], raio):
+                if caminho < outro:
+                    pares.append((distancia, caminho, outro))
+        pares.sort()
+        return pares
+
+    def duplicatas(self, raio=8, tipo_hash=None, verificar=True, psnr_minimo=None):
+        """
+        Encontra imagens repetidas ou quase repetidas: candidatos pelo hash, confirmados pixel a pixel.
+
+        Só as imagens dos pares candidatos são decodificadas em resolução cheia. A comparação
+        exata é a mesma de _03_comparar_imagens (comparacao.comparar_arrays, sem o SSIM);
+        imagens de tamanhos diferentes não têm comparação pixel a pixel.
+
+        Args:
+            raio (int, optional): A distância de Hamming máxima dos candidatos. Padrão é 8.
+            tipo_hash (str, optional): O hash usado. Padrão é o tipo_hash do índice.
+            verificar (bool, optional): Se True (padrão), compara os pixels de cada par candidato.
+            psnr_minimo (float, optional): Se informado, só ficam os pares verificados com PSNR
+                                           de pelo menos este valor (em dB; idênticas têm PSNR
+                                           infinito). Padrão é manter todos os candidatos.
+
+        Returns:
+            list[dict]: Um dicionário por par, com "a", "b", "distancia" e, se verificado,
+                        "iguais", "psnr" (None se os tamanhos diferem) e "percentual_diferenca".
+        """
+        resultado = []
+        for distancia, a, b in self.candidatos(raio, tipo_hash):
+            par = {"a": a, "b": b, "distancia": distancia}
+            if verificar:
+                par.update(verificar_par(a, b))
+                if psnr_minimo is not None and (par["psnr"] is None or par["psnr"] < psnr_minimo):
+                    continue
+            resultado.append(par)
+        return resultado
+
+
+def verificar_par(caminho_a, caminho_b):
+    """
+    Compara pixel a pixel duas imagens candidatas a duplicata.
+
+    Args:
+        caminho_a (str): O caminho da primeira imagem.
+        caminho_b (str): O caminho da segunda imagem.
+
+    Returns:
+        dict: "iguais", "psnr" e "percentual_diferenca" (os dois últimos None se as imagens
+              tiverem tamanhos diferentes).
+    """
+    # As imagens passam pelo cache: a mesma imagem costuma aparecer em vários pares
+    img_a = carregar_imagem(caminho_a, cv2.IMREAD_COLOR)
+    img_b = carregar_imagem(caminho_b, cv2.IMREAD_COLOR)
+    if img_a.shape != img_b.shape:
+        return {"iguais": False, "psnr": None, "percentual_diferenca": None}
+    metricas = comparar_arrays(img_a, img_b, calcular_ssim=False)
+    return {
+        "iguais": metricas["iguais"],
+        "psnr": metricas["psnr"],
+        "percentual_diferenca": metricas["percentual_diferenca"],
+    }
@@ -0,0 +1,307 @@
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+
+import cv2
+import numpy as np
+
+from components.filtros import _03_1_filtro_high_boost, _03_2_filtro_passa_alta
+from components.processamento import _01_clusterizacao_tons_cinza, _02_subtrai_e_delineia
+from components.perfil import secao
+from components.saida import SaidaImagem
+from components.utils import configurar_cache_imagens
+
+# Extensões de imagem reconhecidas ao expandir diretórios de entrada.
+EXTENSOES_IMAGEM = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+# Destino de gravação do processo atual (um por processo do pool, criado em _inicializar_worker).
+# None quando o lote roda sem gravar as saídas.
+_saida_worker = None
+
+# Limite do cache de imagens decodificadas em cada processo do pool. Um lote decodifica cada
+# arquivo uma vez, então o cache só tem o que reaproveitar no fundo da subtração (repetido em
+# todas as tarefas); com o limite padrão (512 MiB), cada processo prenderia imagens mortas.
+_CACHE_IMAGENS_WORKER = 64 * 1024 * 1024
+
+
+def expandir_entradas(entradas, recursivo=False):
+    """
+    Expande uma lista de caminhos, diretórios e padrões glob em uma lista de arquivos de imagem.
+
+    Args:
+        entradas (list[str]): Caminhos de arquivos, diretórios ou padrões glob (ex: "src/*.jpeg").
+        recursivo (bool, optional): Se True, percorre os subdiretórios das entradas que forem
+                                    diretórios. Padrão é False.
+
+    Returns:
+        list[str]: Os caminhos dos arquivos encontrados, sem repetições e em ordem alfabética.
+    """
+    arquivos = set()
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            padrao = os.path.join(entrada, "**", "*") if recursivo else os.path.join(entrada, "*")
+            candidatos = glob.glob(padrao, recursive=recursivo)
+        else:
+            # Um caminho comum também é um padrão glob válido (que casa apenas com ele mesmo)
+            candidatos = glob.glob(entrada, recursive=True)
+        for caminho in candidatos:
+            if os.path.isfile(caminho) and caminho.lower().endswith(EXTENSOES_IMAGEM):
+                arquivos.add(os.path.normpath(caminho))
+    return sorted(arquivos)
+
+
+def caminho_saida(entrada, raiz, dir_saida, sufixo, extensao=".jpg"):
+    """
+    Monta o caminho de saída de uma imagem a partir do caminho de entrada.
+
+    A estrutura de diretórios relativa à raiz comum das entradas é preservada, e o
+    nome do arquivo recebe o sufixo da operação. Por exemplo, "src/fotos/a.jpeg" com
+    raiz "src" e sufixo "clusterizada" resulta em "<dir_saida>/fotos/a_clusterizada.jpg".
+
+    Args:
+        entrada (str): O caminho da imagem de entrada.
+        raiz (str): O diretório raiz comum de todas as entradas.
+        dir_saida (str): O diretório onde as saídas serão gravadas.
+        sufixo (str): O sufixo que identifica a operação aplicada.
+        extensao (str, optional): A extensão do arquivo de saída. Padrão é ".jpg".
+
+    Returns:
+        str: O caminho do arquivo de saída.
+    """
+    relativo = os.path.relpath(os.path.dirname(os.path.abspath(entrada)), raiz)
+    nome = os.path.splitext(os.path.basename(entrada))[0]
+    return os.path.normpath(os.path.join(dir_saida, relativo, f"{nome}_{sufixo}{extensao}"))
+
+
+def _verificar_colisoes(entradas, raiz, dir_saida):
+    # O nome de saída descarta a extensão da entrada, então "a.jpg" e "a.png" no mesmo
+    # diretório iriam para o mesmo arquivo, e uma saída sobrescreveria a outra em silêncio
+    destinos = {}
+    for entrada in entradas:
+        destinos.setdefault(os.path.normcase(caminho_saida(entrada, raiz, dir_saida, "")), []).append(entrada)
+    colisoes = [grupo for grupo in destinos.values() if len(grupo) > 1]
+    if colisoes:
+        exemplos = "; ".join(", ".join(grupo) for grupo in colisoes[:5])
+        raise ValueError(
+            f"{len(colisoes)} grupos de entradas teriam o mesmo arquivo de saída (mesmo nome, "
+            f"extensões diferentes): {exemplos}. Processe-as em lotes separados ou renomeie-as."
+        )
+
+
+def _destino(entrada, raiz, dir_saida, sufixo):
+    # Caminho de saída já com a extensão do formato configurado, ou None se o lote não grava
+    if _saida_worker is None:
+        return None
+    return _saida_worker.caminho(caminho_saida(entrada, raiz, dir_saida, sufixo))
+
+
+def _tarefa_clusterizar(entrada, raiz, dir_saida, params):
+    saida = _destino(entrada, raiz, dir_saida, "clusterizada")
+    _01_clusterizacao_tons_cinza(
+        entrada,
+        params.get("qtd_grupo", 4),
+        output_path=saida,
+        metodo=params.get("metodo", "uniforme"),
+        saida=_saida_worker,
+    )
+    return [saida]
+
+
+def _tarefa_subtrair(entrada, raiz, dir_saida, params):
+    saida_binaria = _destino(entrada, raiz, dir_saida, "subtracao_binaria")
+    saida_contorno = _destino(entrada, raiz, dir_saida, "com_contorno")
+    _02_subtrai_e_delineia(
+        params["fundo"],
+        entrada,
+        params.get("limiar", 50),
+        output_binaria_path=saida_binaria,
+        output_contorno_path=saida_contorno,
+        saida=_saida_worker,
+        modo=params.get("modo", "contornos"),
+    )
+    return [saida_binaria, saida_contorno]
+
+
+def _tarefa_high_boost(entrada, raiz, dir_saida, params):
+    saida = _destino(entrada, raiz, dir_saida, "high_boost")
+    _03_1_filtro_high_boost(
+        entrada,
+        params.get("A", 1.5),
+        output_path=saida,
+        saida=_saida_worker,
+        metodo=params.get("metodo", "separavel"),
+        cor=params.get("cor", False),
+    )
+    return [saida]
+
+
+def _tarefa_passa_alta(entrada, raiz, dir_saida, params):
+    saida = _destino(entrada, raiz, dir_saida, "passa_alta")
+    _03_2_filtro_passa_alta(entrada, output_path=saida, saida=_saida_worker)
+    return [saida]
+
+
+# Operações disponíveis no modo em lote, indexadas pelo nome do subcomando
+OPERACOES = {
+    "clusterizar": _tarefa_clusterizar,
+    "subtrair": _tarefa_subtrair,
+    "high-boost": _tarefa_high_boost,
+    "passa-alta": _tarefa_passa_alta,
+}
+
+
+def _inicializar_worker(opcoes_saida=None):
+    # Cada processo do pool já é uma unidade de paralelismo; limitar o OpenCV a uma
+    # thread evita que N processos disputem os mesmos núcleos com N threads cada.
+    cv2.setNumThreads(1)
+    configurar_cache_imagens(_CACHE_IMAGENS_WORKER)
+
+    # Cada processo grava as próprias saídas em segundo plano, enquanto processa a próxima
+    # imagem. As gravações pendentes são concluídas quando o processo termina.
+    global _saida_worker
+    _saida_worker = None if opcoes_saida is None else SaidaImagem(**opcoes_saida)
+    if _saida_worker is not None:
+        Finalize(_saida_worker, _encerrar_saida_worker, args=(_saida_worker,), exitpriority=10)
+
+
+def _encerrar_saida_worker(saida):
+    # Ao fim de um processo do pool não há mais a quem devolver os erros: eles vão para stderr
+    erros = saida.concluir()
+    saida.fechar()
+    for exc in erros:
+        print(f"  ⤷ Erro de gravação: {type(exc).__name__}: {exc}", file=sys.stderr)
+
+
+def _executar_tarefa(args):
+    """
+    Executa uma operação sobre uma única imagem dentro de um processo do pool.
+
+    Returns:
+        tuple: (entrada, saídas, latência em segundos, mensagem de erro ou None, erros de
+               gravação concluídos desde a tarefa anterior).
+    """
+    operacao, entrada, raiz, dir_saida, params = args
+    inicio = time.perf_counter()
+    try:
+        # As funções de processamento imprimem uma linha por imagem salva; em lote isso
+        # só polui o terminal, então a saída padrão é descartada.
+        with contextlib.redirect_stdout(io.StringIO()), secao(f"lote.{operacao}"):
+            saidas = [s for s in OPERACOES[operacao](entrada, raiz, dir_saida, params) if s is not None]
+        erro = None
+    except Exception as exc:  # Uma imagem com problema não deve interromper o lote inteiro
+        saidas, erro = [], f"{type(exc).__name__}: {exc}"
+    latencia = time.perf_counter() - inicio
+
+    # A gravação é assíncrona: os erros são de imagens anteriores, e a mensagem traz o caminho
+    erros_gravacao = [] if _saida_worker is None else _saida_worker.coletar_erros()
+    return entrada, saidas, latencia, erro, [f"{type(e).__name__}: {e}" for e in erros_gravacao]
+
+
+def executar_lote(
+    operacao, entradas, dir_saida="out/lote", processos=None, chunksize=None, params=None, opcoes_saida=None, gravar=True
+):
+    """
+    Aplica uma operação a um conjunto de imagens usando um pool de processos.
+
+    Args:
+        operacao (str): O nome da operação (uma das chaves de OPERACOES).
+        entradas (list[str]): Os caminhos das imagens de entrada (já expandidos).
+        dir_saida (str, optional): O diretório onde as saídas serão gravadas. Padrão é "out/lote".
+        processos (int, optional): O número de processos do pool. Padrão é o número de CPUs.
+        chunksize (int, optional): Quantas imagens cada processo recebe por despacho.
+                                   Por padrão, divide as entradas em ~4 blocos por processo,
+                                   equilibrando o custo de comunicação e o balanceamento de carga.
+        params (dict, optional): Parâmetros específicos da operação (ex: {"A": 2.0}).
+        opcoes_saida (dict, optional): Argumentos da SaidaImagem de cada processo, como
+                                       formato, qualidade_jpeg, nivel_png e trabalhadores
+                                       (ex: {"formato": "png", "nivel_png": 1}).
+        gravar (bool, optional): Se False, as imagens são processadas mas nada é gravado
+                                 (útil para medir só o processamento). Padrão é True.
+
+    Returns:
+        dict: Um resumo da execução com a vazão, as latências p50/p95 e os erros por imagem.
+              Erros de gravação aparecem com o caminho da saída. No pool de processos, os
+              erros das últimas gravações de cada processo são impressos em stderr.
+
+    Raises:
+        ValueError: Se a operação for desconhecida, se não houver entradas ou se duas entradas
+                    fossem gravadas no mesmo arquivo de saída (ex: "a.jpg" e "a.png").
+    """
+    if operacao not in OPERACOES:
+        raise ValueError(f"Operação desconhecida: {operacao}. Opções: {', '.join(OPERACOES)}")
+    if not entradas:
+        raise ValueError("Nenhuma imagem de entrada encontrada.")
+
+    params = params or {}
+    processos = processos or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(entradas) // (processos * 4))
+
+    # A raiz comum preserva a estrutura de diretórios das entradas e evita colisões de nomes
+    raiz = os.path.commonpath([os.path.dirname(os.path.abspath(e)) for e in entradas])
+    tarefas = [(operacao, entrada, raiz, dir_saida, params) for entrada in entradas]
+    opcoes_saida = dict(opcoes_saida or {}) if gravar else None
+    if gravar:
+        _verificar_colisoes(entradas, raiz, dir_saida)
+
+    # O diretório de saída é criado pela própria SaidaImagem, ao gravar cada arquivo
+    inicio = time.perf_counter()
+    erros_finais = []
+    if processos == 1:
+        # No próprio processo, as gravações pendentes são concluídas aqui, e os erros entram no resumo
+        global _saida_worker
+        cv2.setNumThreads(1)
+        _saida_worker = None if opcoes_saida is None else SaidaImagem(**opcoes_saida)
+        try:
+            resultados = [_executar_tarefa(t) for t in tarefas]
+        finally:
+            if _saida_worker is not None:
+                erros_finais = [f"{type(e).__name__}: {e}" for e in _saida_worker.concluir()]
+                _saida_worker.fechar()
+            _saida_worker = None
+    else:
+        with ProcessPoolExecutor(
+            max_workers=processos, initializer=_inicializar_worker, initargs=(opcoes_saida,)
+        ) as executor:
+            resultados = list(executor.map(_executar_tarefa, tarefas, chunksize=chunksize))
+    tempo_total = time.perf_counter() - inicio
+
+    latencias = np.array([r[2] for r in resultados if r[3] is None])
+    erros = [(r[0], r[3]) for r in resultados if r[3] is not None]
+    erros += [("gravação", e) for r in resultados for e in r[4]]
+    erros += [("gravação", e) for e in erros_finais]
+    return {
+        "operacao": operacao,
+        "imagens": len(entradas),
+        "sucesso": len(latencias),
+        "erros": erros,
+        "processos": processos,
+        "chunksize": chunksize,
+        "tempo_total": tempo_total,
+        "imagens_por_segundo": len(latencias) / tempo_total if tempo_total > 0 else 0.0,
+        "latencia_p50": float(np.percentile(latencias, 50)) if latencias.size else 0.0,
+        "latencia_p95": float(np.percentile(latencias, 95)) if latencias.size else 0.0,
+    }
+
+
+def imprimir_resumo(resumo):
+    """
+    Imprime o resumo de vazão e latência de uma execução em lote.
+
+    Args:
+        resumo (dict): O dicionário retornado por executar_lote.
+    """
+    print(f"  ⤷ Operação: {resumo['operacao']}")
+    print(f"  ⤷ Imagens processadas: {resumo['sucesso']}/{resumo['imagens']}")
+    print(f"  ⤷ Processos: {resumo['processos']} (chunksize {resumo['chunksize']})")
+    print(f"  ⤷ Tempo total: {resumo['tempo_total']:.3f} segundos")
+    print(f"  ⤷ Vazão: {resumo['imagens_por_segundo']:.2f} imagens/s")
+    print(f"  ⤷ Latência p50: {resumo['latencia_p50'] * 1000:.1f} ms")
+    print(f"  ⤷ Latência p95: {resumo['latencia_p95'] * 1000:.1f} ms")
+    for entrada, erro in resumo["erros"]:
+        print(f"  ⤷ Erro em {entrada}: {erro}")
@@ -0,0 +1,382 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from multiprocessing.util import Finalize, register_after_fork
+
+import numpy as np
+
+# Estado global do perfil. Com o perfil desligado, as funções instrumentadas só consultam
+# _ativo antes de chamar a função original, então o custo é praticamente nulo.
+_ativo = False
+_memoria = False
+_max_eventos = 100_000
+_lock = threading.Lock()
+_eventos = []
+_estatisticas = {}
+_origem_ns = time.perf_counter_ns()
+_local = threading.local()
+
+# Histograma de latência por etapa: o balde k conta as durações entre 2^(k-1) e 2^k microssegundos
+_BALDES = 40
+
+
+class _SecaoInativa:
+    # Gerenciador de contexto vazio devolvido por secao() com o perfil desligado
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        return False
+
+    def registrar(self, resultado):
+        pass
+
+
+_SECAO_INATIVA = _SecaoInativa()
+
+
+class _Secao:
+    # Mede uma execução de uma etapa: tempo de parede, tempo de CPU da thread e memória alocada
+    def __init__(self, nome):
+        self.nome = nome
+        self.forma = None
+        self.dtype = None
+
+    def registrar(self, resultado):
+        # Guarda o formato e o tipo da imagem produzida (ou da primeira imagem de uma tupla)
+        if isinstance(resultado, (tuple, list)) and resultado and isinstance(resultado[0], np.ndarray):
+            resultado = resultado[0]
+        if isinstance(resultado, np.ndarray):
+            self.forma = list(resultado.shape)
+            self.dtype = str(resultado.dtype)
+
+    def __enter__(self):
+        if _memoria and tracemalloc.is_tracing():
+            # O pico é reiniciado para medir só esta etapa; o pico das etapas aninhadas é
+            # repassado à etapa externa na saída. O tracemalloc tem um único pico por processo,
+            # então com etapas rodando em paralelo em várias threads o pico é aproximado.
+            pilha = getattr(_local, "pilha", None)
+            if pilha is None:
+                pilha = _local.pilha = []
+            self.memoria_inicio, pico_anterior = tracemalloc.get_traced_memory()
+            if pilha:
+                pilha[-1]["pico"] = max(pilha[-1]["pico"], pico_anterior)
+            pilha.append({"pico": 0})
+            tracemalloc.reset_peak()
+        else:
+            self.memoria_inicio = None
+        self.cpu_inicio = time.thread_time_ns()
+        self.inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        fim = time.perf_counter_ns()
+        cpu = time.thread_time_ns() - self.cpu_inicio
+        alocado = pico = None
+        if self.memoria_inicio is not None and tracemalloc.is_tracing():
+            atual, pico_medido = tracemalloc.get_traced_memory()
+            pico_filhos = _local.pilha.pop()["pico"]
+            pico_absoluto = max(pico_medido, pico_filhos)
+            alocado = atual - self.memoria_inicio
+            pico = pico_absoluto - self.memoria_inicio
+            if _local.pilha:
+                _local.pilha[-1]["pico"] = max(_local.pilha[-1]["pico"], pico_absoluto)
+        _registrar_evento(
+            {
+                "nome": self.nome,
+                "inicio_us": (self.inicio - _origem_ns) / 1000,
+                "duracao_us": (fim - self.inicio) / 1000,
+                "cpu_us": cpu / 1000,
+                "bytes_alocados": alocado,
+                "bytes_pico": pico,
+                "forma": self.forma,
+                "dtype": self.dtype,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "erro": None if tipo is None else tipo.__name__,
+            }
+        )
+        return False
+
+
+def _registrar_evento(evento):
+    # Acumula as estatísticas da etapa e guarda o evento para a exportação do trace
+    balde = min(int(evento["duracao_us"]).bit_length(), _BALDES - 1)
+    with _lock:
+        est = _estatisticas.get(evento["nome"])
+        if est is None:
+            est = _estatisticas[evento["nome"]] = {
+                "chamadas": 0,
+                "total_us": 0.0,
+                "cpu_us": 0.0,
+                "minimo_us": float("inf"),
+                "maximo_us": 0.0,
+                "bytes_pico_max": 0,
+                "histograma": [0] * _BALDES,
+            }
+        est["chamadas"] += 1
+        est["total_us"] += evento["duracao_us"]
+        est["cpu_us"] += evento["cpu_us"]
+        est["minimo_us"] = min(est["minimo_us"], evento["duracao_us"])
+        est["maximo_us"] = max(est["maximo_us"], evento["duracao_us"])
+        if evento["bytes_pico"] is not None:
+            est["bytes_pico_max"] = max(est["bytes_pico_max"], evento["bytes_pico"])
+        est["histograma"][balde] += 1
+        if len(_eventos) < _max_eventos:
+            _eventos.append(evento)
+
+
+def ativar_perfil(memoria=True, max_eventos=100_000):
+    """
+    Liga a coleta de perfil das etapas instrumentadas.
+
+    Args:
+        memoria (bool, optional): Se True (padrão), mede também os bytes alocados por etapa
+                                  com tracemalloc (que deixa as alocações mais lentas).
+        max_eventos (int, optional): Quantos eventos individuais são guardados para o trace.
+                                     As estatísticas continuam sendo acumuladas depois disso.
+                                     Padrão é 100000.
+    """
+    global _ativo, _memoria, _max_eventos
+    _max_eventos = max_eventos
+    _memoria = memoria
+    if memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _ativo = True
+
+
+def desativar_perfil():
+    """Desliga a coleta de perfil (os dados já coletados são mantidos)."""
+    global _ativo
+    _ativo = False
+    if _memoria and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def perfil_ativo():
+    """
+    Returns:
+        bool: True se a coleta de perfil estiver ligada.
+    """
+    return _ativo
+
+
+def limpar_perfil():
+    """Descarta os eventos e as estatísticas coletados."""
+    with _lock:
+        _eventos.clear()
+        _estatisticas.clear()
+
+
+def secao(nome):
+    """
+    Mede um trecho de código como uma etapa do perfil.
+
+    Exemplo:
+        with secao("lote.gravar") as s:
+            img = processar(...)
+            s.registrar(img)  # opcional: guarda o formato e o tipo da imagem
+
+    Args:
+        nome (str): O nome da etapa.
+
+    Returns:
+        Um gerenciador de contexto (vazio e sem custo se o perfil estiver desligado).
+    """
+    return _Secao(nome) if _ativo else _SECAO_INATIVA
+
+
+def perfilar(nome=None):
+    """
+    Decorador que mede cada chamada da função como uma etapa do perfil.
+
+    O formato e o tipo da imagem retornada (ou da primeira imagem de uma tupla) são registrados.
+
+    Args:
+        nome (str, optional): O nome da etapa. Padrão é "<módulo>.<função>".
+
+    Returns:
+        callable: O decorador.
+    """
+
+    def decorador(funcao):
+        rotulo = nome or f"{funcao.__module__.rsplit('.', 1)[-1]}.{funcao.__name__}"
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            if not _ativo:
+                return funcao(*args, **kwargs)
+            with _Secao(rotulo) as medicao:
+                resultado = funcao(*args, **kwargs)
+                medicao.registrar(resultado)
+            return resultado
+
+        return envoltorio
+
+    return decorador
+
+
+def _percentil_histograma(histograma, fracao):
+    # Percentil aproximado: o limite superior do balde onde a contagem acumulada atinge a fração
+    total = sum(histograma)
+    alvo = fracao * total
+    acumulado = 0
+    for balde, contagem in enumerate(histograma):
+        acumulado += contagem
+        if contagem and acumulado >= alvo:
+            return float(2**balde)
+    return 0.0
+
+
+def resumo_perfil():
+    """
+    Resume as etapas medidas.
+
+    Returns:
+        dict: Para cada etapa, chamadas, tempo total, médio, mínimo e máximo, percentis
+              aproximados p50/p95/p99 (limite superior do balde do histograma), tempo de CPU,
+              pico de memória e o histograma (balde k: entre 2^(k-1) e 2^k µs). Tempos em µs.
+    """
+    with _lock:
+        itens = {nome: dict(est, histograma=list(est["histograma"])) for nome, est in _estatisticas.items()}
+    resumo = {}
+    for nome, est in sorted(itens.items(), key=lambda item: -item[1]["total_us"]):
+        resumo[nome] = {
+            "chamadas": est["chamadas"],
+            "total_us": est["total_us"],
+            "media_us": est["total_us"] / est["chamadas"],
+            "minimo_us": est["minimo_us"],
+            "maximo_us": est["maximo_us"],
+            "p50_us": _percentil_histograma(est["histograma"], 0.50),
+            "p95_us": _percentil_histograma(est["histograma"], 0.95),
+            "p99_us": _percentil_histograma(est["histograma"], 0.99),
+            "cpu_us": est["cpu_us"],
+            "bytes_pico_max": est["bytes_pico_max"],
+            "histograma": est["histograma"],
+        }
+    return resumo
+
+
+def exportar_json(caminho):
+    """
+    Grava o resumo e os eventos do perfil em JSON.
+
+    Args:
+        caminho (str): O arquivo de saída.
+
+    Returns:
+        str: O caminho gravado.
+    """
+    with _lock:
+        eventos = list(_eventos)
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump({"pid": os.getpid(), "etapas": resumo_perfil(), "eventos": eventos}, arquivo, ensure_ascii=False)
+    return caminho
+
+
+def exportar_chrome_trace(caminho):
+    """
+    Grava os eventos do perfil no formato Chrome Trace (abrir em chrome://tracing ou Perfetto).
+
+    Cada chamada vira um evento completo ("ph": "X") na linha do tempo da sua thread, com
+    o tempo de CPU, a memória, o formato e o tipo da imagem nos argumentos.
+
+    Args:
+        caminho (str): O arquivo de saída.
+
+    Returns:
+        str: O caminho gravado.
+    """
+    with _lock:
+        eventos = list(_eventos)
+    trace = [
+        {
+            "name": evento["nome"],
+            "cat": evento["nome"].split(".", 1)[0],
+            "ph": "X",
+            "ts": evento["inicio_us"],
+            "dur": evento["duracao_us"],
+            "pid": evento["pid"],
+            "tid": evento["tid"],
+            "args": {
+                chave: evento[chave]
+                for chave in ("cpu_us", "bytes_alocados", "bytes_pico", "forma", "dtype", "erro")
+                if evento[chave] is not None
+            },
+        }
+        for evento in eventos
+    ]
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, arquivo)
+    return caminho
+
+
+def imprimir_resumo_perfil():
+    """Imprime uma linha por etapa medida, da que mais consumiu tempo para a que menos consumiu."""
+    for nome, est in resumo_perfil().items():
+        print(
+            f"  ⤷ {nome}: {est['chamadas']} chamadas, total {est['total_us'] / 1000:.1f} ms, "
+            f"média {est['media_us'] / 1000:.2f} ms, p95 ≤ {est['p95_us'] / 1000:.2f} ms, "
+            f"CPU {est['cpu_us'] / 1000:.1f} ms, pico {est['bytes_pico_max'] / 1024**2:.1f} MiB"
+        )
+
+
+def _exportar_ao_sair(diretorio):
+    # Cada processo grava o próprio perfil (os processos de um lote têm coletas separadas)
+    if not _estatisticas:
+        return
+    base = os.path.join(diretorio, f"perfil_{os.getpid()}")
+    exportar_json(f"{base}.json")
+    exportar_chrome_trace(f"{base}.trace.json")
+
+
+class _Exportacao:
+    # Registro da exportação automática de um diretório (objeto exigido por register_after_fork)
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        # Finalize (e não atexit) também roda ao fim dos processos de um pool do multiprocessing
+        Finalize(None, _exportar_ao_sair, args=(diretorio,), exitpriority=0)
+        register_after_fork(self, _Exportacao._apos_fork)
+
+    def _apos_fork(self):
+        # O processo filho herda os eventos do pai e perde os finalizadores: recomeça do zero
+        limpar_perfil()
+        Finalize(None, _exportar_ao_sair, args=(self.diretorio,), exitpriority=0)
+
+
+_exportacoes = []
+
+
+def configurar_perfil(diretorio=None, memoria=True):
+    """
+    Liga o perfil neste processo e nos processos criados a partir dele (ex: um lote).
+
+    Args:
+        diretorio (str, optional): Se informado, cada processo grava ao terminar o próprio
+                                   perfil_<pid>.json e perfil_<pid>.trace.json neste diretório.
+        memoria (bool, optional): Se True (padrão), mede também a memória alocada.
+    """
+    # As variáveis de ambiente levam a configuração aos processos iniciados com "spawn"
+    os.environ["VCRM_PERFIL"] = diretorio or "1"
+    os.environ["VCRM_PERFIL_MEMORIA"] = "1" if memoria else "0"
+    ativar_perfil(memoria=memoria)
+    if diretorio and diretorio not in [e.diretorio for e in _exportacoes]:
+        _exportacoes.append(_Exportacao(diretorio))
+
+
+def _configurar_pelo_ambiente():
+    # VCRM_PERFIL: "1" liga o perfil; qualquer outro valor (não vazio e diferente de "0") é um
+    # diretório onde cada processo grava o perfil ao terminar. VCRM_PERFIL_MEMORIA=0 desliga
+    # a medição de memória.
+    valor = os.environ.get("VCRM_PERFIL", "")
+    if valor in ("", "0"):
+        return
+    configurar_perfil(None if valor == "1" else valor, os.environ.get("VCRM_PERFIL_MEMORIA", "1") != "0")
+
+
+_configurar_pelo_ambiente()
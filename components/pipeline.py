@@ -0,0 +1,352 @@
+import os
+
+import cv2
+import numpy as np
+
+from components.buffers import rascunho
+from components.filtros import filtro_high_boost, filtro_passa_alta
+from components.perfil import secao
+from components.processamento import (
+    convolucao_espacial,
+    desenhar_caixas,
+    detectar_caixas,
+    lut_quantizacao,
+    quantizar_tons_cinza,
+)
+from components.utils import carregar_imagem
+
+# Operações ponto a ponto representadas por uma LUT de 256 entradas; duas LUTs seguidas
+# viram uma só (tabela_2[tabela_1]), aplicada em uma única passada sobre a imagem.
+_TONS = np.arange(256)
+
+# Na conversão para cinza seguida de LUT (cinza_lut), a imagem é percorrida em faixas de
+# linhas: o cinza de cada faixa (~256 KiB) ainda está no cache quando a LUT o lê, então a
+# imagem colorida é lida uma vez, só o resultado é escrito na memória e a imagem em tons de
+# cinza inteira nunca é alocada (em 4096², metade do pico de memória e ~6% menos tempo)
+_BYTES_FAIXA_CINZA = 256 * 1024
+
+
+class Etapa:
+    """
+    Um nó de um pipeline preguiçoso de processamento de imagens.
+
+    Criar uma etapa não processa nada: cada método retorna uma nova etapa que descreve a
+    operação e as etapas das quais ela depende. O grafo só é executado, na memória, por
+    executar() (ou calcular()), que antes o otimiza:
+        - etapas idênticas (mesma operação, parâmetros e entradas) são calculadas uma vez
+          só e compartilhadas entre os ramos, como a imagem em tons de cinza e o desfoque;
+        - carregar(...).cinza() decodifica a imagem direto em tons de cinza;
+        - operações ponto a ponto seguidas (quantização uniforme, limiar, LUTs) são
+          fundidas em uma única LUT;
+        - a conversão para cinza de uma imagem colorida seguida dessa LUT vira uma única
+          passada (cinza_lut), sem a imagem em tons de cinza intermediária;
+        - as LUTs depois de uma quantização adaptativa entram na tabela dela (a tabela
+          depende do histograma, então a conversão para cinza antes dela continua à parte).
+    Resultados intermediários são liberados assim que nenhuma etapa restante depende deles.
+
+    Exemplo:
+        cinza = carregar("src/02.jpeg").cinza()
+        high_boost, passa_alta = executar([cinza.high_boost(1.5), cinza.passa_alta()])
+
+    Args:
+        operacao (str): O nome da operação (uma das chaves de _IMPLEMENTACOES).
+        entradas (iterable[Etapa], optional): As etapas cujos resultados a operação recebe.
+        parametros (tuple, optional): Os parâmetros da operação (hasheáveis; fazem parte da chave).
+        dados (object, optional): Dados não hasheáveis da operação (ex: o kernel ou a LUT),
+                                  já representados nos parâmetros.
+    """
+
+    def __init__(self, operacao, entradas=(), parametros=(), dados=None):
+        self.operacao = operacao
+        self.entradas = tuple(entradas)
+        self.parametros = tuple(parametros)
+        self.dados = dados
+        # Etapas com a mesma chave produzem o mesmo resultado e são calculadas uma vez só
+        self.chave = (operacao, self.parametros, tuple(e.chave for e in self.entradas))
+
+    def __repr__(self):
+        return f"Etapa({self.operacao})"
+
+    def cinza(self):
+        """Converte para tons de cinza (imagens que já são de um canal passam direto)."""
+        return Etapa("cinza", [self])
+
+    def borrar(self, tamanho=(5, 5), sigma=0):
+        """Aplica um desfoque Gaussiano (cv2.GaussianBlur)."""
+        return Etapa("borrar", [self], (tuple(tamanho), sigma))
+
+    def filtrar(self, kernel):
+        """Aplica uma convolução com o kernel (ver convolucao_espacial)."""
+        kernel = np.asarray(kernel, dtype=np.float32)
+        return Etapa("filtrar", [self], (kernel.tobytes(), kernel.shape), dados=kernel)
+
+    def high_boost(self, A=1.5):
+        """Aplica o filtro high-boost (o desfoque é uma etapa própria, compartilhável)."""
+        return Etapa("high_boost", [self, self.borrar((5, 5), 0)], (A,))
+
+    def passa_alta(self):
+        """Aplica o filtro passa-alta (kernel Laplaciano)."""
+        return Etapa("passa_alta", [self])
+
+    def lut(self, tabela):
+        """Aplica uma LUT de 256 entradas (uint8) a uma imagem uint8."""
+        tabela = np.asarray(tabela, dtype=np.uint8).ravel()
+        if tabela.size != 256:
+            raise ValueError(f"A LUT precisa de 256 entradas (recebido: {tabela.size}).")
+        return Etapa("lut", [self], (tabela.tobytes(),), dados=tabela)
+
+    def quantizar(self, qtd_grupo=4, metodo="uniforme"):
+        """
+        Quantiza os tons de cinza (ver quantizar_tons_cinza). A quantização uniforme é uma
+        LUT fixa e pode ser fundida; as adaptativas dependem do histograma da imagem.
+        """
+        if metodo == "uniforme":
+            return self.lut(lut_quantizacao(qtd_grupo))
+        return Etapa("quantizar", [self], (qtd_grupo, metodo))
+
+    def limiarizar(self, limiar, maximo=255):
+        """Binariza: pixels acima do limiar viram maximo, os demais 0 (cv2.THRESH_BINARY)."""
+        return self.lut(np.where(_TONS > limiar, maximo, 0))
+
+    def diferenca(self, outra):
+        """Calcula a diferença absoluta com outra etapa (cv2.absdiff)."""
+        return Etapa("diferenca", [self, outra])
+
+    def caixas(self):
+        """Encontra os retângulos delimitadores de uma imagem binária (ver detectar_caixas)."""
+        return Etapa("caixas", [self])
+
+    def desenhar(self, caixas):
+        """Desenha os retângulos de uma etapa caixas() sobre esta imagem (ver desenhar_caixas)."""
+        return Etapa("desenhar", [self, caixas])
+
+    def calcular(self):
+        """Executa o pipeline até esta etapa e retorna o resultado."""
+        return executar(self)
+
+
+def carregar(caminho, cinza=False):
+    """
+    Cria a etapa inicial de um pipeline a partir de um arquivo de imagem.
+
+    Args:
+        caminho (str): O caminho da imagem.
+        cinza (bool, optional): Se True, decodifica direto em tons de cinza. Padrão é False.
+
+    Returns:
+        Etapa: A etapa de carregamento (a imagem só é lida na execução).
+    """
+    modo = cv2.IMREAD_GRAYSCALE if cinza else cv2.IMREAD_COLOR
+    return Etapa("carregar", (), (os.path.abspath(caminho), modo))
+
+
+def da_imagem(img):
+    """
+    Cria a etapa inicial de um pipeline a partir de uma imagem já na memória.
+
+    Args:
+        img (numpy.ndarray): A imagem (não deve ser modificada até a execução).
+
+    Returns:
+        Etapa: A etapa que fornece a imagem.
+    """
+    # A etapa guarda a imagem, então o id não é reaproveitado por outro array enquanto ela existir
+    return Etapa("imagem", (), (id(img),), dados=img)
+
+
+def _desenhar(img, caixas):
+    base = img if img.ndim == 3 else cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    return desenhar_caixas(base, caixas)
+
+
+def _lut(etapa, img):
+    if img.dtype != np.uint8:
+        raise ValueError(f"Operações por LUT exigem imagens uint8 (recebido: {img.dtype}).")
+    return cv2.LUT(img, etapa.dados)
+
+
+def _cinza_lut(etapa, img):
+    # cvtColor e LUT fundidos: cada faixa de linhas é convertida para cinza em um rascunho
+    # pequeno e logo passa pela LUT, gravando direto no resultado
+    if img.ndim == 2:
+        return _lut(etapa, img)
+    if img.dtype != np.uint8:
+        raise ValueError(f"Operações por LUT exigem imagens uint8 (recebido: {img.dtype}).")
+    altura, largura = img.shape[:2]
+    linhas = max(1, min(altura, _BYTES_FAIXA_CINZA // largura))
+    faixa = rascunho((linhas, largura), np.uint8, "pipeline.cinza_lut")
+    resultado = np.empty((altura, largura), np.uint8)
+    for y0 in range(0, altura, linhas):
+        y1 = min(y0 + linhas, altura)
+        cinza = cv2.cvtColor(img[y0:y1], cv2.COLOR_BGR2GRAY, dst=faixa[: y1 - y0])
+        cv2.LUT(cinza, etapa.dados, dst=resultado[y0:y1])
+    return resultado
+
+
+def _quantizar(etapa, img):
+    # Com uma LUT fundida (dados), a tabela da quantização adaptativa é composta com ela e a
+    # imagem passa por uma única LUT
+    if etapa.dados is None:
+        return quantizar_tons_cinza(img, *etapa.parametros)
+    qtd_grupo, metodo = etapa.parametros[:2]
+    histograma = cv2.calcHist([img], [0], None, [256], [0, 256]).ravel()
+    return cv2.LUT(img, etapa.dados[lut_quantizacao(qtd_grupo, metodo, histograma)])
+
+
+# Implementação de cada operação: recebe a etapa (parâmetros e dados) e os resultados das entradas
+_IMPLEMENTACOES = {
+    "carregar": lambda etapa: carregar_imagem(*etapa.parametros),
+    "imagem": lambda etapa: etapa.dados,
+    "cinza": lambda etapa, img: cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img,
+    "borrar": lambda etapa, img: cv2.GaussianBlur(img, *etapa.parametros),
+    "filtrar": lambda etapa, img: convolucao_espacial(img, etapa.dados),
+    "high_boost": lambda etapa, img, blur: filtro_high_boost(img, etapa.parametros[0], blur=blur),
+    "passa_alta": lambda etapa, img: filtro_passa_alta(img),
+    "lut": _lut,
+    "cinza_lut": _cinza_lut,
+    "quantizar": _quantizar,
+    "diferenca": lambda etapa, a, b: cv2.absdiff(a, b),
+    "caixas": lambda etapa, img: detectar_caixas(img),
+    "desenhar": lambda etapa, img, caixas: _desenhar(img, caixas),
+}
+
+
+def _ordem_topologica(alvos):
+    # Etapas únicas (por chave) em uma ordem em que as entradas vêm antes de quem as usa
+    ordem, vistos = [], set()
+
+    def visitar(etapa):
+        if etapa.chave in vistos:
+            return
+        vistos.add(etapa.chave)
+        for entrada in etapa.entradas:
+            visitar(entrada)
+        ordem.append(etapa)
+
+    for alvo in alvos:
+        visitar(alvo)
+    return ordem
+
+
+def _contar_usos(ordem, alvos):
+    # Quantas etapas (ou resultados pedidos) usam cada chave
+    usos = {}
+    for etapa in ordem:
+        for entrada in etapa.entradas:
+            usos[entrada.chave] = usos.get(entrada.chave, 0) + 1
+    for alvo in alvos:
+        usos[alvo.chave] = usos.get(alvo.chave, 0) + 1
+    return usos
+
+
+def _ja_cinza(etapa):
+    # Se o resultado da etapa já é sabidamente uma imagem em tons de cinza
+    if etapa.operacao == "carregar":
+        return etapa.parametros[1] == cv2.IMREAD_GRAYSCALE
+    return etapa.operacao in ("cinza", "cinza_lut")
+
+
+def _etapa_lut(operacao, entradas, parametros, tabela):
+    # Uma etapa com uma LUT fundida: a tabela faz parte da chave
+    return Etapa(operacao, entradas, (*parametros, tabela.tobytes()), dados=tabela)
+
+
+def otimizar(alvos):
+    """
+    Reescreve o grafo das etapas pedidas, fundindo etapas ponto a ponto.
+
+    Uma fusão só acontece quando o resultado intermediário não é usado por mais ninguém
+    (nem pedido como resultado); caso contrário ele seria calculado de qualquer forma.
+
+    Args:
+        alvos (list[Etapa]): As etapas cujos resultados serão pedidos.
+
+    Returns:
+        list[Etapa]: As etapas equivalentes no grafo otimizado, na mesma ordem.
+    """
+    usos = _contar_usos(_ordem_topologica(alvos), alvos)
+    reescritas = {}
+
+    def reescrever(etapa):
+        if etapa.chave in reescritas:
+            return reescritas[etapa.chave]
+        entradas = [reescrever(e) for e in etapa.entradas]
+        unico = len(etapa.entradas) == 1 and usos[etapa.entradas[0].chave] == 1
+        nova = Etapa(etapa.operacao, entradas, etapa.parametros, etapa.dados)
+
+        if etapa.operacao == "cinza" and unico and entradas[0].operacao == "carregar":
+            # Decodifica direto em tons de cinza, em vez de decodificar em cores e converter
+            nova = carregar(entradas[0].parametros[0], cinza=True)
+        elif etapa.operacao == "cinza" and _ja_cinza(entradas[0]):
+            # A entrada já está em tons de cinza
+            nova = entradas[0]
+        elif etapa.operacao == "lut" and unico and entradas[0].operacao == "lut":
+            # Composição de LUTs: aplicar a primeira e depois a segunda equivale a uma só
+            nova = entradas[0].entradas[0].lut(etapa.dados[entradas[0].dados])
+        elif etapa.operacao == "lut" and unico and entradas[0].operacao == "cinza":
+            # Conversão para cinza (de uma imagem colorida na memória) e LUT em uma passada
+            nova = _etapa_lut("cinza_lut", entradas[0].entradas, (), etapa.dados)
+        elif etapa.operacao == "lut" and unico and entradas[0].operacao == "cinza_lut":
+            nova = _etapa_lut("cinza_lut", entradas[0].entradas, (), etapa.dados[entradas[0].dados])
+        elif etapa.operacao == "lut" and unico and entradas[0].operacao == "quantizar":
+            # A LUT seguinte é composta com a tabela adaptativa (calculada na execução)
+            anterior = entradas[0]
+            tabela = etapa.dados if anterior.dados is None else etapa.dados[anterior.dados]
+            nova = _etapa_lut("quantizar", anterior.entradas, anterior.parametros[:2], tabela)
+
+        reescritas[etapa.chave] = nova
+        return nova
+
+    return [reescrever(alvo) for alvo in alvos]
+
+
+def plano(alvos):
+    """
+    Descreve as etapas que executar() calcularia, depois da otimização.
+
+    Args:
+        alvos (Etapa or list[Etapa]): As etapas pedidas.
+
+    Returns:
+        list[str]: Uma operação por etapa, na ordem de execução.
+    """
+    alvos = [alvos] if isinstance(alvos, Etapa) else list(alvos)
+    return [etapa.operacao for etapa in _ordem_topologica(otimizar(alvos))]
+
+
+def executar(alvos):
+    """
+    Otimiza e executa um pipeline na memória, sem passar pelo disco.
+
+    Args:
+        alvos (Etapa, list[Etapa] or dict[str, Etapa]): As etapas cujos resultados são pedidos.
+
+    Returns:
+        O resultado de cada etapa pedida, na mesma estrutura da entrada (valor, lista ou dict).
+
+    Raises:
+        FileNotFoundError: Se uma imagem de entrada não puder ser carregada.
+        ValueError: Se uma operação por LUT receber uma imagem que não seja uint8.
+    """
+    if isinstance(alvos, Etapa):
+        return executar([alvos])[0]
+    if isinstance(alvos, dict):
+        return dict(zip(alvos, executar(list(alvos.values()))))
+
+    otimizados = otimizar(list(alvos))
+    ordem = _ordem_topologica(otimizados)
+    restantes = _contar_usos(ordem, otimizados)
+    resultados = {}
+
+    for etapa in ordem:
+        argumentos = [resultados[e.chave] for e in etapa.entradas]
+        with secao(f"pipeline.{etapa.operacao}") as medicao:
+            resultados[etapa.chave] = _IMPLEMENTACOES[etapa.operacao](etapa, *argumentos)
+            medicao.registrar(resultados[etapa.chave])
+        # Libera os intermediários que não serão mais usados
+        for entrada in etapa.entradas:
+            restantes[entrada.chave] -= 1
+            if restantes[entrada.chave] == 0:
+                del resultados[entrada.chave]
+
+    return [resultados[alvo.chave] for alvo in otimizados]
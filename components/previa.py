@@ -0,0 +1,292 @@
+import math
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import cv2
+
+from components.filtros import borrar_high_boost, filtro_high_boost, filtro_passa_alta
+from components.perfil import secao
+from components.processamento import desenhar_caixas, detectar_caixas, localizar_objetos
+from components.saida import SAIDA_SINCRONA
+from components.utils import carregar_imagem, modo_leitura
+
+# Pré-visualização progressiva para o menu interativo.
+# Cada operação é calculada primeiro em uma decodificação reduzida (IMREAD_REDUCED_*, em que o
+# próprio decodificador JPEG entrega a imagem menor), mostrada na hora, e depois em resolução
+# cheia, em uma thread de fundo que é cancelada se os parâmetros mudarem antes do fim.
+#
+# Os níveis da pirâmide de cada imagem (as decodificações reduzidas, no cache de imagens) e as
+# etapas que não dependem dos parâmetros ajustáveis (o desfoque do high-boost, a diferença da
+# subtração) ficam em cache por imagem e nível, então mudar A ou o limiar só recalcula a etapa
+# final, que é barata: uma combinação ponderada, ou a binarização e as caixas.
+
+# Redução padrão da pré-visualização (uma foto de 4080x3072 vira 1020x768)
+REDUCAO_PREVIA = 4
+
+_cache_etapas = OrderedDict()
+_cache_etapas_lock = threading.Lock()
+_cache_etapas_info = {"max_bytes": 256 * 1024 * 1024, "bytes": 0, "hits": 0, "misses": 0}
+
+
+class Cancelado(Exception):
+    """Levantada pelo cálculo em resolução cheia quando os parâmetros mudam antes do fim."""
+
+
+def _verificar(cancelado):
+    # Ponto de cancelamento entre as etapas (uma chamada do OpenCV em andamento não é interrompida)
+    if cancelado is not None and cancelado.is_set():
+        raise Cancelado()
+
+
+def _imagem(caminho, reducao, cinza):
+    # Um nível da pirâmide: a decodificação (reduzida ou não) fica no cache de imagens
+    return carregar_imagem(caminho, modo_leitura(cinza=cinza, reducao=reducao))
+
+
+def _etapa(nome, caminhos, reducao, parametros, calcular):
+    # Resultado de uma etapa independente dos parâmetros ajustáveis, em um cache LRU por bytes.
+    # A chave inclui a data de modificação das imagens, então um arquivo alterado é recalculado.
+    chave = (nome, tuple((os.path.abspath(c), os.stat(c).st_mtime_ns) for c in caminhos), reducao, parametros)
+    with _cache_etapas_lock:
+        resultado = _cache_etapas.get(chave)
+        if resultado is not None:
+            _cache_etapas.move_to_end(chave)
+            _cache_etapas_info["hits"] += 1
+            return resultado
+        _cache_etapas_info["misses"] += 1
+
+    with secao(f"previa.{nome}") as medicao:
+        resultado = calcular()
+        medicao.registrar(resultado)
+    resultado.flags.writeable = False
+
+    with _cache_etapas_lock:
+        if chave not in _cache_etapas and resultado.nbytes <= _cache_etapas_info["max_bytes"]:
+            _cache_etapas[chave] = resultado
+            _cache_etapas_info["bytes"] += resultado.nbytes
+            while _cache_etapas_info["bytes"] > _cache_etapas_info["max_bytes"]:
+                _, antigo = _cache_etapas.popitem(last=False)
+                _cache_etapas_info["bytes"] -= antigo.nbytes
+    return resultado
+
+
+def limpar_cache_etapas():
+    """
+    Remove todas as etapas do cache da pré-visualização e zera as estatísticas.
+    """
+    with _cache_etapas_lock:
+        _cache_etapas.clear()
+        _cache_etapas_info.update(bytes=0, hits=0, misses=0)
+
+
+def estatisticas_cache_etapas():
+    """
+    Retorna as estatísticas de uso do cache de etapas da pré-visualização.
+
+    Returns:
+        dict: Quantidade de entradas, bytes ocupados, limite, acertos (hits) e falhas (misses).
+    """
+    with _cache_etapas_lock:
+        return {"entradas": len(_cache_etapas), **_cache_etapas_info}
+
+
+def high_boost(caminho, A=1.5, reducao=1, cancelado=None):
+    """
+    Calcula o filtro high-boost (ver filtros.filtro_high_boost) em um nível da pirâmide.
+
+    Args:
+        caminho (str): O caminho da imagem.
+        A (float, optional): O fator de amplificação. Padrão é 1.5.
+        reducao (int, optional): O fator de redução (1, 2, 4 ou 8). Padrão é 1 (resolução cheia).
+        cancelado (threading.Event, optional): Se marcado, o cálculo para na próxima etapa.
+
+    Returns:
+        tuple[numpy.ndarray]: A imagem filtrada.
+
+    Raises:
+        Cancelado: Se o cancelamento for pedido durante o cálculo.
+    """
+    img = _imagem(caminho, reducao, cinza=True)
+    _verificar(cancelado)
+    blur = _etapa("high_boost.blur", [caminho], reducao, (), lambda: borrar_high_boost(img))
+    _verificar(cancelado)
+    return (filtro_high_boost(img, A, blur=blur),)
+
+
+def passa_alta(caminho, reducao=1, cancelado=None):
+    """
+    Calcula o filtro passa-alta (ver filtros.filtro_passa_alta) em um nível da pirâmide.
+
+    Args:
+        caminho (str): O caminho da imagem.
+        reducao (int, optional): O fator de redução (1, 2, 4 ou 8). Padrão é 1.
+        cancelado (threading.Event, optional): Se marcado, o cálculo para na próxima etapa.
+
+    Returns:
+        tuple[numpy.ndarray]: A imagem filtrada.
+
+    Raises:
+        Cancelado: Se o cancelamento for pedido durante o cálculo.
+    """
+    img = _imagem(caminho, reducao, cinza=True)
+    _verificar(cancelado)
+    return (filtro_passa_alta(img),)
+
+
+def subtrair(fundo, caminho, limiar=50, modo="contornos", reducao=1, cancelado=None):
+    """
+    Calcula a subtração de fundo e as caixas (ver _02_subtrai_e_delineia) em um nível da pirâmide.
+
+    No modo "componentes", a pirâmide de localizar_objetos, a área mínima e a margem de fusão
+    são ajustadas à redução, para que a pré-visualização encontre os mesmos objetos.
+
+    Args:
+        fundo (str): O caminho da imagem de fundo.
+        caminho (str): O caminho da imagem com o objeto.
+        limiar (int, optional): O limiar de binarização. Padrão é 50.
+        modo (str, optional): "contornos" ou "componentes". Padrão é "contornos".
+        reducao (int, optional): O fator de redução (1, 2, 4 ou 8). Padrão é 1.
+        cancelado (threading.Event, optional): Se marcado, o cálculo para na próxima etapa.
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]: A imagem binarizada e a imagem com os retângulos.
+
+    Raises:
+        Cancelado: Se o cancelamento for pedido durante o cálculo.
+    """
+    bg_gray = _imagem(fundo, reducao, cinza=True)
+    img_fg = _imagem(caminho, reducao, cinza=False)
+    _verificar(cancelado)
+
+    def diferenca():
+        return cv2.absdiff(cv2.cvtColor(img_fg, cv2.COLOR_BGR2GRAY), bg_gray)
+
+    subtracao = _etapa("subtracao.diferenca", [fundo, caminho], reducao, (), diferenca)
+    _verificar(cancelado)
+
+    _, binaria = cv2.threshold(subtracao, limiar, 255, cv2.THRESH_BINARY)
+    if modo == "componentes":
+        niveis = max(0, 2 - int(math.log2(reducao)))
+        caixas = localizar_objetos(
+            subtracao, limiar, niveis_piramide=niveis, area_minima=400 / reducao**2, margem_fusao=16 / reducao
+        )
+    else:
+        caixas = detectar_caixas(binaria)
+    return binaria, desenhar_caixas(img_fg, caixas)
+
+
+# Operações com pré-visualização, indexadas pelo nome usado no menu e no lote
+OPERACOES_PREVIA = {
+    "high-boost": high_boost,
+    "passa-alta": passa_alta,
+    "subtrair": subtrair,
+}
+
+
+class PreviaProgressiva:
+    """
+    Executa uma operação primeiro em resolução reduzida e depois, em segundo plano, em resolução cheia.
+
+    Uso típico (uma varredura do parâmetro A):
+        with PreviaProgressiva() as previa:
+            for A in (1.5, 2.0, 3.0):
+                mostrar_imagem(previa.executar("high-boost", {"caminho": img, "A": A}, ["out/hb.jpg"])[0])
+            resultado = previa.aguardar()  # só o último A é calculado até o fim e gravado
+
+    Cada chamada de executar() cancela o cálculo em resolução cheia anterior, se ainda não
+    tiver terminado. Há uma única thread de fundo, então um cálculo cancelado libera o
+    processador para o próximo assim que a etapa em andamento termina (e o que ela calculou
+    fica no cache de etapas, para o próximo aproveitar).
+
+    Args:
+        reducao (int, optional): O fator de redução da pré-visualização (2, 4 ou 8). Padrão é 4.
+    """
+
+    def __init__(self, reducao=REDUCAO_PREVIA):
+        self.reducao = reducao
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="previa")
+        self._futuro = None
+        self._cancelado = None
+
+    def executar(self, operacao, parametros, saidas=()):
+        """
+        Calcula a pré-visualização e agenda o cálculo em resolução cheia.
+
+        Args:
+            operacao (str): O nome da operação (uma das chaves de OPERACOES_PREVIA).
+            parametros (dict): Os argumentos da operação (ex: {"caminho": ..., "A": 2.0}).
+            saidas (list[str], optional): Onde gravar cada imagem resultante da resolução
+                                          cheia (na ordem retornada pela operação). Padrão é
+                                          não gravar.
+
+        Returns:
+            tuple[numpy.ndarray]: As imagens da pré-visualização.
+
+        Raises:
+            ValueError: Se a operação for desconhecida.
+        """
+        if operacao not in OPERACOES_PREVIA:
+            raise ValueError(f"Operação sem pré-visualização: {operacao}. Opções: {', '.join(OPERACOES_PREVIA)}")
+        self.cancelar()
+        funcao = OPERACOES_PREVIA[operacao]
+        parametros = dict(parametros)  # o chamador pode alterar o dicionário durante o cálculo
+        previa = funcao(**parametros, reducao=self.reducao)
+
+        self._cancelado = threading.Event()
+        self._futuro = self._executor.submit(self._resolucao_cheia, funcao, parametros, list(saidas), self._cancelado)
+        return previa
+
+    @staticmethod
+    def _resolucao_cheia(funcao, parametros, saidas, cancelado):
+        imagens = funcao(**parametros, reducao=1, cancelado=cancelado)
+        for img, caminho in zip(imagens, saidas):
+            _verificar(cancelado)
+            SAIDA_SINCRONA.salvar(img, caminho)
+        return imagens
+
+    def cancelar(self):
+        """
+        Cancela o cálculo em resolução cheia pendente (se ainda não tiver terminado).
+        """
+        if self._futuro is not None:
+            self._cancelado.set()
+            self._futuro.cancel()
+            self._futuro = None
+
+    def aguardar(self, timeout=None):
+        """
+        Espera o cálculo em resolução cheia mais recente terminar.
+
+        Args:
+            timeout (float, optional): O tempo máximo de espera, em segundos. Padrão é sem limite.
+
+        Returns:
+            tuple[numpy.ndarray] or None: As imagens em resolução cheia (já gravadas nas saídas),
+                                          ou None se não houver cálculo pendente ou se ele
+                                          tiver sido cancelado.
+
+        Raises:
+            TimeoutError: Se o cálculo não terminar dentro do timeout.
+        """
+        if self._futuro is None:
+            return None
+        try:
+            return self._futuro.result(timeout)
+        except (Cancelado, CancelledError):
+            return None
+
+    def fechar(self):
+        """
+        Cancela o cálculo pendente e encerra a thread de fundo.
+        """
+        self.cancelar()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        self.fechar()
+        return False
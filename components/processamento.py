@@ -1,16 +1,176 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
+import json
+import logging
+import platform
+import threading
 import time
-from PIL import Image, ImageChops
+from collections import OrderedDict, namedtuple
 import os
 
+from components.buffers import rascunho, verificar_saida
+from components.comparacao import comparar_arrays
+from components.fft import backend_fft
+from components.perfil import perfilar
+from components.saida import SAIDA_SINCRONA
+from components.utils import carregar_imagem
+
 
 # 1) Em relação a técnica de transformação de tons de cinza baseado em clusterização, converta uma
 # imagem colorida para tons de cinza e agrupe os tons de cinza a cada 4 grupos. Para exemplificar,
 # dada uma imagem com 256 tons de cinza, aplicando agrupamento a cada 4 tons de cinza, a imagem
 # resultante terá no máximo 64 tons de cinza.
-def _01_clusterizacao_tons_cinza(img_path, qtd_grupo=4):
+def _lloyd_histograma(histograma, niveis, max_iter=100):
+    """
+    Refina níveis de quantização pelo algoritmo de Lloyd sobre o histograma de 256 bins.
+
+    Alterna entre (a) limiares de decisão nos pontos médios entre níveis vizinhos e
+    (b) cada nível no centroide (média ponderada pelo histograma) do seu intervalo.
+    As somas por intervalo saem de somas acumuladas, então cada iteração custa O(k).
+
+    Args:
+        histograma (numpy.ndarray): As contagens dos 256 tons de cinza.
+        niveis (numpy.ndarray): Os níveis iniciais, em ordem crescente.
+        max_iter (int, optional): O número máximo de iterações. Padrão é 100.
+
+    Returns:
+        tuple: (níveis finais, cortes, distorção), onde o tom g pertence ao intervalo i
+               se cortes[i] <= g < cortes[i + 1], e a distorção é o erro quadrático total.
+    """
+    tons = np.arange(256, dtype=np.float64)
+    h = histograma.astype(np.float64)
+    acum_h = np.concatenate(([0.0], np.cumsum(h)))
+    acum_hx = np.concatenate(([0.0], np.cumsum(h * tons)))
+    acum_hx2 = np.concatenate(([0.0], np.cumsum(h * tons * tons)))
+
+    niveis = np.asarray(niveis, dtype=np.float64)
+    for _ in range(max_iter):
+        limiares = (niveis[:-1] + niveis[1:]) / 2
+        cortes = np.concatenate(([0], np.clip(np.floor(limiares).astype(np.int64) + 1, 0, 256), [256]))
+        massa = acum_h[cortes[1:]] - acum_h[cortes[:-1]]
+        soma = acum_hx[cortes[1:]] - acum_hx[cortes[:-1]]
+        # Intervalos vazios mantêm o nível anterior
+        novos = np.where(massa > 0, soma / np.maximum(massa, 1), niveis)
+        convergiu = np.allclose(novos, niveis, atol=1e-3)
+        niveis = novos
+        if convergiu:
+            break
+
+    limiares = (niveis[:-1] + niveis[1:]) / 2
+    cortes = np.concatenate(([0], np.clip(np.floor(limiares).astype(np.int64) + 1, 0, 256), [256]))
+    massa = acum_h[cortes[1:]] - acum_h[cortes[:-1]]
+    soma = acum_hx[cortes[1:]] - acum_hx[cortes[:-1]]
+    soma2 = acum_hx2[cortes[1:]] - acum_hx2[cortes[:-1]]
+    # Σ h·(g - nível)² = Σ h·g² - 2·nível·Σ h·g + nível²·Σ h, por intervalo
+    distorcao = float(np.sum(soma2 - 2 * niveis * soma + niveis**2 * massa))
+    return niveis, cortes, distorcao
+
+
+def lut_quantizacao(qtd_grupo=4, metodo="uniforme", histograma=None, max_iter=100):
+    """
+    Monta a tabela de consulta (LUT) de 256 entradas que quantiza os tons de cinza.
+
+    Métodos:
+        - "uniforme": divide a faixa [0, 255] em blocos de 256 // qtd_grupo tons e
+          mapeia cada tom para o início do seu bloco (comportamento original).
+        - "kmeans": k-means ponderado sobre o histograma, iniciado nos quantis do
+          histograma (cada grupo começa com a mesma quantidade de pixels).
+        - "lloyd-max": quantizador de Lloyd-Max (erro quadrático mínimo), iniciado com
+          níveis uniformes.
+        Em uma dimensão, o k-means e o Lloyd-Max têm as mesmas condições de ótimo
+        (limiares nos pontos médios e níveis nos centroides); diferem na inicialização,
+        o que pode levá-los a ótimos locais diferentes.
+
+    Como os métodos adaptativos trabalham sobre os 256 bins do histograma, e não sobre
+    os pixels, o custo deles não depende da resolução da imagem.
+
+    Args:
+        qtd_grupo (int, optional): A quantidade de grupos (tons) da saída. Padrão é 4.
+        metodo (str, optional): "uniforme" (padrão), "kmeans" ou "lloyd-max".
+        histograma (numpy.ndarray, optional): As contagens dos 256 tons de cinza da imagem.
+                                              Obrigatório para os métodos adaptativos.
+        max_iter (int, optional): O máximo de iterações dos métodos adaptativos. Padrão é 100.
+
+    Returns:
+        numpy.ndarray: A LUT de 256 entradas em uint8.
+
+    Raises:
+        ValueError: Se qtd_grupo estiver fora de [1, 256], se o método for desconhecido,
+                    ou se um método adaptativo for usado sem histograma.
+    """
+    if not 1 <= qtd_grupo <= 256:
+        raise ValueError(f"qtd_grupo deve estar entre 1 e 256 (recebido: {qtd_grupo}).")
+
+    tons = np.arange(256)
+    if metodo == "uniforme":
+        fator = 256 // qtd_grupo
+        return np.clip((tons // fator) * fator, 0, 255).astype(np.uint8)
+
+    if metodo not in ("kmeans", "lloyd-max"):
+        raise ValueError(f"Método desconhecido: {metodo}. Opções: uniforme, kmeans, lloyd-max")
+    if histograma is None:
+        raise ValueError(f"O método {metodo} precisa do histograma da imagem.")
+    histograma = np.asarray(histograma, dtype=np.float64).ravel()
+
+    if metodo == "kmeans":
+        # Níveis iniciais nos quantis do histograma
+        acumulado = np.cumsum(histograma)
+        alvos = (np.arange(qtd_grupo) + 0.5) / qtd_grupo * acumulado[-1]
+        iniciais = np.searchsorted(acumulado, alvos).astype(np.float64)
+        # Quantis repetidos (histogramas concentrados) são afastados para manter a ordem estrita
+        iniciais = np.maximum.accumulate(iniciais + np.arange(qtd_grupo) * 1e-6)
+    else:
+        iniciais = (np.arange(qtd_grupo) + 0.5) * 256 / qtd_grupo - 0.5
+
+    niveis, cortes, _ = _lloyd_histograma(histograma, iniciais, max_iter)
+    # Cada tom recebe o nível (arredondado) do intervalo ao qual pertence
+    indices = np.searchsorted(cortes[1:], tons, side="right")
+    return np.clip(np.rint(niveis[indices]), 0, 255).astype(np.uint8)
+
+
+@perfilar()
+def quantizar_tons_cinza(img_gray, qtd_grupo=4, metodo="uniforme", inplace=False, dst=None):
+    """
+    Quantiza uma imagem em tons de cinza aplicando uma LUT de 256 entradas (cv2.LUT).
+
+    A LUT substitui as operações aritméticas por pixel (divisão, multiplicação e clip),
+    que criavam várias cópias temporárias da imagem, por uma única consulta por pixel.
+
+    Args:
+        img_gray (numpy.ndarray): A imagem em tons de cinza (uint8).
+        qtd_grupo (int, optional): A quantidade de grupos (tons) da saída. Padrão é 4.
+        metodo (str, optional): "uniforme" (padrão), "kmeans" ou "lloyd-max" (ver lut_quantizacao).
+        inplace (bool, optional): Se True e a imagem permitir escrita, o resultado é gravado
+                                  no próprio array de entrada, sem alocar outra imagem.
+        dst (numpy.ndarray, optional): Um array pré-alocado (mesma forma, uint8) onde o
+                                       resultado é gravado. Tem precedência sobre inplace.
+
+    Returns:
+        numpy.ndarray: A imagem quantizada em uint8 (o próprio dst, se fornecido).
+
+    Raises:
+        ValueError: Se o dst não tiver a forma e o tipo do resultado.
+    """
+    histograma = None
+    if metodo != "uniforme":
+        histograma = cv2.calcHist([img_gray], [0], None, [256], [0, 256]).ravel()
+    lut = lut_quantizacao(qtd_grupo, metodo, histograma)
+
+    if dst is not None:
+        return cv2.LUT(img_gray, lut, dst=verificar_saida(dst, img_gray.shape, np.uint8))
+    if inplace and img_gray.flags.writeable:
+        return cv2.LUT(img_gray, lut, dst=img_gray)
+    return cv2.LUT(img_gray, lut)
+
+
+# 1) Em relação a técnica de transformação de tons de cinza baseado em clusterização, converta uma
+# imagem colorida para tons de cinza e agrupe os tons de cinza a cada 4 grupos. Para exemplificar,
+# dada uma imagem com 256 tons de cinza, aplicando agrupamento a cada 4 tons de cinza, a imagem
+# resultante terá no máximo 64 tons de cinza.
+@perfilar()
+def _01_clusterizacao_tons_cinza(
+    img_path, qtd_grupo=4, output_path="out/01_clusterizada.jpg", metodo="uniforme", saida=None
+):
     """
     Converte uma imagem colorida para tons de cinza e agrupa os tons de cinza
     em clusters, reduzindo o número total de tons possíveis.
@@ -20,48 +180,190 @@ def _01_clusterizacao_tons_cinza(img_path, qtd_grupo=4):
 
     Args:
         img_path (str): O caminho para a imagem colorida de entrada.
-        grupo (int, optional): O tamanho de cada grupo de tons de cinza.
-                               Por exemplo, se 'grupo' for 4, os tons de cinza
-                               serão agrupados a cada 4 valores (0-3, 4-7, etc.),
-                               resultando em no máximo 256/4 = 64 tons diferentes.
-                               Padrão é 4.
+        qtd_grupo (int, optional): A quantidade de grupos de tons de cinza.
+                                   No método uniforme, cada grupo cobre 256 // qtd_grupo
+                                   tons consecutivos (ex: com 4 grupos, 0-63, 64-127, etc.).
+                                   Padrão é 4.
+        output_path (str, optional): O caminho onde a imagem clusterizada será salva.
+                                     Se None, nada é gravado. Padrão é "out/01_clusterizada.jpg".
+        metodo (str, optional): "uniforme" (padrão, blocos de mesmo tamanho), "kmeans" ou
+                                "lloyd-max" (níveis adaptados ao histograma da imagem).
+        saida (SaidaImagem, optional): O destino que codifica e grava a imagem (ex: em
+                                       segundo plano). Padrão é a gravação síncrona.
 
     Returns:
         numpy.ndarray: A imagem resultante em tons de cinza com o histograma clusterizado.
                        Os valores dos pixels estarão dentro da faixa [0, 255].
     """
-    img = cv2.imread(img_path)
+    # Carrega a imagem já convertida para tons de cinza pelo decodificador
+    # (carregar_imagem lança FileNotFoundError se a imagem não puder ser carregada)
+    img_gray = carregar_imagem(img_path, cv2.IMREAD_GRAYSCALE)
 
-    # Verifica se a imagem foi carregada corretamente
-    if img is None:
-        raise FileNotFoundError(f"Não foi possível carregar a imagem em: {img_path}")
+    # Realiza a clusterização dos tons de cinza com uma LUT de 256 entradas.
+    # No método uniforme, com qtd_grupo=4, fator = 256 // 4 = 64, e cada tom é mapeado
+    # para o valor inicial do seu grupo (ex: 100 // 64 * 64 = 64).
+    # A imagem do cache é somente leitura, então a LUT grava em um novo array.
+    img_cluster = quantizar_tons_cinza(img_gray, qtd_grupo, metodo, inplace=True)
 
-    # Converte a imagem para tons de cinza
-    img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    # Salva a imagem clusterizada (em segundo plano, se o destino for assíncrono)
+    if output_path is not None:
+        output_path = (saida or SAIDA_SINCRONA).salvar(img_cluster, output_path)
+        print(f"  ⤷ Imagem clusterizada salva em {output_path}")
 
-    # Calcula o fator de agrupamento
-    # Por exemplo, se grupo=4, fator = 256 // 4 = 64
-    # Isso significa que cada 64 tons de cinza originais serão mapeados para um único valor.
-    fator = 256 // qtd_grupo
+    return img_cluster
 
-    # Realiza a clusterização dos tons de cinza
-    # Primeiro, divide o valor do pixel pelo fator (ex: 100 // 64 = 1)
-    # Depois, multiplica pelo fator novamente (ex: 1 * 64 = 64)
-    # Isso mapeia todos os pixels dentro de um grupo para o valor inicial desse grupo.
-    img_cluster = (img_gray // fator) * fator
 
-    # Garante que os valores dos pixels estejam dentro do intervalo [0, 255] e sejam do tipo uint8
-    img_cluster = np.clip(img_cluster, 0, 255).astype(np.uint8)
+@perfilar()
+def detectar_caixas(binaria):
+    """
+    Encontra os retângulos delimitadores (bounding boxes) das regiões brancas de uma imagem binária.
 
-    output_path = "out/01_clusterizada.jpg"
-    # Salva a imagem clusterizada
-    cv2.imwrite(output_path, img_cluster)
-    print(f"  ⤷ Imagem clusterizada salva em {output_path}")
+    Args:
+        binaria (numpy.ndarray): A imagem binarizada (0 ou 255).
 
-    return img_cluster
+    Returns:
+        list[tuple]: Um retângulo (x, y, largura, altura) por contorno externo.
+    """
+    # Encontra os contornos na imagem binarizada.
+    # cv2.RETR_EXTERNAL: Recupera apenas os contornos externos.
+    # cv2.CHAIN_APPROX_SIMPLE: Compacta segmentos horizontais, verticais e diagonais,
+    #                         deixando apenas os pontos finais.
+    contours, _ = cv2.findContours(binaria, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
+    # Calcula o retângulo delimitador (bounding box) para cada contorno
+    return [cv2.boundingRect(cnt) for cnt in contours]
+
+
+# Modos de delimitação de objetos da subtração de fundo (ver _02_subtrai_e_delineia)
+MODOS_DETECCAO = ("contornos", "componentes")
+
+# Retângulo detectado por localizar_objetos, em coordenadas da imagem em resolução cheia.
+# area é a quantidade (estimada) de pixels do objeto, não a área do retângulo.
+Caixa = namedtuple("Caixa", ["x", "y", "largura", "altura", "area"])
+
+
+def _fundir_caixas(caixas, margem):
+    # Une, repetidamente, as caixas que se sobrepõem ou estão a até `margem` pixels uma
+    # da outra, até que nenhum par possa mais ser unido. O número de caixas que chega
+    # aqui já é limitado, então a busca quadrática por pares é barata.
+    caixas = [[x, y, x + w, y + h, area] for x, y, w, h, area in caixas]
+    fundiu = True
+    while fundiu:
+        fundiu = False
+        i = 0
+        while i < len(caixas):
+            a = caixas[i]
+            j = i + 1
+            while j < len(caixas):
+                b = caixas[j]
+                if a[0] - margem <= b[2] and b[0] - margem <= a[2] and a[1] - margem <= b[3] and b[1] - margem <= a[3]:
+                    a[0], a[1] = min(a[0], b[0]), min(a[1], b[1])
+                    a[2], a[3] = max(a[2], b[2]), max(a[3], b[3])
+                    a[4] += b[4]
+                    del caixas[j]
+                    fundiu = True
+                else:
+                    j += 1
+            i += 1
+    return [(x0, y0, x1 - x0, y1 - y0, area) for x0, y0, x1, y1, area in caixas]
+
+
+@perfilar()
+def localizar_objetos(
+    subtracao, limiar=50, niveis_piramide=2, area_minima=400, tamanho_morfologia=3, margem_fusao=16, max_caixas=16
+):
+    """
+    Localiza os objetos de uma imagem de diferença por componentes conexos, em resolução reduzida.
+
+    Alternativa a detectar_caixas para quadros grandes e ruidosos: em vez de um retângulo por
+    contorno (inclusive por pixel isolado de ruído), a diferença é reduzida por uma pirâmide
+    Gaussiana (cv2.pyrDown, que também suaviza o ruído), binarizada, limpa por abertura e
+    fechamento morfológicos e rotulada com cv2.connectedComponentsWithStats. Componentes
+    pequenos são descartados, componentes vizinhos são unidos em um só retângulo e as caixas
+    são levadas de volta à resolução original. O custo cai com o quadrado da redução e o
+    número de caixas fica limitado a max_caixas.
+
+    Args:
+        subtracao (numpy.ndarray): A diferença absoluta em tons de cinza (uint8), em resolução cheia.
+        limiar (int, optional): O limiar de binarização da diferença. Padrão é 50.
+        niveis_piramide (int, optional): Quantas vezes a imagem é reduzida pela metade. Padrão é 2.
+        area_minima (int, optional): A área mínima de um objeto, em pixels da resolução cheia.
+                                     Padrão é 400 (um quadrado de 20x20).
+        tamanho_morfologia (int, optional): O lado do elemento estruturante (elíptico) da
+                                            abertura e do fechamento, na resolução reduzida.
+                                            Com 0, a limpeza morfológica é omitida. Padrão é 3.
+        margem_fusao (int, optional): Caixas a até esta distância (pixels da resolução cheia)
+                                      são unidas. Padrão é 16.
+        max_caixas (int, optional): O número máximo de caixas retornadas (as de maior área). Padrão é 16.
 
-def _02_subtrai_e_delineia(bg_path, fg_path, limiar=50):
+    Returns:
+        list[Caixa]: As caixas (x, y, largura, altura, area) em coordenadas da resolução cheia,
+                     da maior para a menor área.
+    """
+    altura, largura = subtracao.shape[:2]
+
+    # Reduz a diferença pela pirâmide Gaussiana; cada nível divide cada lado por 2
+    reduzida = subtracao
+    for _ in range(niveis_piramide):
+        reduzida = cv2.pyrDown(reduzida)
+    escala = 2**niveis_piramide
+
+    # Binariza e limpa: a abertura remove pontos isolados, o fechamento preenche buracos
+    _, binaria = cv2.threshold(reduzida, limiar, 255, cv2.THRESH_BINARY)
+    if tamanho_morfologia > 1:
+        elemento = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (tamanho_morfologia, tamanho_morfologia))
+        binaria = cv2.morphologyEx(binaria, cv2.MORPH_OPEN, elemento)
+        binaria = cv2.morphologyEx(binaria, cv2.MORPH_CLOSE, elemento)
+
+    # Rotula os componentes conexos; a linha 0 das estatísticas é o fundo
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binaria, connectivity=8)
+    stats = stats[1:]
+    stats = stats[stats[:, cv2.CC_STAT_AREA] * escala * escala >= area_minima]
+
+    # Mantém só os maiores componentes antes da fusão, para limitar o custo com muito ruído
+    stats = stats[np.argsort(-stats[:, cv2.CC_STAT_AREA], kind="stable")[: max_caixas * 4]]
+    caixas = _fundir_caixas([tuple(int(v) for v in linha) for linha in stats], margem_fusao / escala)
+
+    # Leva as caixas de volta à resolução cheia (limitadas às bordas da imagem)
+    resultado = []
+    for x, y, w, h, area in sorted(caixas, key=lambda c: -c[4])[:max_caixas]:
+        x0, y0 = x * escala, y * escala
+        x1, y1 = min((x + w) * escala, largura), min((y + h) * escala, altura)
+        resultado.append(Caixa(x0, y0, x1 - x0, y1 - y0, area * escala * escala))
+    return resultado
+
+
+def desenhar_caixas(img, caixas, cor=(0, 0, 255), espessura=2):
+    """
+    Desenha retângulos sobre uma cópia da imagem.
+
+    Args:
+        img (numpy.ndarray): A imagem (BGR) sobre a qual os retângulos serão desenhados.
+        caixas (list[tuple]): Os retângulos (x, y, largura, altura), ou Caixa de localizar_objetos.
+        cor (tuple, optional): A cor BGR dos retângulos. Padrão é vermelho (0, 0, 255).
+        espessura (int, optional): A espessura da linha. Padrão é 2.
+
+    Returns:
+        numpy.ndarray: A cópia da imagem com os retângulos desenhados.
+    """
+    # Cria uma cópia da imagem para desenhar os retângulos
+    img_caixas = img.copy()
+    for caixa in caixas:
+        x, y, w, h = caixa[:4]
+        cv2.rectangle(img_caixas, (x, y), (x + w, y + h), cor, espessura)
+    return img_caixas
+
+
+@perfilar()
+def _02_subtrai_e_delineia(
+    bg_path,
+    fg_path,
+    limiar=50,
+    output_binaria_path="out/02_subtracao_binaria.jpg",
+    output_contorno_path="out/02_com_contorno.jpg",
+    saida=None,
+    modo="contornos",
+):
     """
     Realiza a subtração de fundo para realçar a área de um objeto (corpo humano)
     em uma imagem, binariza o resultado e plota um retângulo delimitador vermelho
@@ -74,6 +376,20 @@ def _02_subtrai_e_delineia(bg_path, fg_path, limiar=50):
                                 resultado da subtração. Pixels com diferença de intensidade
                                 acima deste limiar serão considerados parte do objeto.
                                 Valores típicos variam de 30 a 80. Padrão é 50.
+        output_binaria_path (str, optional): O caminho onde a imagem binarizada será salva.
+                                             Se None, ela não é gravada.
+                                             Padrão é "out/02_subtracao_binaria.jpg".
+        output_contorno_path (str, optional): O caminho onde a imagem com o retângulo será salva.
+                                              Se None, ela não é gravada.
+                                              Padrão é "out/02_com_contorno.jpg".
+        saida (SaidaImagem, optional): O destino que codifica e grava as imagens (ex: em
+                                       segundo plano). Padrão é a gravação síncrona.
+        modo (str, optional): Como os objetos são delimitados:
+                              - "contornos" (padrão): um retângulo por contorno externo da
+                                imagem binarizada (ver detectar_caixas);
+                              - "componentes": componentes conexos em resolução reduzida, com
+                                limpeza do ruído e fusão de caixas vizinhas (ver localizar_objetos).
+                                Bem mais rápido em imagens grandes e ruidosas.
 
     Returns:
         tuple: Uma tupla contendo:
@@ -84,6 +400,7 @@ def _02_subtrai_e_delineia(bg_path, fg_path, limiar=50):
 
     Raises:
         FileNotFoundError: Se alguma das imagens de entrada não puder ser carregada.
+        ValueError: Se o modo for desconhecido.
 
     Pré-requisitos:
         - As duas imagens devem ser capturadas com a câmera em uma posição fixa,
@@ -92,56 +409,191 @@ def _02_subtrai_e_delineia(bg_path, fg_path, limiar=50):
         - A imagem de primeiro plano deve conter o objeto no mesmo cenário.
         - Ambas as imagens são convertidas para tons de cinza antes da subtração.
     """
-    # Carrega as imagens de fundo e primeiro plano
-    img_bg = cv2.imread(bg_path)
-    img_fg = cv2.imread(fg_path)
-
-    # Verifica se as imagens foram carregadas corretamente
-    if img_bg is None:
-        raise FileNotFoundError(f"  ⤷ Não foi possível carregar a imagem de fundo em: {bg_path}")
-    if img_fg is None:
-        raise FileNotFoundError(f"  ⤷ Não foi possível carregar a imagem de primeiro plano em: {fg_path}")
-
-    # Converte ambas as imagens para tons de cinza
-    bg_gray = cv2.cvtColor(img_bg, cv2.COLOR_BGR2GRAY)
-    fg_gray = cv2.cvtColor(img_fg, cv2.COLOR_BGR2GRAY)
+    if modo not in MODOS_DETECCAO:
+        raise ValueError(f"Modo de detecção desconhecido: {modo}. Opções: {', '.join(MODOS_DETECCAO)}")
+
+    # Carrega as imagens de fundo e primeiro plano.
+    # Do fundo só é usada a luminância, então ele é decodificado direto em tons de cinza;
+    # o primeiro plano é lido em cores, pois o retângulo é desenhado sobre ele.
+    try:
+        bg_gray = carregar_imagem(bg_path, cv2.IMREAD_GRAYSCALE)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"  ⤷ Não foi possível carregar a imagem de fundo em: {bg_path}") from None
+    try:
+        img_fg = carregar_imagem(fg_path, cv2.IMREAD_COLOR)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"  ⤷ Não foi possível carregar a imagem de primeiro plano em: {fg_path}") from None
+
+    # Converte o primeiro plano para tons de cinza.
+    # Os intermediários usam buffers reaproveitados entre chamadas (ver components.buffers).
+    fg_gray = cv2.cvtColor(img_fg, cv2.COLOR_BGR2GRAY, dst=rascunho(img_fg.shape[:2], np.uint8, "subtracao.cinza"))
 
     # Calcula a diferença absoluta entre as imagens em tons de cinza
     # Isso realça as áreas onde houve mudança (onde o corpo está)
-    subtracao = cv2.absdiff(fg_gray, bg_gray)
+    subtracao = cv2.absdiff(fg_gray, bg_gray, dst=rascunho(fg_gray.shape, np.uint8, "subtracao.diferenca"))
 
     # Binariza a imagem de diferença usando o limiar especificado.
     # Pixels com diferença > limiar se tornam 255 (branco), outros 0 (preto).
     _, binaria = cv2.threshold(subtracao, limiar, 255, cv2.THRESH_BINARY)
 
-    # Encontra os contornos na imagem binarizada.
-    # cv2.RETR_EXTERNAL: Recupera apenas os contornos externos.
-    # cv2.CHAIN_APPROX_SIMPLE: Compacta segmentos horizontais, verticais e diagonais,
-    #                         deixando apenas os pontos finais.
-    contours, _ = cv2.findContours(binaria, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    # Encontra os retângulos delimitadores das regiões detectadas e os desenha
+    # sobre uma cópia da imagem de primeiro plano
+    caixas = localizar_objetos(subtracao, limiar) if modo == "componentes" else detectar_caixas(binaria)
+    img_fg_contorno = desenhar_caixas(img_fg, caixas)
 
-    # Cria uma cópia da imagem de primeiro plano para desenhar os contornos
-    img_fg_contorno = img_fg.copy()
+    # Salva as imagens resultantes (em segundo plano, se o destino for assíncrono)
+    saida = saida or SAIDA_SINCRONA
+    if output_binaria_path is not None:
+        output_binaria_path = saida.salvar(binaria, output_binaria_path)
+        print(f"  ⤷ Imagem binarizada salva em {output_binaria_path}")
+    if output_contorno_path is not None:
+        output_contorno_path = saida.salvar(img_fg_contorno, output_contorno_path)
+        print(f"  ⤷ Imagem com contorno salva em {output_contorno_path}")
 
-    # Itera sobre os contornos encontrados
-    for cnt in contours:
-        # Calcula o retângulo delimitador (bounding box) para cada contorno
-        x, y, w, h = cv2.boundingRect(cnt)
-        # Desenha um retângulo vermelho (0, 0, 255) com espessura 2 na imagem de primeiro plano
-        cv2.rectangle(img_fg_contorno, (x, y), (x + w, y + h), (0, 0, 255), 2)
+    return binaria, img_fg_contorno
 
-    # Salva as imagens resultantes
-    output_binaria_path = "out/02_subtracao_binaria.jpg"
-    output_contorno_path = "out/02_com_contorno.jpg"
-    cv2.imwrite(output_binaria_path, binaria)
-    cv2.imwrite(output_contorno_path, img_fg_contorno)
-    print(f"  ⤷ Imagem binarizada salva em {output_binaria_path}")
-    print(f"  ⤷ Imagem com contorno salva em {output_contorno_path}")
 
-    return binaria, img_fg_contorno
+# Decomposições de kernel já calculadas (a SVD de um kernel 101x101 custa alguns milissegundos)
+_cache_decomposicoes = OrderedDict()
+_cache_decomposicoes_lock = threading.Lock()
+_CACHE_DECOMPOSICOES_MAX = 128
 
 
-def convolucao_espacial(img, kernel):
+def decompor_kernel(kernel, tolerancia=1e-6, max_posto=3):
+    """
+    Decompõe um kernel 2D em uma soma de poucos kernels separáveis, usando a SVD.
+
+    Pela SVD, K = Σ σᵢ·uᵢ·vᵢᵀ. Cada termo é o produto externo de uma coluna por uma
+    linha, e pode ser aplicado como duas convoluções 1D. O kernel é truncado no menor
+    posto r cujos valores singulares descartados têm energia relativa abaixo da tolerância:
+    sqrt(Σ_{i>r} σᵢ²) ≤ tolerancia · ||K||_F.
+
+    Kernels de média (box), Gaussianos e de Sobel têm posto 1; um Laplaciano 3x3 tem posto 2.
+
+    Args:
+        kernel (numpy.ndarray): O kernel 2D.
+        tolerancia (float, optional): O erro relativo (norma de Frobenius) aceito na truncagem.
+                                      Padrão é 1e-6.
+        max_posto (int, optional): O maior número de termos separáveis aceito. Padrão é 3.
+
+    Returns:
+        list or None: Lista de pares (coluna, linha) em float32, ou None se o kernel precisar
+                      de mais de max_posto termos (ou for nulo).
+    """
+    kernel = np.ascontiguousarray(kernel)
+    chave = (kernel.tobytes(), kernel.dtype.str, kernel.shape, tolerancia, max_posto)
+    with _cache_decomposicoes_lock:
+        if chave in _cache_decomposicoes:
+            _cache_decomposicoes.move_to_end(chave)
+            return _cache_decomposicoes[chave]
+
+    u, sigma, vt = np.linalg.svd(kernel.astype(np.float64))
+    # residuo[r] = energia dos valores singulares descartados ao manter r termos
+    residuo = np.sqrt(np.cumsum((sigma**2)[::-1])[::-1])
+    posto = next((r for r in range(1, len(sigma) + 1) if r == len(sigma) or residuo[r] <= tolerancia * residuo[0]), None)
+    if sigma[0] == 0 or posto is None or posto > max_posto:
+        fatores = None
+    else:
+        # Divide cada valor singular igualmente entre os dois fatores
+        fatores = [
+            ((u[:, i] * np.sqrt(sigma[i])).astype(np.float32), (vt[i] * np.sqrt(sigma[i])).astype(np.float32))
+            for i in range(posto)
+        ]
+
+    with _cache_decomposicoes_lock:
+        _cache_decomposicoes[chave] = fatores
+        if len(_cache_decomposicoes) > _CACHE_DECOMPOSICOES_MAX:
+            _cache_decomposicoes.popitem(last=False)
+    return fatores
+
+
+def converter_profundidade(resultado, dtype, out=None):
+    """
+    Converte um resultado em ponto flutuante para a profundidade desejada, como o OpenCV faz:
+    tipos inteiros são arredondados e saturados na faixa do tipo (ex: [0, 255] para uint8).
+
+    Args:
+        resultado (numpy.ndarray): O resultado em ponto flutuante.
+        dtype (numpy.dtype): O tipo de dados de saída.
+        out (numpy.ndarray, optional): Um array pré-alocado (mesma forma, tipo dtype) onde o
+                                       resultado convertido é gravado.
+
+    Returns:
+        numpy.ndarray: O resultado convertido (o próprio out, se fornecido; sem out, o próprio
+                       resultado, se já estiver no tipo pedido).
+
+    Raises:
+        ValueError: Se o out não tiver a forma e o tipo do resultado.
+    """
+    dtype = np.dtype(dtype)
+    if out is None:
+        if np.issubdtype(dtype, np.integer):
+            info = np.iinfo(dtype)
+            return np.clip(np.rint(resultado), info.min, info.max).astype(dtype)
+        return resultado.astype(dtype, copy=False)
+
+    verificar_saida(out, resultado.shape, dtype)
+    if np.issubdtype(dtype, np.integer):
+        # Arredonda e satura em um rascunho, sem temporários novos
+        info = np.iinfo(dtype)
+        temporario = rascunho(resultado.shape, resultado.dtype, "converter_profundidade")
+        np.rint(resultado, out=temporario)
+        np.clip(temporario, info.min, info.max, out=temporario)
+        resultado = temporario
+    np.copyto(out, resultado, casting="unsafe")
+    return out
+
+
+def _aplicar_fatores(img, fatores, dst=None):
+    # kernelX filtra ao longo das linhas (eixo x) e kernelY ao longo das colunas (eixo y)
+    if len(fatores) == 1:
+        coluna, linha = fatores[0]
+        return cv2.sepFilter2D(img, -1, linha, coluna, dst=dst)
+
+    # Com mais de um termo, as passadas são somadas em ponto flutuante e o resultado só é
+    # arredondado/saturado no final, como faz o filter2D. As somas usam rascunhos.
+    ddepth = cv2.CV_64F if img.dtype == np.float64 else cv2.CV_32F
+    tipo = np.float64 if ddepth == cv2.CV_64F else np.float32
+    acumulado = rascunho(img.shape, tipo, "separavel.acumulado")
+    parcial = rascunho(img.shape, tipo, "separavel.parcial")
+    for i, (coluna, linha) in enumerate(fatores):
+        if i == 0:
+            cv2.sepFilter2D(img, ddepth, linha, coluna, dst=acumulado)
+        else:
+            cv2.add(acumulado, cv2.sepFilter2D(img, ddepth, linha, coluna, dst=parcial), dst=acumulado)
+    return converter_profundidade(acumulado, img.dtype, out=dst if dst is not None else np.empty(img.shape, img.dtype))
+
+
+def convolucao_separavel(img, kernel, tolerancia=1e-6, max_posto=3, dst=None):
+    """
+    Aplica um kernel de posto baixo como uma soma de convoluções 1D (cv2.sepFilter2D).
+
+    Para um kernel k×k de posto r, o custo por pixel cai de O(k²) para O(2·r·k), com o
+    mesmo resultado da convolução 2D (âncora central e borda refletida).
+
+    Args:
+        img (numpy.ndarray): A imagem de entrada (tons de cinza ou colorida).
+        kernel (numpy.ndarray): O kernel 2D.
+        tolerancia (float, optional): O erro relativo aceito na decomposição (ver decompor_kernel).
+        max_posto (int, optional): O maior número de termos separáveis aceito. Padrão é 3.
+        dst (numpy.ndarray, optional): Um array pré-alocado (forma e tipo da imagem) onde o
+                                       resultado é gravado.
+
+    Returns:
+        numpy.ndarray: A imagem filtrada, com a mesma profundidade da imagem de entrada.
+
+    Raises:
+        ValueError: Se o kernel não puder ser decomposto em até max_posto termos, ou se o dst
+                    não tiver a forma e o tipo da imagem.
+    """
+    fatores = decompor_kernel(kernel, tolerancia, max_posto)
+    if fatores is None:
+        raise ValueError(f"O kernel não pode ser decomposto em até {max_posto} termos separáveis.")
+    return _aplicar_fatores(img, fatores, verificar_saida(dst, img.shape, img.dtype))
+
+
+@perfilar()
+def convolucao_espacial(img, kernel, separavel=True, tolerancia=1e-6, max_posto=3, dst=None):
     """
     Aplica uma operação de convolução espacial a uma imagem usando um kernel (filtro).
 
@@ -156,10 +608,29 @@ def convolucao_espacial(img, kernel):
         kernel (numpy.ndarray): A matriz (kernel) que define o filtro a ser aplicado.
                                 O kernel é geralmente uma matriz pequena (ex: 3x3, 5x5)
                                 de números que multiplicam os valores dos pixels vizinhos.
+        separavel (bool, optional): Se True (padrão), kernels de posto baixo são aplicados como
+                                    somas de convoluções 1D (cv2.sepFilter2D), que custam
+                                    O(2·r·k) por pixel em vez de O(k²), quando isso for mais barato.
+        tolerancia (float, optional): O erro relativo aceito na decomposição (ver decompor_kernel).
+        max_posto (int, optional): O maior número de termos separáveis usado. Padrão é 3.
+        dst (numpy.ndarray, optional): Um array pré-alocado (forma e tipo da imagem) onde o
+                                       resultado é gravado, para reaproveitar a memória entre
+                                       imagens do mesmo tamanho.
 
     Returns:
         numpy.ndarray: A imagem resultante após a aplicação da convolução.
-                       Terá o mesmo tipo e número de canais da imagem de entrada.
+                       Terá o mesmo tipo e número de canais da imagem de entrada
+                       (o próprio dst, se fornecido).
+
+    Raises:
+        ValueError: Se o dst não tiver a forma e o tipo da imagem.
+
+    Erro do caminho separável em relação ao cv2.filter2D:
+        Sendo E a parte descartada da SVD (||E||_F ≤ tolerancia·||K||_F) e n = k_h·k_w,
+        a diferença em cada pixel é limitada por ||E||_F·sqrt(n)·max|img| (Cauchy-Schwarz),
+        somada ao arredondamento: no máximo 1 nível de cinza para imagens inteiras (o
+        sepFilter2D arredonda em outra ordem) e ~1e-6·Σ|K|·max|img| para imagens float32.
+        Para kernels exatamente separáveis (box, Gaussiano, Sobel), sobra só o arredondamento.
 
     Exemplos de kernels:
         - Kernel de média (suavização): np.ones((3,3), np.float32)/9
@@ -171,10 +642,114 @@ def convolucao_espacial(img, kernel):
     # ddepth: Profundidade de bits da imagem de saída. -1 significa que a saída terá a mesma profundidade
     #         da imagem de origem. É comum usar -1 para manter o tipo de dados original (ex: uint8 para imagens de 0-255).
     # kernel: A matriz do filtro (kernel) a ser aplicada.
-    return cv2.filter2D(img, -1, kernel)
+    # dst: Se fornecido, o resultado é gravado nele em vez de em um array novo.
+    dst = verificar_saida(dst, img.shape, img.dtype)
+    if separavel and kernel.ndim == 2 and min(kernel.shape) > 1:
+        fatores = decompor_kernel(kernel, tolerancia, max_posto)
+        # Só compensa quando as r passadas 1D custam menos que a passada 2D
+        if fatores is not None and len(fatores) * (kernel.shape[0] + kernel.shape[1]) < kernel.size:
+            return _aplicar_fatores(img, fatores, dst)
+    return cv2.filter2D(img, -1, kernel, dst=dst)
+
+
+# Cache LRU dos espectros de kernel usados por convolucao_frequencia.
+# Aplicar o mesmo kernel a uma sequência de imagens do mesmo tamanho é o caso comum
+# (ex: um filtro de média sobre todos os quadros de um lote), e a FFT do kernel padded
+# é tão cara quanto a FFT da imagem. A chave inclui os bytes, o dtype e o formato do
+# kernel, o tamanho ótimo da DFT e o tipo de transformada (real ou complexa).
+_cache_espectros = OrderedDict()
+_cache_espectros_lock = threading.Lock()
+_cache_espectros_info = {"max_bytes": 256 * 1024 * 1024, "bytes": 0, "hits": 0, "misses": 0}
+
+
+def configurar_cache_espectros(max_bytes):
+    """
+    Define o limite de memória do cache de espectros de kernel.
+
+    Args:
+        max_bytes (int): O total máximo de bytes ocupados pelos espectros em cache.
+                         Use 0 para desativar o cache.
+    """
+    with _cache_espectros_lock:
+        _cache_espectros_info["max_bytes"] = max(0, int(max_bytes))
+        _reduzir_cache_espectros()
+
+
+def limpar_cache_espectros():
+    """
+    Remove todos os espectros do cache e zera as estatísticas.
+    """
+    with _cache_espectros_lock:
+        _cache_espectros.clear()
+        _cache_espectros_info.update(bytes=0, hits=0, misses=0)
 
 
-def convolucao_frequencia(img, kernel):
+def estatisticas_cache_espectros():
+    """
+    Retorna as estatísticas de uso do cache de espectros de kernel.
+
+    Returns:
+        dict: Quantidade de entradas, bytes ocupados, limite, acertos (hits) e falhas (misses).
+    """
+    with _cache_espectros_lock:
+        return {"entradas": len(_cache_espectros), **_cache_espectros_info}
+
+
+def _reduzir_cache_espectros():
+    # Descarta os espectros menos usados recentemente até caber no limite (chamar com o lock adquirido)
+    while _cache_espectros and _cache_espectros_info["bytes"] > _cache_espectros_info["max_bytes"]:
+        _, espectro = _cache_espectros.popitem(last=False)
+        _cache_espectros_info["bytes"] -= espectro.nbytes
+
+
+def _espectro_kernel(kernel, dft_size, real=True, backend=None):
+    """
+    Retorna a DFT do kernel expandido (zero-padding) para dft_size, usando o cache LRU.
+
+    Args:
+        kernel (numpy.ndarray): O kernel 2D.
+        dft_size (tuple): O tamanho (altura, largura) da DFT.
+        real (bool, optional): Se True, retorna o espectro da FFT real no formato do backend
+                               (ex: meio espectro em complex64). Se False, retorna o espectro
+                               completo (fft2 do NumPy) em complex128.
+        backend (optional): O backend de FFT (ver components.fft). Padrão é o atual.
+
+    Returns:
+        numpy.ndarray: O espectro do kernel (somente leitura, pois é compartilhado pelo cache).
+    """
+    kernel = np.ascontiguousarray(kernel)
+    if real and backend is None:
+        backend = backend_fft()
+    # Cada backend tem o próprio formato de espectro, então o nome dele faz parte da chave
+    chave = (kernel.tobytes(), kernel.dtype.str, kernel.shape, tuple(dft_size), backend.nome if real else "numpy-c128")
+
+    with _cache_espectros_lock:
+        espectro = _cache_espectros.get(chave)
+        if espectro is not None:
+            _cache_espectros.move_to_end(chave)
+            _cache_espectros_info["hits"] += 1
+            return espectro
+        _cache_espectros_info["misses"] += 1
+
+    # O cálculo fica fora do lock para não serializar threads que usam kernels diferentes.
+    # O parâmetro 's' das funções de FFT aplica o zero-padding, com o kernel no canto superior esquerdo.
+    if real:
+        espectro = backend.direta(kernel.astype(np.float32), dft_size)
+    else:
+        # Em float64: com entrada float32, o NumPy 2 devolveria complex64
+        espectro = np.fft.fft2(kernel.astype(np.float64), s=dft_size)
+    espectro.flags.writeable = False
+
+    with _cache_espectros_lock:
+        if chave not in _cache_espectros and espectro.nbytes <= _cache_espectros_info["max_bytes"]:
+            _cache_espectros[chave] = espectro
+            _cache_espectros_info["bytes"] += espectro.nbytes
+            _reduzir_cache_espectros()
+    return espectro
+
+
+@perfilar()
+def convolucao_frequencia(img, kernel, real=True, alinhar=False, backend=None, out=None):
     """
     Aplica uma operação de convolução a uma imagem no domínio da frequência
     usando a Transformada Rápida de Fourier (FFT).
@@ -184,16 +759,40 @@ def convolucao_frequencia(img, kernel):
     domínio espacial é equivalente à multiplicação no domínio da frequência.
 
     Args:
-        img (numpy.ndarray): A imagem de entrada (preferencialmente em tons de cinza)
-                             para a qual o filtro será aplicado. Os valores devem ser
-                             do tipo float32 para a FFT.
+        img (numpy.ndarray): A imagem de entrada, em tons de cinza (HxW) ou colorida (HxWxC),
+                             para a qual o filtro será aplicado. É convertida para
+                             float32 (ou float64, se real=False) antes da FFT; os canais
+                             são transformados juntos.
         kernel (numpy.ndarray): O kernel (filtro) a ser aplicado. Deve ser uma matriz
                                 numpy.ndarray.
+        real (bool, optional): Se True (padrão), usa a FFT real (rfft2/irfft2) em precisão
+                               simples: como a imagem e o kernel são reais, o espectro tem
+                               simetria hermitiana e basta calcular metade dele, em complex64.
+                               Isso usa cerca de 1/4 da memória da FFT complexa em complex128.
+                               A FFT real é feita pelo backend configurado (ver components.fft).
+                               Se False, usa fft2/ifft2 completas do NumPy em precisão dupla.
+        alinhar (bool, optional): Se True, reproduz exatamente a convolucao_espacial
+                                  (cv2.filter2D): o kernel é ancorado no centro, a operação
+                                  é uma correlação e a borda é refletida (BORDER_REFLECT_101)
+                                  em vez de circular. Se False (padrão), mantém o resultado
+                                  clássico da convolução circular com o kernel no canto.
+        backend (optional): O backend de FFT (ex: components.fft.BackendScipy(trabalhadores=4)).
+                            Padrão é o selecionado por selecionar_backend_fft ou pela variável
+                            de ambiente VCRM_FFT_BACKEND.
+        out (numpy.ndarray, optional): Um array pré-alocado (forma da imagem, float32, ou
+                                       float64 se real=False) onde o resultado é gravado.
+                                       Os intermediários (imagem em float32, padding e
+                                       espectros) vêm sempre do pool de rascunho (ver
+                                       components.buffers), então, com out, aplicar o filtro
+                                       a imagens do mesmo tamanho praticamente não aloca memória.
 
     Returns:
-        numpy.ndarray: A imagem resultante após a convolução no domínio da frequência.
-                       A imagem resultante terá o mesmo formato e tipo de dados da imagem
-                       original (se ajustado após a recuperação).
+        numpy.ndarray: A imagem resultante após a convolução no domínio da frequência,
+                       com o mesmo formato (e número de canais) da imagem original, em
+                       float32 (ou float64 se real=False). É o próprio out, se fornecido.
+
+    Raises:
+        ValueError: Se o out não tiver a forma e o tipo do resultado.
 
     Passos da Convolução no Domínio da Frequência:
     1.  **Padding Otimizado:** A imagem e o kernel são expandidos (padded) para um tamanho
@@ -203,7 +802,9 @@ def convolucao_frequencia(img, kernel):
     2.  **DFT da Imagem:** A Transformada Discreta de Fourier é aplicada à imagem padded
         para convertê-la para o domínio da frequência.
     3.  **DFT do Kernel:** O kernel também é expandido para o mesmo tamanho da imagem padded
-        e sua DFT é calculada. É importante que o kernel esteja centralizado no padding.
+        e sua DFT é calculada. O resultado fica em um cache LRU (ver
+        configurar_cache_espectros), então aplicar o mesmo kernel a várias imagens do
+        mesmo tamanho calcula essa DFT uma única vez.
     4.  **Multiplicação no Domínio da Frequência:** As Transformadas de Fourier da imagem
         e do kernel são multiplicadas elemento a elemento. Esta é a operação equivalente
         à convolução no domínio espacial.
@@ -213,138 +814,415 @@ def convolucao_frequencia(img, kernel):
         e os valores podem ser normalizados ou convertidos para o tipo de dados desejado
         (ex: `uint8` para exibição de imagem).
     """
-    # 1. Obter o tamanho ótimo para a DFT e aplicar padding à imagem
-    # getOptimalDFTSize retorna o tamanho de array que é o mais eficiente para DFT
+    altura, largura = img.shape[:2]
+    # A FFT real trabalha em precisão simples; a complexa (real=False) fica toda em float64
+    tipo = np.float32 if real else np.float64
+    out = verificar_saida(out, img.shape, tipo)
+    if alinhar:
+        # Para igualar o cv2.filter2D, a imagem ganha uma borda refletida do tamanho do kernel
+        # (com a âncora no centro) e o kernel é espelhado, transformando a convolução em correlação.
+        # Com essa borda, a parte recortada no passo 6 não sofre o "wrap-around" da DFT.
+        k_h, k_w = kernel.shape
+        a_y, a_x = k_h // 2, k_w // 2
+        forma_borda = (altura + k_h - 1, largura + k_w - 1, *img.shape[2:])
+        img = cv2.copyMakeBorder(
+            _como_tipo(img, tipo, "frequencia.tipo"), a_y, k_h - 1 - a_y, a_x, k_w - 1 - a_x,
+            cv2.BORDER_REFLECT_101, dst=rascunho(forma_borda, tipo, "frequencia.borda"),
+        )
+        kernel = kernel[::-1, ::-1]
+        inicio_y, inicio_x = k_h - 1, k_w - 1
+    else:
+        inicio_y, inicio_x = 0, 0
+
+    # 1. Obter o tamanho ótimo para a DFT
+    # getOptimalDFTSize retorna o tamanho de array que é o mais eficiente para DFT.
+    # O padding com zeros até esse tamanho é feito pelas próprias funções de FFT (parâmetro 's').
     dft_size = (cv2.getOptimalDFTSize(img.shape[0]), cv2.getOptimalDFTSize(img.shape[1]))
 
-    # Cria uma nova matriz de zeros com o tamanho ótimo para padding
-    img_padded = np.zeros(dft_size, dtype=np.float32)
-    # Copia a imagem original para o canto superior esquerdo da matriz padded
-    img_padded[: img.shape[0], : img.shape[1]] = img
+    # 2 e 3. DFT do kernel (do cache, quando disponível) e da imagem.
+    # Imagens coloridas (HxWxC) são reorganizadas em C planos contíguos (CxHxW), na mesma
+    # passada que converte para float32, e todos os canais são transformados em uma única
+    # chamada ao longo dos eixos espaciais. O espectro do kernel é um só, compartilhado
+    # por todos os canais via broadcasting.
+    if real and backend is None:
+        backend = backend_fft()
+    kernel_dft = _espectro_kernel(kernel, dft_size, real=real, backend=backend)
+    multicanal = img.ndim == 3
+    if multicanal:
+        planos = rascunho((img.shape[2], *img.shape[:2]), tipo, "frequencia.planos")
+        np.copyto(planos, np.moveaxis(img, -1, 0), casting="unsafe")
+    else:
+        planos = _como_tipo(img, tipo, "frequencia.planos")
+
+    if real:
+        # Espectro e resultado da inversa em rascunhos do tamanho da DFT
+        forma_espectro, tipo_espectro = backend.forma_espectro(planos.shape, dft_size)
+        img_dft = backend.direta(planos, dft_size, out=rascunho(forma_espectro, tipo_espectro, "frequencia.espectro"))
+
+        # 4. Multiplicação no domínio da frequência (no próprio buffer, quando o backend permite)
+        img_dft = backend.multiplicar(img_dft, kernel_dft)
+
+        # 5. IDFT real: o resultado já é real, sem a parte imaginária residual da ifft2
+        forma_inversa = (*planos.shape[:-2], *dft_size)
+        result = backend.inversa(img_dft, dft_size, out=rascunho(forma_inversa, np.float32, "frequencia.inversa"))
+    else:
+        img_dft = np.fft.fft2(planos, s=dft_size, axes=(-2, -1))
+        result = np.fft.ifft2(img_dft * kernel_dft, axes=(-2, -1)).real
+
+    # 6. Remover o padding extra para retornar a imagem ao seu tamanho original.
+    # O recorte é copiado para o out (ou um array novo), pois a inversa pode ser um rascunho.
+    result = result[..., inicio_y : inicio_y + altura, inicio_x : inicio_x + largura]
+    if multicanal:
+        # Volta ao layout HxWxC do OpenCV
+        result = np.moveaxis(result, 0, -1)
+    if out is None:
+        out = np.empty(result.shape, result.dtype)
+    np.copyto(out, result)
+    return out
+
+
+def _como_tipo(img, dtype, nome):
+    # A imagem no tipo pedido (float32 ou float64); outros tipos são convertidos para um rascunho, sem alocar
+    if img.dtype == dtype:
+        return img
+    convertida = rascunho(img.shape, dtype, nome)
+    np.copyto(convertida, img, casting="unsafe")
+    return convertida
+
+
+def _convolucao_fft(img, kernel, dst=None):
+    # Convolução na frequência alinhada com o filter2D, devolvida na profundidade da entrada.
+    # O resultado em float32 fica em um rascunho e só a conversão final grava no destino.
+    resultado = convolucao_frequencia(
+        img, kernel, alinhar=True, out=rascunho(img.shape, np.float32, "convolucao_fft")
+    )
+    if dst is None:
+        dst = np.empty(img.shape, img.dtype)
+    return converter_profundidade(resultado, img.dtype, out=dst)
+
+
+def _convolucao_filter2d(img, kernel, dst=None):
+    # Convolução 2D direta, sem a detecção de kernels separáveis
+    return convolucao_espacial(img, kernel, separavel=False, dst=dst)
+
+
+# Implementações disponíveis para convolve(), todas com o mesmo resultado do cv2.filter2D
+METODOS_CONVOLVE = {
+    "espacial": _convolucao_filter2d,
+    "separavel": convolucao_separavel,
+    "fft": _convolucao_fft,
+}
+
+# Modelo de custo calibrado (carregado do arquivo local ou medido na primeira chamada)
+_modelo_custo = {"modelo": None}
+_modelo_custo_lock = threading.Lock()
+_ultima_escolha = threading.local()
+_logger = logging.getLogger(__name__)
+
+# Grade da calibração: lados de kernel e lado da imagem de referência
+_CALIBRACAO_KERNELS = (3, 5, 7, 11, 15, 21, 31, 51, 101)
+_CALIBRACAO_LADO = 512
+_VERSAO_MODELO_CUSTO = 2
+
+
+def caminho_calibracao():
+    """
+    Retorna o caminho do arquivo local com a calibração do modelo de custo.
 
-    # 2. Aplicar padding ao kernel para que tenha o mesmo tamanho que a imagem padded
-    kernel_padded = np.zeros_like(img_padded)
-    k_h, k_w = kernel.shape
-    # Centraliza o kernel no canto superior esquerdo do padding (ou pode ser centralizado na imagem, mas aqui é simples)
-    kernel_padded[:k_h, :k_w] = kernel
+    O caminho pode ser definido pela variável de ambiente VCRM_CALIBRACAO; o padrão é
+    ~/.cache/vcrm/calibracao_convolucao.json.
 
-    # 3. Calcular a DFT (Transformada de Fourier) da imagem e do kernel
-    img_dft = np.fft.fft2(img_padded)
-    kernel_dft = np.fft.fft2(kernel_padded)
+    Returns:
+        str: O caminho do arquivo.
+    """
+    padrao = os.path.join(os.path.expanduser("~"), ".cache", "vcrm", "calibracao_convolucao.json")
+    return os.environ.get("VCRM_CALIBRACAO", padrao)
 
-    # 4. Multiplicação no domínio da frequência
-    result_dft = img_dft * kernel_dft
 
-    # 5. Calcular a IDFT (Transformada de Fourier Inversa) e pegar a parte real
-    # A IDFT pode retornar valores complexos, mas a parte real é a imagem de interesse.
-    result = np.fft.ifft2(result_dft).real
+def _identificacao_maquina():
+    # A calibração só vale para a mesma máquina, as mesmas versões das bibliotecas e o mesmo
+    # conjunto de métodos (a versão do modelo muda quando algum método é alterado)
+    return {
+        "versao_modelo": _VERSAO_MODELO_CUSTO,
+        "maquina": platform.node(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "fft": backend_fft().nome,
+        "threads_fft": backend_fft().trabalhadores,
+    }
+
 
-    # 6. Remover o padding extra para retornar a imagem ao seu tamanho original
-    return result[: img.shape[0], : img.shape[1]]
+def _tempo_minimo(funcao, *args, repeticoes=3):
+    # O mínimo de poucas repetições é a estimativa menos ruidosa do custo intrínseco
+    funcao(*args)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(*args)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
 
 
-# 4) Implemente um programa que demonstre o ganho computacional obtido à partir da aplicação do
-# conceito que envolve o Teorema da Convolução. O programa deverá exibir o tempo que a operação
-# levou para ser aplicada à imagem usando o operador de convolução e exibir o tempo que aplicação
-# do filtro levou para ser aplicada no contexto do domínio da frequência. Analise e teça comentários
-# sobre os tempos obtidos.
-def _04_comparar_tempos_convolucao(img_path):
+def calibrar_convolucao(caminho=None, salvar=True):
     """
-    Demonstra e compara o desempenho computacional da convolução espacial
-    versus a convolução no domínio da frequência (usando FFT) para um filtro.
+    Mede o custo de cada método de convolução nesta máquina e ajusta o modelo de custo.
 
-    O Teorema da Convolução estabelece que a convolução no domínio espacial
-    é equivalente à multiplicação no domínio da frequência. Para kernels grandes,
-    a convolução no domínio da frequência (que envolve FFT, multiplicação e IFFT)
-    pode ser significativamente mais rápida do que a convolução direta no domínio espacial.
+    Para cada profundidade (uint8 e float32), mede em uma imagem de referência o tempo
+    por pixel da convolução espacial em função da área do kernel, da separável em função
+    da soma dos lados, e da FFT por unidade de N·log₂N (N = tamanho da DFT). A calibração
+    leva poucos segundos e é salva em um arquivo local para as próximas execuções.
 
     Args:
-        img_path (str): O caminho para a imagem de entrada (será convertida para tons de cinza).
+        caminho (str, optional): O arquivo onde salvar a calibração. Padrão é caminho_calibracao().
+        salvar (bool, optional): Se True (padrão), grava o modelo no arquivo.
 
     Returns:
-        None: A função imprime os tempos de execução no console e tece comentários.
+        dict: O modelo de custo calibrado.
+    """
+    rng = np.random.default_rng(0)
+    lado = _CALIBRACAO_LADO
+    pixels = lado * lado
+    modelo = {"identificacao": _identificacao_maquina(), "kernels": list(_CALIBRACAO_KERNELS), "perfis": {}}
+
+    for nome_dtype in ("uint8", "float32"):
+        img = rng.integers(0, 256, size=(lado, lado)).astype(nome_dtype)
+        espacial, separavel = [], []
+        for k in _CALIBRACAO_KERNELS:
+            kernel = np.ones((k, k), np.float32) / (k * k)
+            espacial.append(_tempo_minimo(_convolucao_filter2d, img, kernel) / pixels)
+            separavel.append(_tempo_minimo(convolucao_separavel, img, kernel) / pixels)
+
+        # A FFT depende do tamanho da DFT, não do kernel: mede alguns tamanhos e usa a mediana
+        custos_fft = []
+        for k in (3, 31, 101):
+            kernel = np.ones((k, k), np.float32) / (k * k)
+            n = _tamanho_dft(img.shape, kernel.shape)
+            custos_fft.append(_tempo_minimo(_convolucao_fft, img, kernel) / (n * np.log2(n)))
+
+        modelo["perfis"][nome_dtype] = {
+            "espacial_por_pixel": espacial,
+            "separavel_por_pixel": separavel,
+            "fft_por_nlogn": float(np.median(custos_fft)),
+        }
 
-    Raises:
-        FileNotFoundError: Se a imagem de entrada não puder ser carregada.
+    if salvar:
+        caminho = caminho or caminho_calibracao()
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(modelo, arquivo, indent=2)
+    with _modelo_custo_lock:
+        _modelo_custo["modelo"] = modelo
+    return modelo
+
+
+def _carregar_modelo_custo():
+    # Usa o modelo em memória, depois o arquivo local, e só então calibra
+    with _modelo_custo_lock:
+        if _modelo_custo["modelo"] is not None:
+            return _modelo_custo["modelo"]
+    caminho = caminho_calibracao()
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            modelo = json.load(arquivo)
+        if modelo.get("identificacao") == _identificacao_maquina():
+            with _modelo_custo_lock:
+                _modelo_custo["modelo"] = modelo
+            return modelo
+    except (OSError, ValueError):
+        pass
+    _logger.info("Calibrando o modelo de custo de convolução (arquivo: %s)", caminho)
+    return calibrar_convolucao(caminho)
+
+
+def _tamanho_dft(forma_img, forma_kernel):
+    # Número de pontos da DFT usada pela convolução alinhada (imagem + borda do kernel)
+    altura = cv2.getOptimalDFTSize(forma_img[0] + forma_kernel[0] - 1)
+    largura = cv2.getOptimalDFTSize(forma_img[1] + forma_kernel[1] - 1)
+    return altura * largura
+
+
+def _interpolar(x, xs, ys):
+    # Interpolação linear; acima da grade, o custo cresce proporcionalmente a x
+    if x > xs[-1]:
+        return ys[-1] * x / xs[-1]
+    return float(np.interp(x, xs, ys))
+
+
+def estimar_custos_convolucao(forma_img, dtype, kernel):
     """
-    # Carrega a imagem em tons de cinza
-    img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
+    Estima, pelo modelo calibrado, o tempo de cada método de convolução para uma chamada.
 
-    # Verifica se a imagem foi carregada corretamente
-    if img is None:
-        raise FileNotFoundError(f"  ⤷ Não foi possível carregar a imagem em: {img_path}")
+    Args:
+        forma_img (tuple): O formato da imagem (altura, largura[, canais]).
+        dtype (numpy.dtype): O tipo de dados da imagem.
+        kernel (numpy.ndarray): O kernel 2D.
 
-    # Define um kernel de exemplo (filtro de média 5x5)
-    # Um kernel maior geralmente mostra melhor o ganho da frequência
-    kernel = np.ones((5, 5), np.float32) / 25
+    Returns:
+        dict: O tempo estimado (em segundos) de cada método aplicável.
+    """
+    modelo = _carregar_modelo_custo()
+    perfil = modelo["perfis"]["uint8" if np.dtype(dtype).itemsize == 1 else "float32"]
+    kernels = modelo["kernels"]
+    k_h, k_w = kernel.shape
+    canais = forma_img[2] if len(forma_img) == 3 else 1
+    pixels = forma_img[0] * forma_img[1] * canais
+
+    # O modelo foi calibrado com kernels quadrados; k_equivalente mantém a área ou a soma dos lados
+    custos = {
+        "espacial": pixels * _interpolar(np.sqrt(k_h * k_w), kernels, perfil["espacial_por_pixel"]),
+    }
+    fatores = decompor_kernel(kernel)
+    if fatores is not None:
+        # Cada termo separável é uma passada completa do sepFilter2D
+        por_termo = _interpolar((k_h + k_w) / 2, kernels, perfil["separavel_por_pixel"])
+        custos["separavel"] = len(fatores) * pixels * por_termo
+    n = _tamanho_dft(forma_img, kernel.shape)
+    custos["fft"] = float(canais * n * np.log2(n) * perfil["fft_por_nlogn"])
+    return custos
+
+
+def escolher_metodo_convolucao(img, kernel):
+    """
+    Escolhe o método de convolução mais barato para a imagem e o kernel, segundo o modelo calibrado.
+
+    Args:
+        img (numpy.ndarray): A imagem de entrada.
+        kernel (numpy.ndarray): O kernel 2D.
+
+    Returns:
+        tuple: (nome do método, dicionário com os custos estimados de cada método).
+    """
+    custos = estimar_custos_convolucao(img.shape, img.dtype, kernel)
+    return min(custos, key=custos.get), custos
+
+
+def ultima_escolha_convolucao():
+    """
+    Retorna a decisão tomada pela última chamada de convolve() nesta thread, para logging.
+
+    Returns:
+        dict or None: Método usado, método pedido, custos estimados, formatos e dtype,
+                      ou None se convolve() ainda não foi chamada.
+    """
+    return getattr(_ultima_escolha, "escolha", None)
+
+
+@perfilar()
+def convolve(img, kernel, method="auto", dst=None):
+    """
+    Aplica uma convolução escolhendo automaticamente o método mais barato.
 
-    # --- Medição de Tempo para Convolução Espacial ---
-    start = time.time()
-    # Chama a função de convolução espacial (internamente usa cv2.filter2D)
-    _ = convolucao_espacial(img, kernel)
-    tempo_espacial = time.time() - start
+    Todos os métodos produzem o mesmo resultado da convolucao_espacial (cv2.filter2D:
+    âncora central, borda refletida e mesma profundidade da entrada), então a escolha
+    afeta apenas o tempo de execução. Com method="auto", o método é escolhido por um
+    modelo de custo calibrado uma vez por máquina (ver calibrar_convolucao).
 
-    # --- Medição de Tempo para Convolução no Domínio da Frequência ---
-    # Para a convolução de frequência, é importante que a imagem esteja em float32
-    # e que o kernel seja passado corretamente (já tratado dentro da função convolucao_frequencia)
-    start = time.time()
-    _ = convolucao_frequencia(img, kernel)
-    tempo_freq = time.time() - start
+    Args:
+        img (numpy.ndarray): A imagem de entrada (tons de cinza ou colorida).
+        kernel (numpy.ndarray): O kernel 2D.
+        method (str, optional): "auto" (padrão), "espacial", "separavel" ou "fft".
+        dst (numpy.ndarray, optional): Um array pré-alocado (forma e tipo da imagem) onde o
+                                       resultado é gravado.
 
-    print(f"  ⤷ Tempo Convolução Espacial: {tempo_espacial:.6f} segundos")
-    print(f"  ⤷ Tempo Convolução Frequencial: {tempo_freq:.6f} segundos")
-    input("*press enter")
+    Returns:
+        numpy.ndarray: A imagem filtrada (o próprio dst, se fornecido). O método usado pode
+                       ser consultado com ultima_escolha_convolucao().
 
+    Raises:
+        ValueError: Se o método for desconhecido, ou se o dst não tiver a forma e o tipo da imagem.
+    """
+    kernel = np.asarray(kernel, dtype=np.float32)
+    if method == "auto":
+        metodo, custos = escolher_metodo_convolucao(img, kernel)
+    elif method in METODOS_CONVOLVE:
+        metodo, custos = method, None
+    else:
+        raise ValueError(f"Método desconhecido: {method}. Opções: auto, {', '.join(METODOS_CONVOLVE)}")
+
+    _ultima_escolha.escolha = {
+        "metodo": metodo,
+        "pedido": method,
+        "custos_estimados": custos,
+        "forma_img": img.shape,
+        "dtype": str(img.dtype),
+        "forma_kernel": kernel.shape,
+    }
+    _logger.debug("convolve: método %s para imagem %s (%s) e kernel %s", metodo, img.shape, img.dtype, kernel.shape)
+    return METODOS_CONVOLVE[metodo](img, kernel, dst=verificar_saida(dst, img.shape, img.dtype))
 
-def _03_comparar_imagens(img_path1, img_path2):
+
+@perfilar()
+def _03_comparar_imagens(img_path1, img_path2, parar_na_primeira=False, calcular_ssim=False):
     """
     Compara duas imagens e gera um relatório técnico detalhado sobre as diferenças.
 
+    As imagens são comparadas como arrays do OpenCV, faixa por faixa, calculando na mesma
+    passada a contagem de pixels diferentes, o retângulo das diferenças, PSNR, SSIM (opcional) e
+    os erros por canal (ver comparacao.comparar_arrays).
+
     Parâmetros:
     - img_path1: caminho da primeira imagem
     - img_path2: caminho da segunda imagem
-    - salvar_diff: caminho para salvar a imagem de diferenças
+    - parar_na_primeira: se True, apenas verifica se as imagens são idênticas, parando na
+      primeira faixa com diferença (as demais métricas ficam incompletas)
+    - calcular_ssim: se True, calcula também o SSIM, a etapa mais cara da comparação (padrão: False)
 
     Retorna:
     - Um dicionário com métricas técnicas da comparação.
     """
-    # Carregar imagens e garantir RGB
-    img1 = Image.open(img_path1).convert("RGB")
-    img2 = Image.open(img_path2).convert("RGB")
+    # Carregar imagens em 3 canais (imagens em tons de cinza são replicadas nos canais)
+    img1 = carregar_imagem(img_path1, cv2.IMREAD_COLOR)
+    img2 = carregar_imagem(img_path2, cv2.IMREAD_COLOR)
 
-    # Verificar tamanho
-    if img1.size != img2.size:
-        return {
-            "iguais": False,
-            "mensagem": "As imagens têm tamanhos diferentes.",
-            "tamanho_img1": img1.size,
-            "tamanho_img2": img2.size,
-        }
+    return relatorio_comparacao(img1, img2, parar_na_primeira, calcular_ssim)
 
-    # Calcular diferença
-    diff = ImageChops.difference(img1, img2)
 
-    # Obter bounding box da diferença
-    bbox = diff.getbbox()
+def relatorio_comparacao(img1, img2, parar_na_primeira=False, calcular_ssim=False):
+    """
+    Gera o relatório de _03_comparar_imagens para duas imagens já carregadas na memória.
 
-    # Converter para numpy para análise de pixel
-    diff_np = np.array(diff)
-    total_pixels = diff_np.shape[0] * diff_np.shape[1]
+    Args:
+        img1 (numpy.ndarray): A primeira imagem.
+        img2 (numpy.ndarray): A segunda imagem.
+        parar_na_primeira (bool, optional): Ver _03_comparar_imagens. Padrão é False.
+        calcular_ssim (bool, optional): Ver _03_comparar_imagens. Padrão é False.
 
-    # Pixel é diferente se houver qualquer canal (R, G, B) não nulo
-    mask = np.any(diff_np != 0, axis=-1)
-    num_pixels_diferentes = np.count_nonzero(mask)
-    percentual_diferenca = (num_pixels_diferentes / total_pixels) * 100
+    Returns:
+        dict: As métricas da comparação, com as mesmas chaves de _03_comparar_imagens.
+    """
+    # Verificar tamanho (reportado como largura x altura)
+    if img1.shape != img2.shape:
+        return {
+            "iguais": False,
+            "mensagem": "As imagens têm tamanhos diferentes.",
+            "tamanho_img1": (img1.shape[1], img1.shape[0]),
+            "tamanho_img2": (img2.shape[1], img2.shape[0]),
+        }
 
-    # if bbox:
-    #     diff.save(salvar_diff)
+    metricas = comparar_arrays(img1, img2, parar_na_primeira=parar_na_primeira, calcular_ssim=calcular_ssim)
+    num_pixels_diferentes = metricas["pixels_diferentes"]
 
-    return {
-        " ⤷ iguais": num_pixels_diferentes == 0,
-        " ⤷ mensagem": "Imagens idênticas." if num_pixels_diferentes == 0 else "Diferenças detectadas.",
-        " ⤷ pixels_totais": total_pixels,
+    relatorio = {
+        " ⤷ iguais": metricas["iguais"],
+        " ⤷ mensagem": "Imagens idênticas." if metricas["iguais"] else "Diferenças detectadas.",
+        " ⤷ pixels_totais": metricas["pixels_totais"],
         " ⤷ pixels_diferentes": num_pixels_diferentes,
-        " ⤷ percentual_diferenca": round(percentual_diferenca, 4),
-        " ⤷ bounding_box_diferenca": bbox,
-        # " ⤷ imagem_diferenca": salvar_diff if bbox else None,
+        " ⤷ percentual_diferenca": round(metricas["percentual_diferenca"], 4),
+        " ⤷ bounding_box_diferenca": metricas["bounding_box"],
     }
+    if metricas["completa"]:
+        relatorio[" ⤷ psnr_db"] = round(metricas["psnr"], 4)
+        if calcular_ssim:
+            relatorio[" ⤷ ssim"] = round(metricas["ssim"], 6)
+        # Os canais seguem a ordem BGR do OpenCV; imagens de um canal têm só o "cinza"
+        nomes = ["cinza"] if len(metricas["por_canal"]) == 1 else list("BGR")
+        nomes += [str(c) for c in range(len(nomes), len(metricas["por_canal"]))]
+        for nome, canal in zip(nomes, metricas["por_canal"]):
+            relatorio[f" ⤷ erro_canal_{nome}"] = {
+                "mae": round(canal["mae"], 4),
+                "mse": round(canal["mse"], 4),
+                "max": canal["erro_maximo"],
+            }
+    return relatorio
@@ -0,0 +1,599 @@
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import re
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from components.comparacao import psnr
+from components.desempenho import imagens_de_src, info_maquina, kernel_media, medir
+from components.filtros import _03_1_filtro_high_boost, _03_2_filtro_passa_alta
+from components.processamento import (
+    _01_clusterizacao_tons_cinza,
+    _02_subtrai_e_delineia,
+    convolucao_espacial,
+    convolucao_frequencia,
+)
+from components.utils import carregar_imagem
+
+# Suíte de regressão de desempenho e de resultados das operações públicas (components/__init__.py).
+# Cada operação é medida em imagens sintéticas determinísticas (256² a 8192²) e nas imagens de
+# src/, e comparada com duas referências guardadas no diretório regressao/:
+#     - golden.json: a assinatura de cada saída (sha256, forma, tipo e uma miniatura 32x32).
+#       Vale para qualquer máquina: um checksum diferente só é aceito se a miniatura continuar
+#       a menos de uma fração de nível da referência (ex: arredondamentos de outra FFT, que
+#       mudam poucos pixels em 1 nível), senão é regressão.
+#     - golden/<operação>__<imagem>.npz: as saídas inteiras das imagens pequenas (sintéticas
+#       de 256² e src/pessoa.png). A miniatura resume milhares de pixels em cada ponto e não
+#       vê um erro localizado (um bloco de 3x3 pixels, uma borda de 1 pixel); nessas imagens,
+#       um checksum diferente exige que todo pixel fique a até 1 nível da referência.
+#     - baseline_<máquina>.json: tempo mínimo, IQR e pico de memória de cada medição nesta
+#       máquina. Tempos e memória acima da tolerância são regressões. O tempo comparado é o
+#       mínimo das repetições (o ruído de uma máquina compartilhada só deixa as execuções mais
+#       lentas, nunca mais rápidas), e operações rápidas são repetidas mais vezes. O mínimo de
+#       uma operação de poucos milissegundos também muda de um processo para outro (até ~1,7x
+#       nesta máquina virtual, conforme onde caem as páginas das imagens), então a baseline
+#       guarda o maior dos mínimos de alguns processos novos, e as novas tentativas de um tempo
+#       acima do limite também rodam em processos novos.
+# Qualquer regressão faz a suíte falhar (RegressaoDetectada, código de saída 1 no CLI).
+
+TAMANHOS_REGRESSAO = (256, 1024, 4096, 8192)
+DIRETORIO_REGRESSAO = "regressao"
+
+# Tolerâncias padrão: tempo mínimo até 25% acima da baseline (mais o IQR da baseline, ou
+# 0,5 ms se for maior), memória até 10% (e 1 MiB),
+# e diferença máxima entre as miniaturas (em níveis de cinza) quando o checksum da saída muda.
+# Cada pixel da miniatura é a média de um bloco da saída, então arredondamentos espalhados
+# quase não a movem, enquanto uma mudança real (ex: detalhe saturado em uma borda) move o
+# bloco inteiro em décimos de nível ou mais.
+TOLERANCIA_TEMPO = 0.25
+TOLERANCIA_MEMORIA = 0.10
+TOLERANCIA_SAIDA = 0.1
+_FOLGA_TEMPO = 0.0005
+_FOLGA_MEMORIA = 1024 * 1024
+
+# Operações rápidas são repetidas até somar cerca de 0,3 s de medição (no máximo 50 vezes),
+# para que o mínimo e o IQR de alguns milissegundos não dependam de 3 amostras
+_TEMPO_MEDICAO = 0.3
+_REPETICOES_MAX = 50
+
+# Um tempo acima do limite é medido de novo, em um processo novo (até 3 tentativas no total),
+# antes de virar regressão: uma janela lenta da máquina virtual ou um processo que caiu no modo
+# lento não se repetem nas tentativas seguintes, e uma regressão real sim. A baseline é medida
+# em 3 processos (o atual e mais 2 novos)
+_TENTATIVAS_TEMPO = 3
+RODADAS_BASELINE = 3
+
+# Diferença máxima aceita pixel a pixel (em níveis) nas saídas guardadas inteiras, e o maior
+# número de pixels de uma imagem de entrada cujas saídas são guardadas inteiras (para manter
+# o repositório pequeno: as de 256² e src/pessoa.png, com 626x508)
+TOLERANCIA_PIXEL = 1.0
+_PIXELS_GOLDEN_COMPLETO = 320_000
+
+# Miniatura 32x32 em ponto fixo (1/256 de nível, uint16), para caber no JSON com precisão
+_LADO_MINIATURA = 32
+_ESCALA_MINIATURA = 256
+
+# Kernel das convoluções medidas (o da opção 4 do menu, no meio da faixa de tamanhos)
+_KERNEL_CONVOLUCAO = kernel_media(31)
+
+# Pares fundo/primeiro plano de src/ usados na subtração (mesmo tamanho e mesma cena)
+_FUNDOS_SRC = {"02.jpeg": "01.jpeg", "pessoa_praia.png": "praia.jpg"}
+
+
+class RegressaoDetectada(AssertionError):
+    """Levantada quando a suíte encontra regressões de tempo, de memória ou de resultado."""
+
+
+def _cinza(caso):
+    return carregar_imagem(caso["caminho"], cv2.IMREAD_GRAYSCALE)
+
+
+# Operações medidas: recebem o caso (caminho da imagem e, se houver, do fundo) e retornam as
+# imagens resultantes. Nada é gravado em disco, para medir só o processamento.
+OPERACOES_REGRESSAO = {
+    "clusterizar": lambda caso: (_01_clusterizacao_tons_cinza(caso["caminho"], output_path=None),),
+    "subtrair": lambda caso: _02_subtrai_e_delineia(caso["fundo"], caso["caminho"], 50, None, None),
+    "high-boost": lambda caso: (_03_1_filtro_high_boost(caso["caminho"], 1.5, output_path=None),),
+    "passa-alta": lambda caso: (_03_2_filtro_passa_alta(caso["caminho"], output_path=None),),
+    "convolucao-espacial": lambda caso: (convolucao_espacial(_cinza(caso), _KERNEL_CONVOLUCAO),),
+    "convolucao-frequencia": lambda caso: (convolucao_frequencia(_cinza(caso), _KERNEL_CONVOLUCAO),),
+}
+
+
+def imagens_sinteticas_regressao(lado, semente=0):
+    """
+    Gera um par determinístico de imagens coloridas (fundo e fundo com um objeto) para a suíte.
+
+    O fundo tem gradientes, formas geométricas e ruído Gaussiano leve, para que bordas, texturas
+    e regiões planas exercitem os filtros; o objeto é uma elipse com textura própria.
+
+    Args:
+        lado (int): O lado das imagens quadradas.
+        semente (int, optional): A semente do gerador aleatório. Padrão é 0.
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]: O fundo e a imagem com o objeto (BGR, uint8).
+    """
+    rng = np.random.default_rng([semente, lado])
+    eixo = np.linspace(0, 1, lado, dtype=np.float32)
+    fundo = np.empty((lado, lado, 3), np.float32)
+    fundo[..., 0] = 40 + 120 * eixo[None, :]
+    fundo[..., 1] = 60 + 100 * eixo[:, None]
+    fundo[..., 2] = 90 + 60 * (eixo[None, :] * eixo[:, None])
+
+    # Formas com posição, tamanho e cor aleatórios (a quantidade cresce com a área)
+    for _ in range(max(8, lado * lado // 65536)):
+        cor = tuple(float(c) for c in rng.integers(0, 256, 3))
+        x, y = (int(v) for v in rng.integers(0, lado, 2))
+        r = int(rng.integers(lado // 64 + 2, lado // 8 + 3))
+        if rng.random() < 0.5:
+            cv2.circle(fundo, (x, y), r, cor, -1, cv2.LINE_AA)
+        else:
+            cv2.rectangle(fundo, (x - r, y - r), (x + r, y + r // 2), cor, -1)
+    fundo += rng.normal(0, 6, fundo.shape).astype(np.float32)
+    fundo = np.clip(fundo, 0, 255).astype(np.uint8)
+
+    objeto = fundo.copy()
+    centro = (lado // 2, lado // 2)
+    eixos = (lado // 6, lado // 3)
+    cv2.ellipse(objeto, centro, eixos, 15, 0, 360, (30, 30, 200), -1, cv2.LINE_AA)
+    cv2.ellipse(objeto, centro, (eixos[0] // 2, eixos[1] // 2), 15, 0, 360, (200, 220, 240), 3, cv2.LINE_AA)
+    return fundo, objeto
+
+
+def preparar_casos(tamanhos=TAMANHOS_REGRESSAO, usar_src=True, diretorio_cache=None):
+    """
+    Monta a lista de imagens da suíte, gravando as sintéticas (em PNG, sem perdas) se preciso.
+
+    As operações públicas recebem caminhos, então as imagens sintéticas são gravadas uma vez
+    em um diretório de cache e reaproveitadas nas execuções seguintes.
+
+    Args:
+        tamanhos (iterable[int], optional): Os lados das imagens sintéticas. Padrão é TAMANHOS_REGRESSAO.
+        usar_src (bool, optional): Se True (padrão), inclui as imagens de src/.
+        diretorio_cache (str, optional): Onde gravar as sintéticas. Padrão é <tmp>/vcrm-regressao.
+
+    Returns:
+        list[dict]: Um caso por imagem, com "nome", "caminho" e "fundo" (None se não houver
+                    imagem de fundo para a subtração).
+    """
+    diretorio_cache = diretorio_cache or os.path.join(tempfile.gettempdir(), "vcrm-regressao")
+    os.makedirs(diretorio_cache, exist_ok=True)
+    casos = []
+    for lado in tamanhos:
+        caminho_fundo = os.path.join(diretorio_cache, f"sintetica_{lado}_fundo.png")
+        caminho = os.path.join(diretorio_cache, f"sintetica_{lado}_objeto.png")
+        if not (os.path.exists(caminho_fundo) and os.path.exists(caminho)):
+            fundo, objeto = imagens_sinteticas_regressao(lado)
+            cv2.imwrite(caminho_fundo, fundo, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+            cv2.imwrite(caminho, objeto, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        casos.append({"nome": f"sintetica_{lado}", "caminho": caminho, "fundo": caminho_fundo})
+
+    if usar_src:
+        for caminho in imagens_de_src():
+            nome = os.path.basename(caminho)
+            fundo = _FUNDOS_SRC.get(nome)
+            fundo = os.path.join(os.path.dirname(caminho), fundo) if fundo else None
+            casos.append({"nome": nome, "caminho": caminho, "fundo": fundo})
+    return casos
+
+
+def assinatura_saida(img):
+    """
+    Resume uma imagem resultante para a comparação com as saídas de referência.
+
+    Args:
+        img (numpy.ndarray): A imagem.
+
+    Returns:
+        dict: "sha256" dos pixels, "forma", "dtype" e "miniatura" (a média por área em 32x32,
+              em 1/256 de nível, como uint16 codificado em base64).
+    """
+    img = np.ascontiguousarray(img)
+    miniatura = cv2.resize(img.astype(np.float32), (_LADO_MINIATURA, _LADO_MINIATURA), interpolation=cv2.INTER_AREA)
+    miniatura = np.clip(np.rint(miniatura * _ESCALA_MINIATURA), 0, np.iinfo(np.uint16).max).astype("<u2")
+    return {
+        "sha256": hashlib.sha256(img.tobytes()).hexdigest(),
+        "forma": list(img.shape),
+        "dtype": str(img.dtype),
+        "miniatura": base64.b64encode(miniatura.tobytes()).decode("ascii"),
+    }
+
+
+def _miniatura(assinatura):
+    return np.frombuffer(base64.b64decode(assinatura["miniatura"]), "<u2") / _ESCALA_MINIATURA
+
+
+def comparar_assinaturas(atual, referencia, tolerancia=TOLERANCIA_SAIDA):
+    """
+    Compara a assinatura de uma saída com a de referência.
+
+    Args:
+        atual (dict): A assinatura da saída atual (ver assinatura_saida).
+        referencia (dict): A assinatura de referência.
+        tolerancia (float, optional): A maior diferença aceita entre as miniaturas (em níveis)
+                                      quando o checksum difere. Padrão é TOLERANCIA_SAIDA.
+
+    Returns:
+        tuple[str, str]: O estado ("igual", "deriva" ou "regressao") e uma descrição.
+    """
+    if atual["forma"] != referencia["forma"] or atual["dtype"] != referencia["dtype"]:
+        return "regressao", f"forma/tipo {atual['forma']}/{atual['dtype']} (referência: {referencia['forma']}/{referencia['dtype']})"
+    if atual["sha256"] == referencia["sha256"]:
+        return "igual", "idêntica"
+    diferenca = float(np.abs(_miniatura(atual) - _miniatura(referencia)).max())
+    if diferenca <= tolerancia:
+        return "deriva", f"checksum diferente, miniatura a até {diferenca:.3f} nível da referência"
+    return "regressao", f"saída diferente, miniatura a até {diferenca:.2f} níveis da referência (tolerância {tolerancia})"
+
+
+def caminho_golden_completo(chave, diretorio=DIRETORIO_REGRESSAO):
+    """
+    Retorna o arquivo com as saídas inteiras de referência de uma medição.
+
+    Args:
+        chave (str): A chave da medição ("<operação>|<imagem>").
+        diretorio (str, optional): O diretório da suíte. Padrão é "regressao".
+
+    Returns:
+        str: regressao/golden/<operação>__<imagem>.npz.
+    """
+    nome = re.sub(r"[^A-Za-z0-9_.-]+", "-", chave.replace("|", "__"))
+    return os.path.join(diretorio, "golden", f"{nome}.npz")
+
+
+def _gravar_golden_completo(caminho, imagens):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    np.savez_compressed(caminho, **{f"saida_{i}": img for i, img in enumerate(imagens)})
+
+
+def comparar_pixels(atual, referencia, tolerancia=TOLERANCIA_PIXEL):
+    """
+    Compara uma saída com a saída de referência inteira, pixel a pixel.
+
+    Args:
+        atual (numpy.ndarray): A saída atual.
+        referencia (numpy.ndarray): A saída de referência, com a mesma forma e tipo.
+        tolerancia (float, optional): A maior diferença aceita em um pixel (em níveis).
+                                      Padrão é TOLERANCIA_PIXEL.
+
+    Returns:
+        tuple[str, str]: O estado ("igual", "deriva" ou "regressao") e uma descrição.
+    """
+    if atual.shape != referencia.shape or atual.dtype != referencia.dtype:
+        return "regressao", f"forma/tipo {atual.shape}/{atual.dtype} (referência: {referencia.shape}/{referencia.dtype})"
+    diferenca = np.abs(atual.astype(np.float64) - referencia.astype(np.float64))
+    maximo = float(diferenca.max())
+    if maximo == 0:
+        return "igual", "idêntica"
+    fora = np.count_nonzero(diferenca > tolerancia)
+    descricao = (
+        f"erro máximo {maximo:.3g} níveis, {fora} pixels ({fora / diferenca.size * 100:.3f}%) acima de "
+        f"{tolerancia:g}, PSNR {psnr(float(np.mean(diferenca**2))):.1f} dB"
+    )
+    if maximo <= tolerancia:
+        return "deriva", f"saída inteira a até {maximo:.3g} nível da referência"
+    return "regressao", f"saída diferente: {descricao}"
+
+
+def _pico_memoria(funcao, *args):
+    # Pico de memória alocada (NumPy e Python) durante uma execução, medido com o tracemalloc.
+    # Fica fora da medição de tempo, pois o tracemalloc deixa as alocações mais lentas.
+    ja_ativo = tracemalloc.is_tracing()
+    if not ja_ativo:
+        tracemalloc.start()
+    try:
+        inicio, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        resultado = funcao(*args)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        if not ja_ativo:
+            tracemalloc.stop()
+    return resultado, pico - inicio
+
+
+def medir_operacao(operacao, caso, repeticoes=5, aquecimento=1):
+    """
+    Mede uma operação em um caso: tempo (com aquecimento e repetições), pico de memória e saídas.
+
+    As imagens de entrada ficam no cache de imagens depois do aquecimento, então o tempo
+    medido é o do processamento, sem a decodificação. Operações rápidas recebem mais
+    repetições, até somar cerca de _TEMPO_MEDICAO segundos (no máximo _REPETICOES_MAX).
+
+    Args:
+        operacao (str): O nome da operação (uma das chaves de OPERACOES_REGRESSAO).
+        caso (dict): O caso (ver preparar_casos).
+        repeticoes (int, optional): O mínimo de execuções medidas. Padrão é 5.
+        aquecimento (int, optional): Execuções descartadas (pelo menos uma). Padrão é 1.
+
+    Returns:
+        dict: "mediana", "minimo", "iqr" (segundos), "repeticoes", "pico_memoria" (bytes),
+              "saidas" (assinatura de cada imagem resultante) e "imagens" (as próprias imagens).
+    """
+    funcao = OPERACOES_REGRESSAO[operacao]
+    # O primeiro aquecimento também estima a duração, para escolher o número de repetições
+    inicio = time.perf_counter()
+    funcao(caso)
+    duracao = max(time.perf_counter() - inicio, 1e-6)
+    repeticoes = max(repeticoes, min(_REPETICOES_MAX, int(_TEMPO_MEDICAO / duracao)))
+    tempos = medir(funcao, caso, repeticoes=repeticoes, aquecimento=max(0, aquecimento - 1))
+    saidas, pico = _pico_memoria(funcao, caso)
+    return {
+        "mediana": tempos["mediana"],
+        "minimo": tempos["minimo"],
+        "iqr": tempos["iqr"],
+        "repeticoes": repeticoes,
+        "pico_memoria": pico,
+        "saidas": [assinatura_saida(img) for img in saidas],
+        "imagens": list(saidas),
+    }
+
+
+def _minimos_processo(medicoes):
+    # Roda no processo novo: mede só o tempo mínimo de cada (chave, operação, caso, repetições)
+    return {
+        chave: medir(OPERACOES_REGRESSAO[operacao], caso, repeticoes=repeticoes, aquecimento=1)["minimo"]
+        for chave, operacao, caso, repeticoes in medicoes
+    }
+
+
+def minimos_em_processo_novo(medicoes):
+    """
+    Mede o tempo mínimo de operações da suíte em um processo Python novo.
+
+    O mínimo de uma operação rápida depende do processo (ver o comentário no início do
+    módulo), então medir de novo no mesmo processo tende a repetir o mesmo resultado.
+
+    Args:
+        medicoes (list[tuple]): Tuplas (chave, operação, caso, repetições).
+
+    Returns:
+        dict: O tempo mínimo (em segundos) de cada chave.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(_minimos_processo, medicoes).result()
+
+
+def caminho_baseline(diretorio=DIRETORIO_REGRESSAO):
+    """
+    Retorna o caminho da baseline de desempenho desta máquina.
+
+    Args:
+        diretorio (str, optional): O diretório da suíte. Padrão é "regressao".
+
+    Returns:
+        str: regressao/baseline_<nome da máquina>_<arquitetura>.json.
+    """
+    maquina = re.sub(r"[^A-Za-z0-9_.-]+", "-", f"{platform.node() or 'maquina'}_{platform.machine()}")
+    return os.path.join(diretorio, f"baseline_{maquina}.json")
+
+
+def _ler_json(caminho, padrao):
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return padrao
+
+
+def _gravar_json(caminho, dados):
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, indent=1, ensure_ascii=False, sort_keys=True)
+
+
+def executar_regressao(
+    tamanhos=TAMANHOS_REGRESSAO,
+    usar_src=True,
+    operacoes=None,
+    repeticoes=5,
+    aquecimento=1,
+    rodadas_baseline=RODADAS_BASELINE,
+    diretorio=DIRETORIO_REGRESSAO,
+    tolerancia_tempo=TOLERANCIA_TEMPO,
+    tolerancia_memoria=TOLERANCIA_MEMORIA,
+    tolerancia_saida=TOLERANCIA_SAIDA,
+    tolerancia_pixel=TOLERANCIA_PIXEL,
+    atualizar_baseline=False,
+    atualizar_golden=False,
+    verbose=True,
+):
+    """
+    Executa a suíte de regressão: mede cada operação em cada imagem e compara com as referências.
+
+    Com atualizar_baseline, os tempos e a memória medidos viram a nova baseline; o mesmo vale
+    para as saídas de referência (golden.json e, nas imagens pequenas, golden/*.npz) com
+    atualizar_golden. Sem as opções, as medições sem referência (um caso ou uma operação
+    acrescentados depois, ou a primeira execução nesta máquina) são acrescentadas às
+    referências existentes, sem alterar nem apagar as outras, e ficam protegidas a partir da
+    execução seguinte.
+
+    Args:
+        tamanhos (iterable[int], optional): Os lados das imagens sintéticas. Padrão é TAMANHOS_REGRESSAO.
+        usar_src (bool, optional): Se True (padrão), inclui as imagens de src/.
+        operacoes (iterable[str], optional): As operações medidas. Padrão é todas.
+        repeticoes (int, optional): O mínimo de execuções medidas por combinação (as rápidas
+                                    são repetidas mais vezes). Padrão é 5.
+        aquecimento (int, optional): Execuções descartadas por combinação. Padrão é 1.
+        rodadas_baseline (int, optional): Em quantos processos os tempos são medidos ao gravar
+                                          a baseline (guardando o maior dos mínimos). Padrão é 3.
+        diretorio (str, optional): O diretório das referências. Padrão é "regressao".
+        tolerancia_tempo (float, optional): Aumento relativo aceito no tempo mínimo. Padrão é 0.25.
+        tolerancia_memoria (float, optional): Aumento relativo aceito no pico de memória. Padrão é 0.10.
+        tolerancia_saida (float, optional): A diferença aceita entre as miniaturas (em níveis)
+                                            quando o checksum de uma saída muda. Padrão é 0.1.
+        tolerancia_pixel (float, optional): A diferença aceita em cada pixel (em níveis) nas
+                                            saídas guardadas inteiras. Padrão é 1.
+        atualizar_baseline (bool, optional): Se True, grava os tempos medidos como nova baseline.
+        atualizar_golden (bool, optional): Se True, grava as saídas medidas como novas referências.
+        verbose (bool, optional): Se True (padrão), imprime cada medição ao terminar.
+
+    Returns:
+        dict: "linhas" (uma por operação e imagem, com as medições, as referências e os
+              problemas encontrados), "regressoes" (lista de descrições), "baseline" e
+              "golden" (os caminhos dos arquivos), "baseline_gravada" e "golden_gravado"
+              (quantas entradas foram gravadas em cada um) e "maquina".
+
+    Raises:
+        ValueError: Se alguma operação for desconhecida.
+    """
+    operacoes = list(operacoes or OPERACOES_REGRESSAO)
+    desconhecidas = [op for op in operacoes if op not in OPERACOES_REGRESSAO]
+    if desconhecidas:
+        raise ValueError(f"Operações desconhecidas: {', '.join(desconhecidas)}. Opções: {', '.join(OPERACOES_REGRESSAO)}")
+
+    caminho_golden = os.path.join(diretorio, "golden.json")
+    caminho_base = caminho_baseline(diretorio)
+    golden = _ler_json(caminho_golden, {})
+    baseline = _ler_json(caminho_base, {}).get("medicoes", {})
+
+    linhas, regressoes = [], []
+    casos = preparar_casos(tamanhos, usar_src)
+    caso_por_nome = {caso["nome"]: caso for caso in casos}
+    for caso in casos:
+        for operacao in operacoes:
+            if operacao == "subtrair" and caso["fundo"] is None:
+                continue
+            chave = f"{operacao}|{caso['nome']}"
+            medicao = medir_operacao(operacao, caso, repeticoes, aquecimento)
+            imagens = medicao.pop("imagens")
+            linha = {"chave": chave, "operacao": operacao, "imagem": caso["nome"], **medicao, "problemas": []}
+
+            # Imagens pequenas: as saídas inteiras também são referência (ver comparar_pixels)
+            completo = None
+            if imagens and imagens[0].shape[0] * imagens[0].shape[1] <= _PIXELS_GOLDEN_COMPLETO:
+                completo = caminho_golden_completo(chave, diretorio)
+
+            # Saídas: checksum idêntico, deriva tolerada (miniatura e, nas imagens pequenas,
+            # cada pixel dentro da tolerância) ou regressão
+            referencia = golden.get(chave)
+            if referencia is None or atualizar_golden:
+                linha["estado_saida"] = "nova"
+            else:
+                estados = [comparar_assinaturas(a, r, tolerancia_saida) for a, r in zip(medicao["saidas"], referencia)]
+                if len(referencia) != len(medicao["saidas"]):
+                    estados.append(("regressao", f"{len(medicao['saidas'])} saídas (referência: {len(referencia)})"))
+                if completo is not None and os.path.exists(completo):
+                    with np.load(completo) as arquivo:
+                        referencias = [arquivo[f"saida_{i}"] for i in range(len(arquivo.files))]
+                    estados += [comparar_pixels(a, r, tolerancia_pixel) for a, r in zip(imagens, referencias)]
+                linha["estado_saida"] = max((e for e, _ in estados), key=("igual", "deriva", "regressao").index)
+                linha["problemas"] += [f"saída: {descricao}" for estado, descricao in estados if estado == "regressao"]
+            # As saídas inteiras são gravadas nas referências novas e, se ainda faltarem, quando
+            # a saída é idêntica à referência do golden.json (nunca a partir de uma deriva)
+            if completo is not None and (
+                linha["estado_saida"] == "nova" or (linha["estado_saida"] == "igual" and not os.path.exists(completo))
+            ):
+                _gravar_golden_completo(completo, imagens)
+            del imagens
+
+            # Desempenho: tempo mínimo e pico de memória contra a baseline desta máquina.
+            # A folga do tempo é o IQR da baseline (a variação típica da operação nesta
+            # máquina), com um piso de _FOLGA_TEMPO para as operações muito rápidas.
+            base = baseline.get(chave)
+            linha["baseline"] = None if atualizar_baseline else base
+            if base is not None and not atualizar_baseline:
+                limite_tempo = base["minimo"] * (1 + tolerancia_tempo) + max(_FOLGA_TEMPO, base["iqr"])
+                tentativas = 1
+                while linha["minimo"] > limite_tempo and tentativas < _TENTATIVAS_TEMPO:
+                    tentativas += 1
+                    nova = minimos_em_processo_novo([(chave, operacao, caso, linha["repeticoes"])])
+                    linha["minimo"] = min(linha["minimo"], nova[chave])
+                linha["tentativas"] = tentativas
+                if linha["minimo"] > limite_tempo:
+                    linha["problemas"].append(
+                        f"tempo: {linha['minimo'] * 1e3:.2f} ms em {tentativas} tentativas (baseline "
+                        f"{base['minimo'] * 1e3:.2f} ms, +{(linha['minimo'] / base['minimo'] - 1) * 100:.0f}%, "
+                        f"limite {limite_tempo * 1e3:.2f} ms)"
+                    )
+                limite_memoria = base["pico_memoria"] * (1 + tolerancia_memoria) + _FOLGA_MEMORIA
+                if medicao["pico_memoria"] > limite_memoria:
+                    linha["problemas"].append(
+                        f"memória: {medicao['pico_memoria'] / 2**20:.1f} MiB "
+                        f"(baseline {base['pico_memoria'] / 2**20:.1f} MiB)"
+                    )
+
+            regressoes += [f"{chave}: {problema}" for problema in linha["problemas"]]
+            linhas.append(linha)
+            if verbose:
+                imprimir_linha_regressao(linha)
+
+    novas_golden = [linha for linha in linhas if linha["estado_saida"] == "nova"]
+    if novas_golden:
+        golden.update({linha["chave"]: linha["saidas"] for linha in novas_golden})
+        _gravar_json(caminho_golden, golden)
+    novas_baseline = [linha for linha in linhas if linha["baseline"] is None]
+    if novas_baseline:
+        # O tempo da baseline é o maior dos mínimos medidos neste processo e em processos novos
+        medicoes = [
+            (linha["chave"], linha["operacao"], caso_por_nome[linha["imagem"]], linha["repeticoes"])
+            for linha in novas_baseline
+        ]
+        rodadas = [minimos_em_processo_novo(medicoes) for _ in range(max(0, rodadas_baseline - 1))]
+        for linha in novas_baseline:
+            minimos = [linha["minimo"]] + [rodada[linha["chave"]] for rodada in rodadas]
+            baseline[linha["chave"]] = {
+                **{campo: linha[campo] for campo in ("mediana", "iqr", "repeticoes", "pico_memoria")},
+                "minimo": max(minimos),
+                "minimos": minimos,
+            }
+        _gravar_json(caminho_base, {
+            "maquina": info_maquina(),
+            "repeticoes": repeticoes,
+            "aquecimento": aquecimento,
+            "rodadas": rodadas_baseline,
+            "medicoes": baseline,
+        })
+
+    return {
+        "linhas": linhas,
+        "regressoes": regressoes,
+        "baseline": caminho_base,
+        "golden": caminho_golden,
+        "baseline_gravada": len(novas_baseline),
+        "golden_gravado": len(novas_golden),
+        "maquina": info_maquina(),
+    }
+
+
+def imprimir_linha_regressao(linha):
+    """
+    Imprime uma medição da suíte de regressão, com a variação em relação à baseline.
+
+    Args:
+        linha (dict): Uma das linhas retornadas por executar_regressao.
+    """
+    base = linha["baseline"]
+    variacao = f" ({(linha['minimo'] / base['minimo'] - 1) * 100:+5.0f}%)" if base else " " * 9
+    marcador = "🚫" if linha["problemas"] else "  "
+    print(
+        f"{marcador}⤷ {linha['operacao']:<22} {linha['imagem']:<18} {linha['minimo'] * 1e3:9.2f} ms{variacao} "
+        f"{linha['pico_memoria'] / 2**20:8.1f} MiB  saída: {linha['estado_saida']}"
+    )
+    for problema in linha["problemas"]:
+        print(f"     {problema}")
+
+
+def verificar_regressao(relatorio):
+    """
+    Falha (com uma exceção) se o relatório de executar_regressao tiver alguma regressão.
+
+    Args:
+        relatorio (dict): O relatório de executar_regressao.
+
+    Raises:
+        RegressaoDetectada: Com a lista de regressões encontradas.
+    """
+    if relatorio["regressoes"]:
+        detalhes = "\n".join(f"  - {r}" for r in relatorio["regressoes"])
+        raise RegressaoDetectada(f"{len(relatorio['regressoes'])} regressões encontradas:\n{detalhes}")
@@ -0,0 +1,200 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from components.perfil import perfilar
+
+# Formatos de saída suportados e a extensão de arquivo de cada um
+FORMATOS_SAIDA = {"jpg": ".jpg", "png": ".png", "npy": ".npy"}
+
+
+class SaidaImagem:
+    """
+    Destino de gravação de imagens, com codificação configurável e escrita em segundo plano.
+
+    Cada chamada a salvar() coloca a imagem em uma fila e retorna logo; a codificação
+    (JPEG/PNG) e a escrita em disco rodam em um pool de threads (o cv2.imencode libera o GIL).
+    A fila é limitada: se houver fila_max gravações pendentes, salvar() bloqueia até que
+    uma termine, para que um produtor rápido não acumule imagens na memória.
+
+    Uso típico:
+        with SaidaImagem(formato="png", nivel_png=1) as saida:
+            for caminho in entradas:
+                _03_2_filtro_passa_alta(caminho, output_path=..., saida=saida)
+        # Ao sair do bloco, todas as gravações terminaram (e erros são lançados)
+
+    Args:
+        formato (str, optional): "jpg", "png" ou "npy" (sem perdas, para resultados
+                                 intermediários). Se None (padrão), o formato vem da extensão
+                                 de cada caminho; caso contrário, a extensão é trocada.
+        qualidade_jpeg (int, optional): Qualidade JPEG de 0 a 100. Se None (padrão), usa a
+                                        do OpenCV (95).
+        nivel_png (int, optional): Nível de compressão PNG de 0 (mais rápido) a 9 (menor
+                                   arquivo). Se None (padrão), usa o do OpenCV.
+        trabalhadores (int, optional): Threads de gravação. Com 0, salvar() grava na própria
+                                       thread de quem chama, de forma síncrona. Padrão é 2.
+        fila_max (int, optional): O número máximo de gravações pendentes. Padrão é 8.
+        copiar (bool, optional): Se True (padrão), salvar() grava uma cópia da imagem, e o
+                                 chamador pode modificá-la em seguida. Use False só se a
+                                 imagem não for mais alterada.
+
+    Raises:
+        ValueError: Se o formato for desconhecido.
+    """
+
+    def __init__(self, formato=None, qualidade_jpeg=None, nivel_png=None, trabalhadores=2, fila_max=8, copiar=True):
+        if formato is not None and formato not in FORMATOS_SAIDA:
+            raise ValueError(f"Formato desconhecido: {formato}. Opções: {', '.join(FORMATOS_SAIDA)}")
+        self.formato = formato
+        self.qualidade_jpeg = qualidade_jpeg
+        self.nivel_png = nivel_png
+        self.copiar = copiar
+        self._executor = ThreadPoolExecutor(trabalhadores, thread_name_prefix="saida") if trabalhadores else None
+        self._vagas = threading.BoundedSemaphore(max(fila_max, 1))
+        self._lock = threading.Lock()
+        self._pendentes = set()
+        self._erros = []
+
+    def caminho(self, caminho):
+        """
+        Retorna o caminho com a extensão do formato configurado (ou o próprio caminho, se formato=None).
+
+        Args:
+            caminho (str): O caminho de saída pedido.
+
+        Returns:
+            str: O caminho onde a imagem será de fato gravada.
+        """
+        if self.formato is None:
+            return caminho
+        return os.path.splitext(caminho)[0] + FORMATOS_SAIDA[self.formato]
+
+    def _parametros(self, extensao):
+        # Parâmetros de codificação do OpenCV para a extensão (vazio mantém os padrões)
+        if extensao in (".jpg", ".jpeg") and self.qualidade_jpeg is not None:
+            return [cv2.IMWRITE_JPEG_QUALITY, int(self.qualidade_jpeg)]
+        if extensao == ".png" and self.nivel_png is not None:
+            return [cv2.IMWRITE_PNG_COMPRESSION, int(self.nivel_png)]
+        return []
+
+    @perfilar("saida.gravar")
+    def _gravar(self, img, caminho):
+        # Codifica e grava uma imagem. O diretório de destino é criado se não existir.
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        extensao = os.path.splitext(caminho)[1].lower()
+        if extensao == ".npy":
+            np.save(caminho, img)
+            return
+        # imencode + escrita do buffer, em vez de imwrite, para que o erro de codificação
+        # e o de escrita em disco sejam distinguíveis
+        ok, buffer = cv2.imencode(extensao, img, self._parametros(extensao))
+        if not ok:
+            raise ValueError(f"  ⤷ Não foi possível codificar a imagem como {extensao}: {caminho}")
+        with open(caminho, "wb") as arquivo:
+            arquivo.write(buffer)
+
+    def _concluir(self, futuro):
+        # Callback de cada gravação: libera uma vaga na fila e guarda o erro, se houver
+        with self._lock:
+            self._pendentes.discard(futuro)
+            if futuro.exception() is not None:
+                self._erros.append(futuro.exception())
+        self._vagas.release()
+
+    def salvar(self, img, caminho):
+        """
+        Agenda a gravação de uma imagem. Bloqueia apenas se a fila estiver cheia.
+
+        Args:
+            img (numpy.ndarray): A imagem a ser gravada.
+            caminho (str): O caminho de saída (a extensão é trocada se houver formato configurado).
+
+        Returns:
+            str: O caminho onde a imagem será gravada.
+
+        Raises:
+            ValueError, OSError: Na gravação síncrona (trabalhadores=0), se a imagem não puder
+                                 ser codificada ou gravada.
+        """
+        caminho = self.caminho(caminho)
+        if self._executor is None:
+            self._gravar(img, caminho)
+            return caminho
+
+        if self.copiar:
+            img = img.copy()
+        self._vagas.acquire()  # Back-pressure: espera uma vaga na fila
+        try:
+            futuro = self._executor.submit(self._gravar, img, caminho)
+        except BaseException:
+            self._vagas.release()
+            raise
+        with self._lock:
+            self._pendentes.add(futuro)
+        futuro.add_done_callback(self._concluir)
+        return caminho
+
+    def coletar_erros(self):
+        """
+        Retorna e esquece os erros das gravações já concluídas, sem esperar as pendentes.
+
+        Returns:
+            list[Exception]: Os erros, na ordem em que as gravações terminaram.
+        """
+        with self._lock:
+            erros, self._erros = self._erros, []
+        return erros
+
+    def concluir(self):
+        """
+        Espera todas as gravações pendentes terminarem, sem lançar os erros.
+
+        Returns:
+            list[Exception]: Os erros de gravação ocorridos desde a última coleta.
+        """
+        while True:
+            with self._lock:
+                pendentes = list(self._pendentes)
+            if not pendentes:
+                break
+            for futuro in pendentes:
+                futuro.exception()  # Bloqueia até o fim da gravação, sem lançar o erro aqui
+        return self.coletar_erros()
+
+    def aguardar(self):
+        """
+        Espera todas as gravações pendentes terminarem.
+
+        Raises:
+            Exception: O primeiro erro de gravação ocorrido desde a última coleta.
+        """
+        erros = self.concluir()
+        if erros:
+            raise erros[0]
+
+    def fechar(self):
+        """
+        Espera as gravações pendentes e encerra o pool de threads.
+
+        Raises:
+            Exception: O primeiro erro de gravação ocorrido desde a última coleta.
+        """
+        try:
+            self.aguardar()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        self.fechar()
+        return False
+
+
+# Destino padrão das operações: grava na hora, com as configurações padrão do OpenCV
+SAIDA_SINCRONA = SaidaImagem(trabalhadores=0)
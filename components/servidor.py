@@ -0,0 +1,443 @@
+import json
+import math
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from components.cliente import ENDERECO_PADRAO, ClienteServidor, analisar_endereco
+from components.comparacao import comparar_arrays
+from components.fft import backend_fft
+from components.filtros import _03_1_filtro_high_boost, _03_2_filtro_passa_alta
+from components.perfil import secao
+from components.processamento import (
+    _01_clusterizacao_tons_cinza,
+    convolve,
+    desenhar_caixas,
+    detectar_caixas,
+    estatisticas_cache_espectros,
+    localizar_objetos,
+    ultima_escolha_convolucao,
+)
+from components.saida import SAIDA_SINCRONA
+from components.utils import carregar_imagem, estatisticas_cache_imagens
+
+# Servidor de processamento: um processo de longa duração que importa os módulos uma vez e
+# mantém aquecidos os caches de imagens decodificadas (components.utils), de espectros de
+# kernel e de buffers, atendendo pedidos por um socket local (protocolo em components/cliente.py).
+# Cada conexão é atendida por uma thread, e os pedidos rodam em um pool interno de trabalhadores,
+# que limita quantas operações processam imagens ao mesmo tempo.
+
+
+def _descrever(img, saida):
+    # Resultado de uma operação que produz uma imagem: a forma, o tipo e onde foi gravada
+    return {"forma": list(img.shape), "dtype": str(img.dtype), "saida": saida}
+
+
+def _entrada(entradas, indice, nome):
+    # A entrada de índice `indice` do pedido, com uma mensagem clara se faltar
+    if len(entradas) <= indice:
+        raise ValueError(f"A operação precisa da entrada {indice + 1} ({nome}).")
+    return entradas[indice]
+
+
+def _op_clusterizar(entradas, parametros, saida):
+    img = _01_clusterizacao_tons_cinza(
+        _entrada(entradas, 0, "imagem"),
+        parametros.get("qtd_grupo", 4),
+        output_path=saida,
+        metodo=parametros.get("metodo", "uniforme"),
+    )
+    return _descrever(img, saida)
+
+
+def _op_subtrair(entradas, parametros, saida):
+    # Como _02_subtrai_e_delineia, mas retornando também as caixas encontradas
+    limiar = parametros.get("limiar", 50)
+    fundo = carregar_imagem(_entrada(entradas, 0, "fundo"), cv2.IMREAD_GRAYSCALE)
+    img = carregar_imagem(_entrada(entradas, 1, "primeiro plano"), cv2.IMREAD_COLOR)
+    subtracao = cv2.absdiff(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), fundo)
+    if parametros.get("modo", "contornos") == "componentes":
+        caixas = localizar_objetos(subtracao, limiar)
+    else:
+        _, binaria = cv2.threshold(subtracao, limiar, 255, cv2.THRESH_BINARY)
+        caixas = detectar_caixas(binaria)
+    if saida is not None:
+        saida = SAIDA_SINCRONA.salvar(desenhar_caixas(img, caixas), saida)
+    return {"caixas": [[int(v) for v in caixa] for caixa in caixas], "saida": saida}
+
+
+def _op_high_boost(entradas, parametros, saida):
+    img = _03_1_filtro_high_boost(
+        _entrada(entradas, 0, "imagem"),
+        parametros.get("A", 1.5),
+        output_path=saida,
+        metodo=parametros.get("metodo", "separavel"),
+        cor=parametros.get("cor", False),
+    )
+    return _descrever(img, saida)
+
+
+def _op_passa_alta(entradas, parametros, saida):
+    img = _03_2_filtro_passa_alta(_entrada(entradas, 0, "imagem"), output_path=saida)
+    return _descrever(img, saida)
+
+
+def _op_convolucao(entradas, parametros, saida):
+    # Kernel explícito ({"kernel": [[...]]}) ou de média ({"media": 15})
+    if "kernel" in parametros:
+        kernel = np.asarray(parametros["kernel"], dtype=np.float32)
+    else:
+        lado = int(parametros.get("media", 3))
+        kernel = np.ones((lado, lado), np.float32) / (lado * lado)
+    modo = cv2.IMREAD_GRAYSCALE if parametros.get("cinza", False) else cv2.IMREAD_COLOR
+    img = convolve(carregar_imagem(_entrada(entradas, 0, "imagem"), modo), kernel, parametros.get("metodo", "auto"))
+    if saida is not None:
+        saida = SAIDA_SINCRONA.salvar(img, saida)
+    return {**_descrever(img, saida), "metodo": ultima_escolha_convolucao()["metodo"]}
+
+
+def _op_comparar(entradas, parametros, saida):
+    a = carregar_imagem(_entrada(entradas, 0, "primeira imagem"), cv2.IMREAD_COLOR)
+    b = carregar_imagem(_entrada(entradas, 1, "segunda imagem"), cv2.IMREAD_COLOR)
+    resultado = comparar_arrays(
+        a,
+        b,
+        parar_na_primeira=parametros.get("parar_na_primeira", False),
+        calcular_ssim=parametros.get("calcular_ssim", False),
+    )
+    # O PSNR de imagens iguais é infinito, que não existe em JSON (json.dumps escreveria "Infinity")
+    if math.isinf(resultado["psnr"]):
+        resultado["psnr"] = None
+    return resultado
+
+
+# Operações aceitas pelo servidor, com os mesmos nomes dos subcomandos do main.py.
+# Cada uma recebe (entradas, parametros, saida) e retorna um dict serializável em JSON.
+OPERACOES_SERVIDOR = {
+    "clusterizar": _op_clusterizar,
+    "subtrair": _op_subtrair,
+    "high-boost": _op_high_boost,
+    "passa-alta": _op_passa_alta,
+    "convolucao": _op_convolucao,
+    "comparar": _op_comparar,
+}
+
+
+class _Atendimento(socketserver.StreamRequestHandler):
+    # Atende uma conexão: lê um pedido JSON por linha e responde na mesma ordem
+    def handle(self):
+        for linha in self.rfile:
+            if not linha.strip():
+                continue
+            try:
+                pedido = json.loads(linha)
+            except ValueError as exc:
+                pedido = None
+                resposta = {"ok": False, "erro": f"Pedido inválido: {exc}"}
+            else:
+                # atender() também recusa pedidos que não são objetos JSON (ex: [1] ou "x")
+                resposta = self.server.processador.atender(pedido)
+            self.wfile.write(json.dumps(resposta).encode("utf-8") + b"\n")
+            self.wfile.flush()
+            if resposta["ok"] and isinstance(pedido, dict) and pedido.get("operacao") == "encerrar":
+                # Só depois de responder, para que o cliente receba a confirmação
+                self.server.processador.encerrar()
+                return
+
+
+class _ServidorUnix(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _ServidorTcp(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ServidorProcessamento:
+    """
+    Servidor de processamento de imagens de longa duração, acessado por um socket local.
+
+    Os módulos são importados e os caches aquecidos uma única vez; cada pedido paga só o
+    processamento em si. Pedidos de várias conexões rodam em paralelo em um pool de threads
+    (o OpenCV e as FFTs liberam o GIL), limitado a `trabalhadores` operações simultâneas.
+
+    Além das operações de OPERACOES_SERVIDOR, o servidor responde a "estado" (estatísticas
+    dos caches e dos pedidos) e "encerrar" (termina o servidor depois de responder).
+
+    Uso típico:
+        with ServidorProcessamento(precarregar=["src/01.jpeg"]) as servidor:
+            servidor.servir()  # Bloqueia até receber "encerrar" (ou Ctrl+C)
+
+    Args:
+        endereco (str, optional): O caminho do socket Unix ou "host:porta" (só localhost é
+                                  recomendado: o protocolo não tem autenticação). Padrão é
+                                  ENDERECO_PADRAO.
+        trabalhadores (int, optional): Operações simultâneas. Padrão é o número de CPUs.
+        precarregar (list[str], optional): Imagens decodificadas (em cores e em tons de cinza)
+                                           no início, para que já estejam no cache.
+
+    Raises:
+        OSError: Se já houver um servidor ativo no endereço.
+    """
+
+    def __init__(self, endereco=None, trabalhadores=None, precarregar=()):
+        self.endereco = endereco or ENDERECO_PADRAO
+        self.trabalhadores = trabalhadores or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(self.trabalhadores, thread_name_prefix="servidor")
+        self._lock = threading.Lock()
+        self._pedidos = {"atendidos": 0, "erros": 0}
+        self._inicio = time.time()
+        self._servidor = self._abrir_socket()
+        self._servidor.processador = self
+        self.aquecer(precarregar)
+
+    def _abrir_socket(self):
+        familia, endereco = analisar_endereco(self.endereco)
+        if familia == socket.AF_INET:
+            return _ServidorTcp(endereco, _Atendimento)
+        if os.path.exists(endereco):
+            # Um socket que ainda aceita conexões é de um servidor ativo; senão, é resto de
+            # um servidor que terminou sem apagá-lo
+            teste = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                teste.connect(endereco)
+            except OSError:
+                os.unlink(endereco)
+            else:
+                raise OSError(f"  ⤷ Já existe um servidor ativo em {endereco}")
+            finally:
+                teste.close()
+        return _ServidorUnix(endereco, _Atendimento)
+
+    def aquecer(self, precarregar=()):
+        """
+        Prepara o processo para os pedidos: escolhe o backend de FFT, executa cada motor de
+        convolução uma vez (criando os planos de FFT e os buffers) e decodifica as imagens pedidas.
+
+        Args:
+            precarregar (list[str], optional): Imagens colocadas no cache de imagens decodificadas.
+        """
+        backend_fft()
+        amostra = np.zeros((64, 64), np.uint8)
+        for metodo in ("espacial", "fft"):
+            convolve(amostra, np.ones((5, 5), np.float32) / 25, metodo)
+        for caminho in precarregar:
+            carregar_imagem(caminho, cv2.IMREAD_COLOR)
+            carregar_imagem(caminho, cv2.IMREAD_GRAYSCALE)
+
+    def estado(self):
+        """
+        Retorna as estatísticas do servidor.
+
+        Returns:
+            dict: "pid", "endereco", "trabalhadores", "uptime_s", "pedidos" (atendidos e erros),
+                  "backend_fft", "cache_imagens" e "cache_espectros".
+        """
+        with self._lock:
+            pedidos = dict(self._pedidos)
+        return {
+            "pid": os.getpid(),
+            "endereco": self.endereco,
+            "trabalhadores": self.trabalhadores,
+            "uptime_s": time.time() - self._inicio,
+            "pedidos": pedidos,
+            "backend_fft": backend_fft().nome,
+            "cache_imagens": estatisticas_cache_imagens(),
+            "cache_espectros": estatisticas_cache_espectros(),
+        }
+
+    def _executar(self, operacao, entradas, parametros, saida):
+        with secao(f"servidor.{operacao}"):
+            return OPERACOES_SERVIDOR[operacao](entradas, parametros, saida)
+
+    def atender(self, pedido):
+        """
+        Executa um pedido no pool de trabalhadores e monta a resposta.
+
+        Args:
+            pedido (dict): O pedido, com "operacao" e, conforme a operação, "entradas",
+                           "parametros" e "saida".
+
+        Returns:
+            dict: {"ok": True, "resultado": ..., "tempo_ms": ...} ou {"ok": False, "erro": ...}.
+        """
+        inicio = time.perf_counter()
+        if not isinstance(pedido, dict):
+            with self._lock:
+                self._pedidos["erros"] += 1
+            return {"ok": False, "erro": f"Pedido inválido: esperado um objeto JSON, recebido {type(pedido).__name__}"}
+        operacao = pedido.get("operacao")
+        try:
+            if operacao == "estado":
+                resultado = self.estado()
+            elif operacao == "encerrar":
+                # O encerramento em si é pedido pela conexão depois de enviar a resposta
+                resultado = {"encerrando": True}
+            elif operacao in OPERACOES_SERVIDOR:
+                resultado = self._executor.submit(
+                    self._executar,
+                    operacao,
+                    list(pedido.get("entradas", [])),
+                    dict(pedido.get("parametros", {})),
+                    pedido.get("saida"),
+                ).result()
+            else:
+                opcoes = ", ".join([*OPERACOES_SERVIDOR, "estado", "encerrar"])
+                raise ValueError(f"Operação desconhecida: {operacao}. Opções: {opcoes}")
+        except Exception as exc:  # Um pedido com problema não derruba o servidor
+            with self._lock:
+                self._pedidos["erros"] += 1
+            return {"ok": False, "erro": f"{type(exc).__name__}: {exc}"}
+
+        with self._lock:
+            self._pedidos["atendidos"] += 1
+        return {"ok": True, "resultado": resultado, "tempo_ms": (time.perf_counter() - inicio) * 1000}
+
+    def encerrar(self):
+        """Pede o fim do laço de servir() (pode ser chamado de qualquer thread, inclusive de um pedido)."""
+        # shutdown() espera o laço de serve_forever terminar: não pode rodar na thread de um pedido
+        threading.Thread(target=self._servidor.shutdown, daemon=True).start()
+
+    def servir(self):
+        """Atende pedidos até receber "encerrar" (ou uma interrupção) e então fecha o servidor."""
+        try:
+            self._servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.fechar()
+
+    def fechar(self):
+        """Fecha o socket (apagando o arquivo do socket Unix) e encerra o pool de trabalhadores."""
+        self._servidor.server_close()
+        familia, endereco = analisar_endereco(self.endereco)
+        if familia != socket.AF_INET and os.path.exists(endereco):
+            os.unlink(endereco)
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        self.fechar()
+        return False
+
+
+def _percentis(tempos):
+    # Mediana e p95 de uma lista de tempos, em milissegundos
+    tempos = np.asarray(tempos) * 1000
+    return {"p50_ms": float(np.percentile(tempos, 50)), "p95_ms": float(np.percentile(tempos, 95))}
+
+
+def _aguardar_servidor(endereco, processo, timeout=60.0):
+    # Espera o servidor recém-iniciado aceitar conexões
+    limite = time.perf_counter() + timeout
+    while time.perf_counter() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"O servidor terminou ao iniciar (código {processo.returncode}).")
+        try:
+            with ClienteServidor(endereco) as cliente:
+                cliente.enviar({"operacao": "estado"})
+            return
+        except ConnectionError:
+            time.sleep(0.05)
+    raise RuntimeError(f"O servidor não respondeu em {timeout:.0f} segundos.")
+
+
+def benchmark_servidor(operacao="high-boost", entrada="src/01.jpeg", repeticoes=5, endereco=None, verbose=True):
+    """
+    Compara a latência de uma operação em chamadas frias do CLI e em pedidos ao servidor aquecido.
+
+    São medidos (tempo de parede, sem gravar a saída):
+        - "cli_frio": um processo `python main.py <operacao> <entrada> --sem-gravar` por chamada
+          (inicialização do Python, importações, decodificação e processamento);
+        - "cliente_frio": um processo `python cliente.py` por chamada, contra o servidor;
+        - "servidor": pedidos por uma conexão mantida aberta ao servidor aquecido;
+        - "primeiro_pedido": o primeiro pedido ao servidor, com a imagem ainda fora do cache.
+
+    Args:
+        operacao (str, optional): "clusterizar", "high-boost" ou "passa-alta". Padrão é "high-boost".
+        entrada (str, optional): A imagem de entrada. Padrão é "src/01.jpeg".
+        repeticoes (int, optional): Chamadas medidas de cada tipo. Padrão é 5.
+        endereco (str, optional): O endereço do servidor temporário iniciado para o teste.
+                                  Padrão é ENDERECO_PADRAO com o sufixo "-bench".
+        verbose (bool, optional): Se True (padrão), imprime o resumo.
+
+    Returns:
+        dict: As latências p50/p95 de cada tipo de chamada e o ganho do servidor sobre o CLI frio.
+    """
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    main_py, cliente_py = os.path.join(raiz, "main.py"), os.path.join(raiz, "cliente.py")
+    endereco = endereco or f"{ENDERECO_PADRAO}-bench"
+
+    frio = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run(
+            [sys.executable, main_py, operacao, entrada, "--sem-gravar", "--processos", "1"],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        frio.append(time.perf_counter() - inicio)
+
+    servidor = subprocess.Popen(
+        [sys.executable, main_py, "servidor", "--endereco", endereco], stdout=subprocess.DEVNULL
+    )
+    try:
+        _aguardar_servidor(endereco, servidor)
+        quente = []
+        with ClienteServidor(endereco) as cliente:
+            inicio = time.perf_counter()
+            cliente.executar(operacao, [entrada])
+            primeiro = time.perf_counter() - inicio
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                cliente.executar(operacao, [entrada])
+                quente.append(time.perf_counter() - inicio)
+
+        cliente_frio = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            subprocess.run(
+                [sys.executable, cliente_py, operacao, entrada, "--endereco", endereco],
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+            cliente_frio.append(time.perf_counter() - inicio)
+
+        with ClienteServidor(endereco) as cliente:
+            cliente.enviar({"operacao": "encerrar"})
+        servidor.wait(timeout=30)
+    finally:
+        if servidor.poll() is None:
+            servidor.kill()
+
+    resultado = {
+        "operacao": operacao,
+        "entrada": entrada,
+        "repeticoes": repeticoes,
+        "cli_frio": _percentis(frio),
+        "cliente_frio": _percentis(cliente_frio),
+        "servidor": _percentis(quente),
+        "primeiro_pedido_ms": primeiro * 1000,
+    }
+    resultado["ganho"] = resultado["cli_frio"]["p50_ms"] / resultado["servidor"]["p50_ms"]
+    if verbose:
+        print(f"  ⤷ CLI frio (main.py):        p50 {resultado['cli_frio']['p50_ms']:8.1f} ms, "
+              f"p95 {resultado['cli_frio']['p95_ms']:8.1f} ms")
+        print(f"  ⤷ Cliente leve (cliente.py): p50 {resultado['cliente_frio']['p50_ms']:8.1f} ms, "
+              f"p95 {resultado['cliente_frio']['p95_ms']:8.1f} ms")
+        print(f"  ⤷ Servidor aquecido:         p50 {resultado['servidor']['p50_ms']:8.1f} ms, "
+              f"p95 {resultado['servidor']['p95_ms']:8.1f} ms")
+        print(f"  ⤷ Primeiro pedido (cache frio): {resultado['primeiro_pedido_ms']:.1f} ms")
+        print(f"  ⤷ Ganho do servidor sobre o CLI frio: {resultado['ganho']:.1f}x")
+    return resultado
@@ -1,9 +1,161 @@
 import os
-from PIL import Image
+import threading
+from collections import OrderedDict
 
-def mostrar_imagem(path):
-    img = Image.open(path)
-    img.show()
+import cv2
+
+from components.perfil import perfilar, secao
+
+# Cache LRU das imagens decodificadas, compartilhado por todas as operações.
+# A chave inclui o caminho absoluto, a data de modificação (mtime) e o modo de leitura,
+# então um arquivo alterado em disco é decodificado de novo, e a mesma imagem lida em
+# cores e em tons de cinza ocupa duas entradas independentes.
+_cache_imagens = OrderedDict()
+_cache_imagens_lock = threading.Lock()
+_cache_imagens_info = {"max_bytes": 512 * 1024 * 1024, "bytes": 0, "hits": 0, "misses": 0}
+
+# Modos de leitura reduzidos do OpenCV (o decodificador JPEG já entrega a imagem menor)
+_MODOS_REDUZIDOS = {
+    (False, 2): cv2.IMREAD_REDUCED_COLOR_2,
+    (False, 4): cv2.IMREAD_REDUCED_COLOR_4,
+    (False, 8): cv2.IMREAD_REDUCED_COLOR_8,
+    (True, 2): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (True, 4): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (True, 8): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+def modo_leitura(cinza=False, reducao=1):
+    """
+    Retorna a flag do cv2.imread para ler uma imagem em cores ou em tons de cinza,
+    opcionalmente já reduzida na decodificação (útil para pré-visualizações).
+
+    Args:
+        cinza (bool, optional): Se True, decodifica direto em tons de cinza. Padrão é False.
+        reducao (int, optional): Fator de redução (1, 2, 4 ou 8). Padrão é 1 (tamanho original).
+
+    Returns:
+        int: A flag de leitura do OpenCV.
+
+    Raises:
+        ValueError: Se o fator de redução não for 1, 2, 4 ou 8.
+    """
+    if reducao == 1:
+        return cv2.IMREAD_GRAYSCALE if cinza else cv2.IMREAD_COLOR
+    if (cinza, reducao) not in _MODOS_REDUZIDOS:
+        raise ValueError(f"Fator de redução inválido: {reducao}. Use 1, 2, 4 ou 8.")
+    return _MODOS_REDUZIDOS[(cinza, reducao)]
+
+
+@perfilar()
+def carregar_imagem(path, modo=cv2.IMREAD_COLOR):
+    """
+    Carrega uma imagem do disco usando um cache LRU de imagens decodificadas.
+
+    Várias operações leem o mesmo arquivo (ex: comparar os filtros 3.1 e 3.2 na mesma
+    imagem); com o cache, o arquivo é decodificado uma única vez por modo de leitura.
+    Quando a operação só precisa da luminância, use cv2.IMREAD_GRAYSCALE: o decodificador
+    entrega o canal de cinza diretamente, sem decodificar as cores e chamar cvtColor.
+
+    Args:
+        path (str): O caminho da imagem.
+        modo (int, optional): A flag de leitura do cv2.imread (ver modo_leitura).
+                              Padrão é cv2.IMREAD_COLOR.
+
+    Returns:
+        numpy.ndarray: A imagem decodificada. O array é somente leitura, pois é
+                       compartilhado pelo cache; use .copy() antes de modificá-lo.
+
+    Raises:
+        FileNotFoundError: Se a imagem não existir ou não puder ser decodificada.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        raise FileNotFoundError(f"  ⤷ Não foi possível carregar a imagem em: {path}") from None
+    chave = (os.path.abspath(path), mtime, modo)
+
+    with _cache_imagens_lock:
+        img = _cache_imagens.get(chave)
+        if img is not None:
+            _cache_imagens.move_to_end(chave)
+            _cache_imagens_info["hits"] += 1
+            return img
+        _cache_imagens_info["misses"] += 1
+
+    # A decodificação fica fora do lock para não serializar leituras de arquivos diferentes
+    with secao("utils.decodificar") as medicao:
+        img = cv2.imread(path, modo)
+        medicao.registrar(img)
+    if img is None:
+        raise FileNotFoundError(f"  ⤷ Não foi possível carregar a imagem em: {path}")
+    img.flags.writeable = False
+
+    with _cache_imagens_lock:
+        if chave not in _cache_imagens and img.nbytes <= _cache_imagens_info["max_bytes"]:
+            _cache_imagens[chave] = img
+            _cache_imagens_info["bytes"] += img.nbytes
+            while _cache_imagens_info["bytes"] > _cache_imagens_info["max_bytes"]:
+                _, antiga = _cache_imagens.popitem(last=False)
+                _cache_imagens_info["bytes"] -= antiga.nbytes
+    return img
+
+
+def configurar_cache_imagens(max_bytes):
+    """
+    Define o limite de memória do cache de imagens decodificadas.
+
+    Args:
+        max_bytes (int): O total máximo de bytes ocupados pelas imagens em cache.
+                         Use 0 para desativar o cache.
+    """
+    with _cache_imagens_lock:
+        _cache_imagens_info["max_bytes"] = max(0, int(max_bytes))
+        while _cache_imagens and _cache_imagens_info["bytes"] > _cache_imagens_info["max_bytes"]:
+            _, antiga = _cache_imagens.popitem(last=False)
+            _cache_imagens_info["bytes"] -= antiga.nbytes
+
+
+def limpar_cache_imagens():
+    """
+    Remove todas as imagens do cache e zera as estatísticas.
+    """
+    with _cache_imagens_lock:
+        _cache_imagens.clear()
+        _cache_imagens_info.update(bytes=0, hits=0, misses=0)
+
+
+def estatisticas_cache_imagens():
+    """
+    Retorna as estatísticas de uso do cache de imagens decodificadas.
+
+    Returns:
+        dict: Quantidade de entradas, bytes ocupados, limite, acertos (hits), falhas (misses)
+              e a taxa de acerto.
+    """
+    with _cache_imagens_lock:
+        total = _cache_imagens_info["hits"] + _cache_imagens_info["misses"]
+        taxa = _cache_imagens_info["hits"] / total if total else 0.0
+        return {"entradas": len(_cache_imagens), **_cache_imagens_info, "taxa_acerto": taxa}
+
+
+def mostrar_imagem(img):
+    """
+    Abre uma imagem no visualizador padrão do sistema.
+
+    Args:
+        img (str or numpy.ndarray): O caminho da imagem, ou uma imagem do OpenCV (BGR ou tons
+                                    de cinza) já na memória, como a de uma pré-visualização.
+    """
+    # O PIL só é importado aqui: o modo em lote e o servidor não exibem imagens
+    from PIL import Image
+
+    if isinstance(img, str):
+        Image.open(img).show()
+        return
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    Image.fromarray(img).show()
 
 
 def clear_t():
@@ -0,0 +1,235 @@
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from components.buffers import rascunho
+from components.lote import expandir_entradas
+from components.processamento import MODOS_DETECCAO, desenhar_caixas, detectar_caixas, localizar_objetos
+
+# Marcador de fim de fluxo colocado na fila pela thread de leitura
+_FIM = object()
+
+
+def _abrir_fonte(fonte):
+    # Retorna uma função que lê o próximo quadro (ou None no fim) e outra que libera a fonte.
+    # A fonte pode ser o índice de uma câmera, um arquivo de vídeo, um diretório ou um padrão glob.
+    if isinstance(fonte, int) or (isinstance(fonte, str) and os.path.isfile(fonte)):
+        captura = cv2.VideoCapture(fonte)
+        if not captura.isOpened():
+            raise FileNotFoundError(f"  ⤷ Não foi possível abrir o vídeo em: {fonte}")
+
+        def ler():
+            ok, quadro = captura.read()
+            return quadro if ok else None
+
+        return ler, captura.release
+
+    if not os.path.isdir(fonte) and not any(c in fonte for c in "*?["):
+        raise FileNotFoundError(f"  ⤷ Não foi possível abrir o vídeo em: {fonte}")
+    arquivos = iter(expandir_entradas([fonte]))
+
+    def ler():
+        for caminho in arquivos:
+            quadro = cv2.imread(caminho)
+            if quadro is not None:
+                return quadro
+        return None
+
+    return ler, lambda: None
+
+
+def ler_quadros(fonte, fila_max=8):
+    """
+    Lê os quadros de um vídeo ou de uma sequência de imagens como um gerador.
+
+    A decodificação roda em uma thread separada, que fica no máximo fila_max quadros
+    à frente do consumidor: a leitura se sobrepõe ao processamento sem que o vídeo
+    inteiro seja carregado na memória.
+
+    Args:
+        fonte (str or int): Arquivo de vídeo, índice de câmera, diretório de imagens ou
+                            padrão glob (ex: "quadros/*.png"). Sequências são lidas em
+                            ordem alfabética.
+        fila_max (int, optional): O número máximo de quadros lidos antecipadamente. Padrão é 8.
+
+    Yields:
+        numpy.ndarray: Os quadros (BGR), em ordem.
+
+    Raises:
+        FileNotFoundError: Se a fonte não puder ser aberta.
+    """
+    ler, liberar = _abrir_fonte(fonte)
+    fila = queue.Queue(maxsize=fila_max)
+    parar = threading.Event()
+
+    def colocar(item):
+        # put com timeout para perceber o pedido de parada mesmo com a fila cheia
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def produtor():
+        try:
+            while not parar.is_set():
+                quadro = ler()
+                colocar(_FIM if quadro is None else quadro)
+                if quadro is None:
+                    return
+        except Exception as exc:  # O erro é repassado ao consumidor em vez de sumir na thread
+            colocar(exc)
+        finally:
+            liberar()
+
+    leitor = threading.Thread(target=produtor, name="leitor-quadros", daemon=True)
+    leitor.start()
+    try:
+        while True:
+            item = fila.get()
+            if item is _FIM:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Se o consumidor parar antes do fim (break, exceção), a thread de leitura é encerrada
+        parar.set()
+        leitor.join(timeout=1)
+
+
+def subtrair_fundo_stream(
+    fonte, limiar=30, alfa=0.05, fila_max=8, anotar=True, atualizar_so_fundo=False, modo="contornos"
+):
+    """
+    Detecta objetos em movimento em um fluxo de quadros por subtração de fundo.
+
+    Estende a _02_subtrai_e_delineia para vídeo: em vez de uma foto fixa do fundo, é
+    mantido um modelo de fundo por média móvel exponencial (fundo = (1-alfa)·fundo + alfa·quadro),
+    atualizado incrementalmente a cada quadro com cv2.accumulateWeighted. Cada quadro
+    passa por absdiff, limiar e detecção de retângulos, como na versão para imagens.
+
+    Args:
+        fonte (str or int): A fonte dos quadros (ver ler_quadros).
+        limiar (int, optional): O limiar de binarização da diferença. Padrão é 30.
+        alfa (float, optional): A taxa de aprendizado do fundo (0 a 1). Valores maiores
+                                adaptam o fundo mais rápido a mudanças de iluminação, mas
+                                também absorvem objetos parados mais cedo. Padrão é 0.05.
+        fila_max (int, optional): O número máximo de quadros lidos antecipadamente. Padrão é 8.
+        anotar (bool, optional): Se True (padrão), cada resultado inclui o quadro com os
+                                 retângulos desenhados.
+        atualizar_so_fundo (bool, optional): Se True, os pixels detectados como objeto não
+                                             atualizam o modelo de fundo, para que um objeto
+                                             lento não seja incorporado ao fundo. Em contrapartida,
+                                             um objeto presente no primeiro quadro deixa um
+                                             "fantasma" permanente. Padrão é False.
+        modo (str, optional): "contornos" (padrão) ou "componentes" (ver _02_subtrai_e_delineia).
+
+    Yields:
+        dict: Para cada quadro, o "indice", as "caixas" (x, y, largura, altura[, area]), a imagem
+              "binaria" e, se anotar=True, o quadro "anotado". O primeiro quadro inicializa
+              o fundo e não gera detecções.
+
+    Raises:
+        ValueError: Se o modo for desconhecido.
+    """
+    if modo not in MODOS_DETECCAO:
+        raise ValueError(f"Modo de detecção desconhecido: {modo}. Opções: {', '.join(MODOS_DETECCAO)}")
+    fundo = None
+    for indice, quadro in enumerate(ler_quadros(fonte, fila_max)):
+        # Os intermediários de cada quadro (mesmo tamanho em todo o vídeo) usam buffers
+        # reaproveitados (ver components.buffers); só a binária, entregue ao consumidor, é nova
+        if quadro.ndim == 3:
+            cinza = cv2.cvtColor(quadro, cv2.COLOR_BGR2GRAY, dst=rascunho(quadro.shape[:2], np.uint8, "video.cinza"))
+        else:
+            cinza = quadro
+
+        if fundo is None:
+            # O modelo de fundo é mantido em float32 para acumular as pequenas atualizações
+            fundo = cinza.astype(np.float32)
+            binaria = np.zeros_like(cinza)
+            caixas = []
+        else:
+            # Diferença absoluta entre o quadro e o fundo atual, binarizada pelo limiar
+            fundo_uint8 = cv2.convertScaleAbs(fundo, dst=rascunho(cinza.shape, np.uint8, "video.fundo"))
+            subtracao = cv2.absdiff(cinza, fundo_uint8, dst=rascunho(cinza.shape, np.uint8, "video.diferenca"))
+            _, binaria = cv2.threshold(subtracao, limiar, 255, cv2.THRESH_BINARY)
+            caixas = localizar_objetos(subtracao, limiar) if modo == "componentes" else detectar_caixas(binaria)
+
+            # Atualiza o fundo com o quadro atual (só onde não há objeto, se pedido)
+            mascara = cv2.bitwise_not(binaria) if atualizar_so_fundo else None
+            cv2.accumulateWeighted(cinza, fundo, alfa, mask=mascara)
+
+        resultado = {"indice": indice, "caixas": caixas, "binaria": binaria}
+        if anotar:
+            base = quadro if quadro.ndim == 3 else cv2.cvtColor(quadro, cv2.COLOR_GRAY2BGR)
+            resultado["anotado"] = desenhar_caixas(base, caixas)
+        yield resultado
+
+
+def processar_video(
+    fonte, saida=None, limiar=30, alfa=0.05, fila_max=8, fps_saida=30.0, verbose=True, modo="contornos"
+):
+    """
+    Executa a subtração de fundo em um vídeo inteiro e mede a taxa sustentada de quadros.
+
+    Args:
+        fonte (str or int): A fonte dos quadros (ver ler_quadros).
+        saida (str, optional): Arquivo de vídeo onde os quadros anotados serão gravados
+                               (ex: "out/02_video.mp4"). Se None, nada é gravado.
+        limiar (int, optional): O limiar de binarização da diferença. Padrão é 30.
+        alfa (float, optional): A taxa de aprendizado do fundo. Padrão é 0.05.
+        fila_max (int, optional): O número máximo de quadros lidos antecipadamente. Padrão é 8.
+        fps_saida (float, optional): A taxa de quadros do vídeo gravado. Padrão é 30.
+        verbose (bool, optional): Se True, imprime o resumo ao final. Padrão é True.
+        modo (str, optional): "contornos" (padrão) ou "componentes" (ver _02_subtrai_e_delineia).
+
+    Returns:
+        dict: Quantidade de quadros, total de caixas, tempo total e FPS sustentado.
+
+    Raises:
+        FileNotFoundError: Se a fonte não puder ser aberta.
+        OSError: Se o vídeo de saída não puder ser criado (ex: codec ou extensão não suportados).
+    """
+    gravador = None
+    quadros = 0
+    total_caixas = 0
+    inicio = time.perf_counter()
+    try:
+        for resultado in subtrair_fundo_stream(fonte, limiar, alfa, fila_max, anotar=saida is not None, modo=modo):
+            quadros += 1
+            total_caixas += len(resultado["caixas"])
+            if saida is not None:
+                if gravador is None:
+                    os.makedirs(os.path.dirname(saida) or ".", exist_ok=True)
+                    altura, largura = resultado["anotado"].shape[:2]
+                    gravador = cv2.VideoWriter(saida, cv2.VideoWriter_fourcc(*"mp4v"), fps_saida, (largura, altura))
+                    if not gravador.isOpened():
+                        # Sem esta verificação, um codec ou caminho não suportado descartaria
+                        # todos os quadros em silêncio
+                        raise OSError(f"  ⤷ Não foi possível criar o vídeo em: {saida} (codec mp4v)")
+                gravador.write(resultado["anotado"])
+    finally:
+        if gravador is not None:
+            gravador.release()
+    tempo_total = time.perf_counter() - inicio
+
+    resumo = {
+        "quadros": quadros,
+        "caixas": total_caixas,
+        "tempo_total": tempo_total,
+        "fps": quadros / tempo_total if tempo_total > 0 else 0.0,
+    }
+    if verbose:
+        print(f"  ⤷ Quadros processados: {quadros}")
+        print(f"  ⤷ Retângulos detectados: {total_caixas}")
+        print(f"  ⤷ Tempo total: {tempo_total:.3f} segundos")
+        print(f"  ⤷ FPS sustentado: {resumo['fps']:.2f}")
+        if saida is not None:
+            print(f"  ⤷ Vídeo anotado salvo em {saida}")
+    return resumo
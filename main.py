@@ -1,5 +1,47 @@
+import argparse
+import os
 import sys
+import time
+
+import cv2
+import numpy as np
 from components import *
+from components.desempenho import (
+    TAMANHOS_IMAGEM_PADRAO,
+    TAMANHOS_KERNEL_PADRAO,
+    benchmark_convolucao,
+    benchmark_high_boost,
+    imprimir_benchmark_high_boost,
+    imagens_de_src,
+    imprimir_cruzamentos,
+    salvar_resultados,
+)
+from components.filtros import METODOS_HIGH_BOOST
+from components.fft import backend_fft, testar_backends_fft
+from components.blocos import abrir_matriz, convolucao_blocos, criar_matriz, parse_memoria
+from components.video import processar_video
+from components.lote import executar_lote, expandir_entradas, imprimir_resumo
+from components.perfil import configurar_perfil
+from components.servidor import ServidorProcessamento, benchmark_servidor
+from components.cliente import ENDERECO_PADRAO
+from components.previa import PreviaProgressiva
+from components.regressao import (
+    OPERACOES_REGRESSAO,
+    TAMANHOS_REGRESSAO,
+    TOLERANCIA_MEMORIA,
+    TOLERANCIA_PIXEL,
+    TOLERANCIA_SAIDA,
+    TOLERANCIA_TEMPO,
+    RODADAS_BASELINE,
+    RegressaoDetectada,
+    executar_regressao,
+    verificar_regressao,
+)
+from components.banco import banco_exemplo, banco_filtros, benchmark_banco
+from components.indice import TIPOS_HASH, IndiceImagens, caminho_indice_padrao
+from components.saida import FORMATOS_SAIDA
+from components.processamento import MODOS_DETECCAO, relatorio_comparacao
+from components import pipeline
 
 
 def path_imagem(prompt, default_path="./src/02.jpeg"):
@@ -21,11 +63,61 @@ def path_imagem(prompt, default_path="./src/02.jpeg"):
     return caminho  # Retorna o caminho fornecido pelo usuário.
 
 
+def ajustar_com_previa(previa, operacao, parametros, saidas, chave=None, rotulo=None, conversor=float):
+    """
+    Mostra a pré-visualização de uma operação e deixa o usuário ajustar um parâmetro antes
+    de ver o resultado em resolução cheia.
+
+    A pré-visualização (resolução reduzida) aparece na hora, enquanto a resolução cheia é
+    calculada em segundo plano; a cada novo valor, o cálculo anterior é cancelado. Com Enter,
+    o programa espera a resolução cheia do último valor, grava as saídas e as exibe.
+
+    Args:
+        previa (PreviaProgressiva): O executor da pré-visualização.
+        operacao (str): O nome da operação (ver previa.OPERACOES_PREVIA).
+        parametros (dict): Os argumentos da operação (o parâmetro ajustado é alterado nele).
+        saidas (list[str]): Onde gravar as imagens da resolução cheia.
+        chave (str, optional): O parâmetro ajustável. Se None, não há ajuste.
+        rotulo (str, optional): O nome do parâmetro exibido ao usuário. Padrão é a chave.
+        conversor (callable, optional): Converte o texto digitado no valor. Padrão é float.
+    """
+    rotulo = rotulo or chave
+    calcular = True
+    while True:
+        if calcular:
+            for img in previa.executar(operacao, parametros, saidas):
+                mostrar_imagem(img)
+        if chave is None:
+            break
+        novo = input(f"  ⤷ Outro valor de {rotulo} (Enter para usar {parametros[chave]} em resolução cheia): ").strip()
+        if novo == "":
+            break
+        try:
+            parametros[chave] = conversor(novo)
+            calcular = True
+        except ValueError:
+            print(f"  ⤷ Valor inválido para {rotulo}.")
+            calcular = False
+
+    print("  ⤷ Calculando em resolução cheia...")
+    previa.aguardar()
+    for caminho in saidas:
+        print(f"  ⤷ Imagem salva em {caminho}")
+        mostrar_imagem(caminho)
+
+
 def menu():
     """
     Exibe um menu de opções para o usuário e executa a função correspondente à escolha.
     Continua exibindo o menu até que o usuário escolha sair.
     """
+    with PreviaProgressiva() as previa:
+        _menu(previa)
+
+
+def _menu(previa):
+    # O último A escolhido na opção 3.1, reaproveitado na comparação da opção 3
+    ultimo_A = 1.5
     while True:
         clear_t()  # Limpa o terminal a cada exibição do menu.
 
@@ -67,15 +159,31 @@ def menu():
                 print("  ⤷ Limiar inválido. Usando valor padrão 30.")
                 limiar = 30
 
-            _, img_contorno = _02_subtrai_e_delineia(bg_path, fg_path, limiar)
-            mostrar_imagem("./out/02_com_contorno.jpg")
-            mostrar_imagem("./out/02_subtracao_binaria.jpg")
+            # Pré-visualização com ajuste do limiar (ver ajustar_com_previa)
+            ajustar_com_previa(
+                previa,
+                "subtrair",
+                {"fundo": bg_path, "caminho": fg_path, "limiar": limiar},
+                ["./out/02_subtracao_binaria.jpg", "./out/02_com_contorno.jpg"],
+                chave="limiar",
+                conversor=int,
+            )
 
         elif opcao == "3":
-            relatorio = _03_comparar_imagens(
-                "./out/03_high_boost.jpg",
-                "./out/03_passa_alta.jpg",
-            )
+            img_path = path_imagem("  ⤷ Caminho da imagem (pressione Enter para padrão): ")
+            # Os dois filtros são calculados na memória, a partir da mesma imagem em tons de cinza,
+            # sem passar pelos JPEGs gravados em out/ (que perderiam detalhes na compressão)
+            A = input(f"  ⤷ Digite o valor de A do high-boost (Enter para {ultimo_A}): ").strip()
+            try:
+                A = float(A) if A else ultimo_A
+            except ValueError:
+                print(f"  ⤷ Valor inválido para A. Usando {ultimo_A}.")
+                A = ultimo_A
+            # O SSIM é a etapa mais cara da comparação, então só é calculado se pedido
+            calcular_ssim = input("  ⤷ Calcular também o SSIM? (mais lento) [s/N]: ").strip().lower() == "s"
+            cinza = pipeline.carregar(img_path).cinza()
+            high_boost, passa_alta = pipeline.executar([cinza.high_boost(A), cinza.passa_alta()])
+            relatorio = relatorio_comparacao(high_boost, passa_alta, calcular_ssim=calcular_ssim)
             for k, v in relatorio.items():
                 print(f"{k}: {v}")
             input("\nPressione Enter para voltar ao menu...")
@@ -87,17 +195,19 @@ def menu():
             except ValueError:
                 print("  ⤷ Valor inválido para A. Usando valor padrão 1.5.")
                 A = 1.5
-            resultado = _03_1_filtro_high_boost(img_path, A)
-            mostrar_imagem("./out/03_high_boost.jpg")
+            # Pré-visualização com ajuste de A (ver ajustar_com_previa, que grava o valor final em parametros)
+            parametros = {"caminho": img_path, "A": A}
+            ajustar_com_previa(previa, "high-boost", parametros, ["./out/03_high_boost.jpg"], "A")
+            ultimo_A = parametros["A"]
 
         elif opcao == "3.2":
             img_path = path_imagem("  ⤷ Caminho da imagem (pressione Enter para padrão): ")
-            resultado = _03_2_filtro_passa_alta(img_path)
-            mostrar_imagem("./out/03_passa_alta.jpg")
+            ajustar_com_previa(previa, "passa-alta", {"caminho": img_path}, ["./out/03_passa_alta.jpg"])
 
         elif opcao == "4":
             img_path = path_imagem("  ⤷ Caminho da imagem (pressione Enter para padrão): ")
             _04_comparar_tempos_convolucao(img_path)
+            input("\nPressione Enter para voltar ao menu...")
 
         elif opcao == "0":
             print("👋 Saindo...")
@@ -107,7 +217,360 @@ def menu():
             print("🚫 Opção inválida!")
             input("Pressione Enter para tentar novamente...")
 
+
+def criar_parser():
+    """
+    Cria o parser de argumentos do modo em lote (não interativo).
+
+    Cada operação é um subcomando que recebe arquivos, diretórios ou padrões glob como entrada.
+
+    Returns:
+        argparse.ArgumentParser: O parser configurado.
+    """
+    parser = argparse.ArgumentParser(
+        description="Processamento de imagens em lote. Sem argumentos, abre o menu interativo."
+    )
+    subparsers = parser.add_subparsers(dest="operacao", required=True)
+
+    # Argumentos comuns a todas as operações em lote
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument("entradas", nargs="+", help="Arquivos, diretórios ou padrões glob (ex: 'src/*.jpeg').")
+    comum.add_argument("-o", "--saida", default="out/lote", help="Diretório de saída (padrão: out/lote).")
+    comum.add_argument("-r", "--recursivo", action="store_true", help="Percorre subdiretórios das entradas.")
+    comum.add_argument("-p", "--processos", type=int, default=None, help="Processos no pool (padrão: nº de CPUs).")
+    comum.add_argument("--chunksize", type=int, default=None, help="Imagens por despacho a cada processo.")
+    comum.add_argument("--formato", choices=list(FORMATOS_SAIDA), default=None,
+                       help="Formato das saídas (padrão: jpg; npy grava o array sem perdas).")
+    comum.add_argument("--qualidade", type=int, default=None, help="Qualidade JPEG de 0 a 100 (padrão: 95).")
+    comum.add_argument("--compressao-png", type=int, default=None, help="Nível de compressão PNG de 0 a 9.")
+    comum.add_argument("--escritores", type=int, default=2,
+                       help="Threads de gravação por processo; 0 grava de forma síncrona (padrão: 2).")
+    comum.add_argument("--sem-gravar", action="store_true", help="Processa as imagens sem gravar as saídas.")
+    comum.add_argument("--perfil", metavar="DIR", default=None,
+                       help="Mede cada etapa e grava o perfil de cada processo (JSON e Chrome trace) em DIR.")
+
+    p = subparsers.add_parser("clusterizar", parents=[comum], help="[1] Clusterização de tons de cinza.")
+    p.add_argument("--grupos", type=int, default=4, help="Quantidade de grupos de tons (padrão: 4).")
+    p.add_argument("--metodo", choices=["uniforme", "kmeans", "lloyd-max"], default="uniforme",
+                   help="Quantização uniforme ou adaptada ao histograma (padrão: uniforme).")
+
+    p = subparsers.add_parser("subtrair", parents=[comum], help="[2] Subtração e delineamento.")
+    p.add_argument("--fundo", required=True, help="Imagem de fundo comparada com cada entrada.")
+    p.add_argument("--limiar", type=int, default=50, help="Limiar de binarização (padrão: 50).")
+    p.add_argument("--modo", choices=MODOS_DETECCAO, default="contornos",
+                   help="Retângulo por contorno ou componentes conexos em resolução reduzida (padrão: contornos).")
+
+    p = subparsers.add_parser("high-boost", parents=[comum], help="[3.1] Filtro high-boost.")
+    p.add_argument("-A", type=float, default=1.5, help="Fator de amplificação (padrão: 1.5).")
+    p.add_argument("--metodo", choices=METODOS_HIGH_BOOST, default="separavel",
+                   help="Cálculo do filtro; tres_passos é a versão original, que satura a máscara (padrão: separavel).")
+    p.add_argument("--cor", action="store_true", help="Filtra os três canais de cor em vez dos tons de cinza.")
+
+    subparsers.add_parser("passa-alta", parents=[comum], help="[3.2] Filtro passa-alta.")
+
+    p = subparsers.add_parser("video", help="[2] Subtração de fundo em vídeo ou sequência de imagens.")
+    p.add_argument("fonte", help="Arquivo de vídeo, índice de câmera, diretório ou padrão glob de quadros.")
+    p.add_argument("-o", "--saida", default=None, help="Vídeo anotado de saída (ex: out/02_video.mp4).")
+    p.add_argument("--limiar", type=int, default=30, help="Limiar de binarização (padrão: 30).")
+    p.add_argument("--alfa", type=float, default=0.05, help="Taxa de aprendizado do fundo (padrão: 0.05).")
+    p.add_argument("--fila", type=int, default=8, help="Quadros lidos antecipadamente (padrão: 8).")
+    p.add_argument("--modo", choices=MODOS_DETECCAO, default="contornos",
+                   help="Retângulo por contorno ou componentes conexos em resolução reduzida (padrão: contornos).")
+
+    p = subparsers.add_parser("convolucao-blocos", help="Convolução fora da memória (memmap .npy ou cru).")
+    p.add_argument("entrada", help="Matriz de entrada (.npy ou binário cru com --forma e --dtype).")
+    p.add_argument("saida", help="Matriz de saída (.npy ou binário cru).")
+    grupo = p.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--media", type=int, help="Usa um kernel de média (box) com este lado.")
+    grupo.add_argument("--kernel", help="Arquivo .npy com o kernel 2D.")
+    p.add_argument("--metodo", choices=["espacial", "frequencia"], default="espacial", help="Motor de convolução.")
+    p.add_argument("--memoria", default="256M", help="Orçamento de memória de trabalho (ex: 512M, 2G).")
+    p.add_argument("--trabalhadores", type=int, default=None, help="Threads (padrão: nº de CPUs).")
+    p.add_argument("--forma", type=int, nargs="+", default=None, help="Forma da entrada crua (altura largura [canais]).")
+    p.add_argument("--dtype", default=None, help="Tipo da entrada crua (ex: uint8, float32).")
+
+    p = subparsers.add_parser("testar-fft", help="Verifica a correção e a velocidade de cada backend de FFT.")
+    p.add_argument("--tamanho", type=int, nargs=2, default=[1024, 1024], help="Altura e largura do teste.")
+    p.add_argument("--trabalhadores", type=int, default=None, help="Threads das FFTs (padrão: nº de CPUs).")
+    p.add_argument("--repeticoes", type=int, default=3, help="Execuções medidas por backend (padrão: 3).")
+
+    p = subparsers.add_parser("servidor", help="Servidor aquecido que atende pedidos por um socket local.")
+    p.add_argument("--endereco", default=None, help=f"Socket Unix ou host:porta (padrão: {ENDERECO_PADRAO}).")
+    p.add_argument("--trabalhadores", type=int, default=None, help="Operações simultâneas (padrão: nº de CPUs).")
+    p.add_argument("--precarregar", nargs="*", default=[], help="Imagens decodificadas já na inicialização.")
+
+    p = subparsers.add_parser("bench-servidor", help="Latência de chamadas frias do CLI vs pedidos ao servidor.")
+    p.add_argument("--operacao", dest="operacao_bench", choices=["clusterizar", "high-boost", "passa-alta"],
+                   default="high-boost", help="Operação medida (padrão: high-boost).")
+    p.add_argument("--entrada", default="src/01.jpeg", help="Imagem de entrada (padrão: src/01.jpeg).")
+    p.add_argument("--repeticoes", type=int, default=5, help="Chamadas medidas de cada tipo (padrão: 5).")
+
+    p = subparsers.add_parser("duplicatas", help="Imagens repetidas ou parecidas, por um índice de hashes perceptuais.")
+    p.add_argument("entradas", nargs="*", help="Arquivos, diretórios ou padrões glob indexados antes da busca.")
+    p.add_argument("-r", "--recursivo", action="store_true", help="Percorre subdiretórios das entradas.")
+    p.add_argument("--indice", default=None, help=f"Arquivo do índice (padrão: {caminho_indice_padrao()}).")
+    p.add_argument("--hash", choices=TIPOS_HASH, default="phash", help="Hash usado na busca (padrão: phash).")
+    p.add_argument("--raio", type=int, default=8, help="Distância de Hamming máxima, em bits de 64 (padrão: 8).")
+    p.add_argument("--consulta", default=None, help="Lista as imagens parecidas com esta, em vez de todos os pares.")
+    p.add_argument("--psnr-minimo", type=float, default=None, help="Só mantém pares com PSNR de pelo menos este valor.")
+    p.add_argument("--sem-verificar", action="store_true", help="Não compara os pixels dos pares candidatos.")
+
+    p = subparsers.add_parser("bench-high-boost", help="Tempo e erro de cada método do filtro high-boost.")
+    p.add_argument("entradas", nargs="*", help="Imagens medidas (padrão: todas em src/).")
+    p.add_argument("-A", type=float, default=1.5, help="Fator de amplificação (padrão: 1.5).")
+    p.add_argument("--tamanho", type=int, default=5, help="Lado do kernel do desfoque (padrão: 5).")
+    p.add_argument("--sigma", type=float, default=0, help="Desvio padrão do desfoque; 0 usa o do tamanho (padrão: 0).")
+    p.add_argument("--cor", action="store_true", help="Mede nas imagens em cores em vez de tons de cinza.")
+    p.add_argument("--repeticoes", type=int, default=5, help="Execuções medidas por método (padrão: 5).")
+
+    p = subparsers.add_parser("banco-filtros", help="Banco de kernels com uma única FFT da imagem (bordas, Gauss, Laplaciano, média).")
+    p.add_argument("entrada", help="Imagem de entrada.")
+    p.add_argument("-o", "--saida", default=None, help="Arquivo .npy com os resultados KxHxW (padrão: só mede).")
+    p.add_argument("--cor", action="store_true", help="Filtra a imagem em cores em vez de tons de cinza.")
+    p.add_argument("--circular", action="store_true", help="Convolução circular em vez de igualar o cv2.filter2D.")
+    p.add_argument("--memoria", default=None, help="Orçamento de memória de trabalho (ex: 512M); processa em lotes.")
+    p.add_argument("--repeticoes", type=int, default=5, help="Execuções medidas por versão (padrão: 5).")
+
+    p = subparsers.add_parser("regressao", help="Suíte de regressão de tempo, memória e saídas das operações.")
+    p.add_argument("--tamanhos", type=int, nargs="*", default=list(TAMANHOS_REGRESSAO),
+                   help="Lados das imagens sintéticas (padrão: 256 1024 4096 8192).")
+    p.add_argument("--sem-src", action="store_true", help="Não inclui as imagens de src/.")
+    p.add_argument("--operacoes", nargs="+", choices=list(OPERACOES_REGRESSAO), default=None,
+                   help="Operações medidas (padrão: todas).")
+    p.add_argument("--repeticoes", type=int, default=5,
+                   help="Mínimo de execuções medidas por combinação; as rápidas repetem mais (padrão: 5).")
+    p.add_argument("--aquecimento", type=int, default=1, help="Execuções descartadas (padrão: 1).")
+    p.add_argument("--rodadas-baseline", type=int, default=RODADAS_BASELINE,
+                   help=f"Processos em que a baseline é medida; guarda o maior dos mínimos (padrão: {RODADAS_BASELINE}).")
+    p.add_argument("--tolerancia-tempo", type=float, default=TOLERANCIA_TEMPO,
+                   help=f"Aumento relativo aceito no tempo mínimo (padrão: {TOLERANCIA_TEMPO}).")
+    p.add_argument("--tolerancia-memoria", type=float, default=TOLERANCIA_MEMORIA,
+                   help=f"Aumento relativo aceito no pico de memória (padrão: {TOLERANCIA_MEMORIA}).")
+    p.add_argument("--tolerancia-saida", type=float, default=TOLERANCIA_SAIDA,
+                   help=f"Diferença aceita nas miniaturas (níveis) quando o checksum muda (padrão: {TOLERANCIA_SAIDA}).")
+    p.add_argument("--tolerancia-pixel", type=float, default=TOLERANCIA_PIXEL,
+                   help=f"Diferença aceita por pixel (níveis) nas saídas guardadas inteiras (padrão: {TOLERANCIA_PIXEL:g}).")
+    p.add_argument("--diretorio", default="regressao", help="Diretório da baseline e das saídas de referência.")
+    p.add_argument("--atualizar-baseline", action="store_true", help="Grava os tempos medidos como nova baseline.")
+    p.add_argument("--atualizar-golden", action="store_true", help="Grava as saídas medidas como novas referências.")
+
+    p = subparsers.add_parser("bench-convolucao", help="[4] Varredura espacial vs frequência (JSON/CSV).")
+    p.add_argument("--tamanhos", type=int, nargs="*", default=list(TAMANHOS_IMAGEM_PADRAO),
+                   help="Lados das imagens sintéticas quadradas.")
+    p.add_argument("--imagens", nargs="*", default=None, help="Imagens reais (padrão: todas em src/).")
+    p.add_argument("--kernels", type=int, nargs="+", default=list(TAMANHOS_KERNEL_PADRAO),
+                   help="Lados dos kernels de média (padrão: 3 a 101).")
+    p.add_argument("--repeticoes", type=int, default=5, help="Execuções medidas por combinação (padrão: 5).")
+    p.add_argument("--aquecimento", type=int, default=1, help="Execuções descartadas (padrão: 1).")
+    p.add_argument("--sem-cache", action="store_true", help="Recalcula o espectro do kernel a cada execução.")
+    p.add_argument("-o", "--saida", default="out/bench_convolucao", help="Prefixo dos arquivos JSON/CSV.")
+    return parser
+
+
+def main(argv):
+    """
+    Executa o modo não interativo (lote ou benchmark) a partir dos argumentos de linha de comando.
+
+    Args:
+        argv (list[str]): Os argumentos (sem o nome do programa).
+
+    Returns:
+        int: O código de saída (0 se todas as imagens foram processadas, 1 caso contrário).
+    """
+    args = criar_parser().parse_args(argv)
+
+    if args.operacao == "video":
+        fonte = int(args.fonte) if args.fonte.isdigit() else args.fonte
+        processar_video(
+            fonte, saida=args.saida, limiar=args.limiar, alfa=args.alfa, fila_max=args.fila, modo=args.modo
+        )
+        return 0
+
+    if args.operacao == "convolucao-blocos":
+        if args.media:
+            kernel = np.ones((args.media, args.media), np.float32) / (args.media * args.media)
+        else:
+            kernel = np.load(args.kernel)
+        entrada = abrir_matriz(args.entrada, args.forma, args.dtype)
+        inicio = time.perf_counter()
+        convolucao_blocos(entrada, args.saida, kernel, args.metodo, parse_memoria(args.memoria), args.trabalhadores)
+        print(f"  ⤷ Convolução {entrada.shape} salva em {args.saida} ({time.perf_counter() - inicio:.3f} segundos)")
+        return 0
+
+    if args.operacao == "testar-fft":
+        resultados = testar_backends_fft(tuple(args.tamanho), args.repeticoes, args.trabalhadores)
+        backend = backend_fft()
+        print(
+            f"  ⤷ Backend em uso: {backend.nome} com {backend.trabalhadores} threads "
+            f"(VCRM_FFT_BACKEND e VCRM_FFT_TRABALHADORES para escolher outro)"
+        )
+        return 0 if all(r["ok"] for r in resultados if r["disponivel"]) else 1
+
+    if args.operacao == "servidor":
+        with ServidorProcessamento(args.endereco, args.trabalhadores, args.precarregar) as servidor:
+            print(f"  ⤷ Servidor pronto em {servidor.endereco} ({servidor.trabalhadores} trabalhadores)")
+            print("  ⤷ Envie pedidos com: python cliente.py <operacao> <entradas> (encerrar para sair)")
+            sys.stdout.flush()
+            servidor.servir()
+        return 0
+
+    if args.operacao == "bench-servidor":
+        benchmark_servidor(args.operacao_bench, args.entrada, args.repeticoes)
+        return 0
+
+    if args.operacao == "duplicatas":
+        indice = IndiceImagens(args.indice, args.hash)
+        if args.entradas:
+            inicio = time.perf_counter()
+            atualizacao = indice.atualizar(expandir_entradas(args.entradas, recursivo=args.recursivo), remover_ausentes=True)
+            indice.salvar()
+            print(
+                f"  ⤷ Índice {indice.caminho}: {len(indice)} imagens ({atualizacao['novas']} novas, "
+                f"{atualizacao['inalteradas']} inalteradas, {atualizacao['removidas']} removidas) "
+                f"em {time.perf_counter() - inicio:.3f} segundos"
+            )
+            for caminho, erro in atualizacao["erros"]:
+                print(f"🚫 {caminho}: {erro.strip()}")
+
+        if args.consulta:
+            vizinhos = indice.buscar(args.consulta, args.raio)
+            print(f"  ⤷ {len(vizinhos)} imagens a até {args.raio} bits de {args.consulta}:")
+            for distancia, caminho in vizinhos:
+                print(f"     {distancia:2d} bits  {caminho}")
+            return 0
+
+        pares = indice.duplicatas(args.raio, verificar=not args.sem_verificar, psnr_minimo=args.psnr_minimo)
+        print(f"  ⤷ {len(pares)} pares a até {args.raio} bits ({args.hash}):")
+        for par in pares:
+            detalhe = ""
+            if "iguais" in par:
+                if par["iguais"]:
+                    detalhe = "idênticas"
+                elif par["psnr"] is None:
+                    detalhe = "tamanhos diferentes"
+                else:
+                    detalhe = f"PSNR {par['psnr']:.2f} dB, {par['percentual_diferenca']:.2f}% dos pixels diferem"
+            print(f"     {par['distancia']:2d} bits  {par['a']}  {par['b']}  {detalhe}")
+        return 0
+
+    if args.operacao == "bench-high-boost":
+        modo = cv2.IMREAD_COLOR if args.cor else cv2.IMREAD_GRAYSCALE
+        imagens = {os.path.basename(c): carregar_imagem(c, modo) for c in args.entradas or imagens_de_src()}
+        linhas = benchmark_high_boost(imagens, args.A, args.sigma, args.tamanho, args.repeticoes)
+        imprimir_benchmark_high_boost(linhas)
+        return 0
+
+    if args.operacao == "banco-filtros":
+        img = carregar_imagem(args.entrada, cv2.IMREAD_COLOR if args.cor else cv2.IMREAD_GRAYSCALE)
+        banco = banco_exemplo()
+        memoria = parse_memoria(args.memoria) if args.memoria else None
+        resultado = benchmark_banco(img, banco.values(), not args.circular, memoria, args.repeticoes)
+        print(f"  ⤷ {resultado['kernels']} kernels ({', '.join(banco)}), {resultado['kernels_por_lote']} por lote")
+        for versao in ("individual", "banco"):
+            tempos = resultado[versao]
+            ganho = resultado["individual"]["mediana"] / tempos["mediana"]
+            print(f"  ⤷ {versao:<10} {tempos['mediana'] * 1e3:9.2f} ms ± {tempos['iqr'] * 1e3:.2f} ({ganho:.2f}x)")
+        print(f"  ⤷ Diferença máxima entre as versões: {resultado['diferenca_maxima']:.2e}")
+        if args.saida:
+            saida = criar_matriz(args.saida, (len(banco), *img.shape), np.float32)
+            banco_filtros(img, banco.values(), alinhar=not args.circular, out=saida, memoria_max=memoria)
+            saida.flush()
+            print(f"  ⤷ Resultados salvos em {args.saida}")
+        return 0
+
+    if args.operacao == "regressao":
+        relatorio = executar_regressao(
+            tamanhos=args.tamanhos,
+            usar_src=not args.sem_src,
+            operacoes=args.operacoes,
+            repeticoes=args.repeticoes,
+            aquecimento=args.aquecimento,
+            rodadas_baseline=args.rodadas_baseline,
+            diretorio=args.diretorio,
+            tolerancia_tempo=args.tolerancia_tempo,
+            tolerancia_memoria=args.tolerancia_memoria,
+            tolerancia_saida=args.tolerancia_saida,
+            tolerancia_pixel=args.tolerancia_pixel,
+            atualizar_baseline=args.atualizar_baseline,
+            atualizar_golden=args.atualizar_golden,
+        )
+        if relatorio["baseline_gravada"]:
+            print(f"  ⤷ {relatorio['baseline_gravada']} medições gravadas na baseline {relatorio['baseline']}")
+        if relatorio["golden_gravado"]:
+            print(f"  ⤷ {relatorio['golden_gravado']} saídas de referência gravadas em {relatorio['golden']}")
+        try:
+            verificar_regressao(relatorio)
+        except RegressaoDetectada as exc:
+            print("=" * 31)
+            print(f"🚫 REGRESSÃO: {exc}")
+            print("=" * 31)
+            return 1
+        print(f"  ⤷ Nenhuma regressão em {len(relatorio['linhas'])} medições.")
+        return 0
+
+    if args.operacao == "bench-convolucao":
+        resultado = benchmark_convolucao(
+            tamanhos_imagem=args.tamanhos,
+            caminhos_imagem=imagens_de_src() if args.imagens is None else args.imagens,
+            tamanhos_kernel=args.kernels,
+            repeticoes=args.repeticoes,
+            aquecimento=args.aquecimento,
+            com_cache=not args.sem_cache,
+        )
+        imprimir_cruzamentos(resultado)
+        caminho_json, caminho_csv = salvar_resultados(resultado, args.saida)
+        print(f"  ⤷ Resultados salvos em {caminho_json} e {caminho_csv}")
+        return 0
+
+    params = {}
+    if args.operacao == "clusterizar":
+        params["qtd_grupo"] = args.grupos
+        params["metodo"] = args.metodo
+    elif args.operacao == "subtrair":
+        params["fundo"] = args.fundo
+        params["limiar"] = args.limiar
+        params["modo"] = args.modo
+    elif args.operacao == "high-boost":
+        params["A"] = args.A
+        params["metodo"] = args.metodo
+        params["cor"] = args.cor
+
+    if args.perfil:
+        configurar_perfil(args.perfil)
+
+    entradas = expandir_entradas(args.entradas, recursivo=args.recursivo)
+    if not entradas:
+        print("🚫 Nenhuma imagem encontrada nas entradas informadas.")
+        return 1
+
+    try:
+        resumo = executar_lote(
+            args.operacao,
+            entradas,
+            dir_saida=args.saida,
+            processos=args.processos,
+            chunksize=args.chunksize,
+            params=params,
+            opcoes_saida={
+                "formato": args.formato,
+                "qualidade_jpeg": args.qualidade,
+                "nivel_png": args.compressao_png,
+                "trabalhadores": args.escritores,
+            },
+            gravar=not args.sem_gravar,
+        )
+    except ValueError as exc:
+        print(f"🚫 {exc}")
+        return 1
+    imprimir_resumo(resumo)
+    if args.perfil:
+        print(f"  ⤷ Perfil de cada processo gravado em {args.perfil} (perfil_<pid>.json e .trace.json)")
+    return 0 if not resumo["erros"] else 1
+
+
 # Este bloco de código é executado apenas quando o script é executado diretamente (não quando importado como módulo).
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main(sys.argv[1:]))  # Com argumentos, executa o modo em lote.
     menu()  # Chama a função do menu para iniciar a aplicação.
     # clear_t()
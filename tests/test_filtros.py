@@ -0,0 +1,71 @@
+import os
+from functools import partial
+
+import cv2
+import numpy as np
+import pytest
+
+from components.desempenho import imagem_sintetica, medir, referencia_high_boost
+from components.filtros import filtro_high_boost
+
+A = 1.5
+_SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def _degrau(altura=64, largura=64, escuro=60, claro=120):
+    # Borda vertical: o desfoque cria detalhe positivo no lado claro e negativo no lado escuro
+    img = np.full((altura, largura), escuro, np.uint8)
+    img[:, largura // 2 :] = claro
+    return img
+
+
+def _imagens():
+    cinza = imagem_sintetica(256, 256)
+    return {
+        "degrau": _degrau(),
+        "sintetica": cinza,
+        "cores": cv2.merge([cinza, cv2.flip(cinza, 1), cv2.flip(cinza, 0)]),
+        "pessoa": cv2.imread(os.path.join(_SRC, "pessoa.png"), cv2.IMREAD_GRAYSCALE),
+    }
+
+
+@pytest.mark.parametrize("metodo", ["separavel", "fundido"])
+@pytest.mark.parametrize("nome", ["degrau", "sintetica", "cores", "pessoa"])
+def test_high_boost_erro_maximo_de_um_nivel(metodo, nome):
+    img = _imagens()[nome]
+    if img is None:
+        pytest.skip("src/pessoa.png não encontrada")
+    referencia = referencia_high_boost(img, A)
+    erro = cv2.absdiff(filtro_high_boost(img, A, metodo=metodo), referencia)
+    assert erro.max() <= 1
+
+
+def test_high_boost_separavel_nao_e_mais_lento_que_tres_passos():
+    # Folgado de propósito: em cada rodada os dois métodos são medidos em seguida (mínimo de 5
+    # execuções) e vale a mediana das razões, para que uma rodada ruidosa não decida o teste.
+    # Só falha se o padrão perder a vantagem sobre a versão original (~1,2 ms contra ~1,4 ms em 1024²)
+    img = imagem_sintetica(1024, 1024)
+    razoes = []
+    for _ in range(9):
+        separavel, tres_passos = (
+            medir(partial(filtro_high_boost, img, A, metodo=metodo), repeticoes=5, aquecimento=1)["minimo"]
+            for metodo in ("separavel", "tres_passos")
+        )
+        razoes.append(separavel / tres_passos)
+    assert np.median(razoes) <= 1.0
+
+
+def test_high_boost_tres_passos_perde_o_detalhe_negativo():
+    img = _degrau()
+    base = A * img.astype(np.float64)
+    referencia = referencia_high_boost(img, A).astype(np.float64)
+    tres_passos = filtro_high_boost(img, A, metodo="tres_passos").astype(np.float64)
+
+    # A referência fica abaixo de A·img no lado escuro da borda (detalhe negativo)...
+    negativo = referencia < base - 0.5
+    assert negativo.any()
+    # ...mas no método de três passos a máscara saturada em 0 nunca puxa o resultado para baixo
+    assert np.all(tres_passos >= base - 0.5)
+    assert np.abs(tres_passos - referencia)[negativo].max() > 1
+    # No lado claro (detalhe positivo) os métodos concordam
+    assert np.abs(tres_passos - referencia)[~negativo].max() <= 1